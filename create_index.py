@@ -298,9 +298,10 @@ html = """<!DOCTYPE html>
         }
         async function load(){
             try{
-                const devs=['yangpyungpc','bohees-macbook-air-local'];
+                const idx=await fetch('data/_index.json');
+                const devs=idx.ok?(await idx.json()).files:['yangpyungpc.json','bohees-macbook-air-local.json'];
                 const data=(await Promise.all(devs.map(async d=>{
-                    const r=await fetch(`data/${d}.json`);
+                    const r=await fetch(`data/${d}`);
                     return r.ok?await r.json():null
                 }))).filter(d=>d);
                 const u={i:0,o:0,c:0,s:0};
@@ -7,7 +7,16 @@ This script:
 2. Backs up cumulative database to Git repo
 3. Updates device-specific JSON for multi-device tracking
 
-Run this daily via Windows Task Scheduler
+Run this daily via Windows Task Scheduler, or let it decide for itself:
+
+    python auto_sync.py --adaptive          # one cheap check (cron / systemd timer / Task Scheduler)
+    python auto_sync.py --loop --interval 300   # long-running, checks every 5 minutes
+
+In adaptive mode each check only stats the session logs and reads the
+bytes appended since the previous check. The full scan + export + push
+runs only once the pending delta reaches `sync_min_tokens`, or when
+something changed and `sync_max_interval_minutes` has passed since the
+last export (both in the sync config). Quiet machines cost nothing.
 
 Created & Directed by Bohee Lee
 https://github.com/bohee-connectome
@@ -18,21 +27,33 @@ Built with Claude Code
 import sys
 import io
 import json
+import time
+import argparse
 import subprocess
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+from ccusage_cumulative import load_totals
+from ccusage_settings import load_settings
+from ccusage_sources import iter_sources, record_containers, resume_offset, make_checkpoint
+from ccusage_identity import load_identity, device_data_file, file_owner, LEGACY_DEVICE_ID
+from ccusage_sync import build_export_data
+from ccusage_sync_queue import enqueue_export, start_background_worker, LOG_FILE
+
 # Set UTF-8 encoding
-if sys.platform == 'win32':
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 REPO_DIR = SCRIPT_DIR.parent
-CUMULATIVE_DB = Path.home() / ".claude" / "cumulative_usage.json"
 DATA_DIR = REPO_DIR / "data"
-DEVICE_ID = "yangpyungpc"  # Change this for each device
+# Persistent machine identity (set the label once with: ccusage_identity.py --label NAME)
+IDENTITY = load_identity()
+DEVICE_ID = IDENTITY["label"]
+USER = load_settings()["user"]  # team repos: data/<user>/<device>.json
+STATE_FILE = Path.home() / ".claude" / "auto_sync_state.json"
 
 def run_cumulative_tracker():
     """Run cumulative tracker to update counts"""
@@ -66,104 +87,173 @@ def export_to_device_json():
     print("=" * 70)
     print()
 
-    # Load cumulative database
-    if not CUMULATIVE_DB.exists():
+    # Load the sidecar totals (not the whole DB)
+    totals = load_totals()
+    if totals is None:
         print("❌ Cumulative database not found!")
         return False
 
-    with open(CUMULATIVE_DB, 'r', encoding='utf-8') as f:
-        db = json.load(f)
-
-    cumulative = db["cumulative_usage"]
-
-    # Create device JSON
-    device_data = {
-        "device_id": DEVICE_ID,
-        "last_updated": datetime.now(timezone.utc).isoformat(),
-        "period_start": db["period_start"],
-        "period_end": datetime.now().strftime("%Y-%m-%d"),
-        "usage": {
-            "input_tokens": cumulative["input_tokens"],
-            "output_tokens": cumulative["output_tokens"],
-            "cache_creation_tokens": cumulative["cache_creation_tokens"],
-            "cache_read_tokens": cumulative["cache_read_tokens"],
-            "total_sessions": cumulative["total_sessions"]
-        },
-        "estimated_cost": (
-            (cumulative["input_tokens"] / 1_000_000) * 3.0 +
-            (cumulative["output_tokens"] / 1_000_000) * 15.0 +
-            (cumulative["cache_creation_tokens"] / 1_000_000) * 3.75 +
-            (cumulative["cache_read_tokens"] / 1_000_000) * 0.30
-        )
-    }
+    # Same device JSON as ccusage-sync
+    device_data = build_export_data(totals, IDENTITY)
 
     # Save to data directory
-    DATA_DIR.mkdir(exist_ok=True)
-    device_file = DATA_DIR / f"{DEVICE_ID}.json"
+    device_file = device_data_file(DATA_DIR, IDENTITY, USER)
+    device_file.parent.mkdir(parents=True, exist_ok=True)
 
     with open(device_file, 'w', encoding='utf-8') as f:
         json.dump(device_data, f, indent=2, ensure_ascii=False)
 
+    # This script used to export every machine as LEGACY_DEVICE_ID; only
+    # the machine that wrote that file can say it is its own
+    legacy_file = DATA_DIR / f"{LEGACY_DEVICE_ID}.json"
+    if (legacy_file.exists() and legacy_file != device_file and file_owner(legacy_file) is None
+            and LEGACY_DEVICE_ID not in IDENTITY.get("previous_ids", [])):
+        print(f"ℹ️  {legacy_file.name} has no device UUID. If this machine wrote it, run:")
+        print(f"   python {SCRIPT_DIR / 'ccusage_identity.py'} --adopt {LEGACY_DEVICE_ID}")
+
     print(f"✅ Exported to: {device_file}")
-    print(f"   Sessions: {cumulative['total_sessions']:,}")
+    print(f"   Sessions: {device_data['usage']['total_sessions']:,}")
     print(f"   Cost: ${device_data['estimated_cost']:.2f}")
 
     return True
 
 def backup_to_git():
-    """Backup to Git repository"""
+    """Queue the device JSON for a background Git push"""
     print()
     print("=" * 70)
     print("STEP 3: Backing up to Git...")
     print("=" * 70)
     print()
 
-    try:
-        # Git add
-        subprocess.run(
-            ['git', 'add', '-A'],
-            cwd=REPO_DIR,
-            check=True,
-            capture_output=True
-        )
-
-        # Git commit
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        commit_msg = f"Auto-sync: {DEVICE_ID} at {timestamp}"
-
-        result = subprocess.run(
-            ['git', 'commit', '-m', commit_msg],
-            cwd=REPO_DIR,
-            capture_output=True,
-            text=True
-        )
-
-        if "nothing to commit" in result.stdout:
-            print("✅ No changes to commit (already up to date)")
-        else:
-            print(f"✅ Committed: {commit_msg}")
-
-        # Git push
-        subprocess.run(
-            ['git', 'push'],
-            cwd=REPO_DIR,
-            check=True,
-            capture_output=True
-        )
-
-        print("✅ Pushed to remote repository")
-        print()
-        print("🎉 Backup complete!")
+    device_file = device_data_file(DATA_DIR, IDENTITY, USER)
+    pending = enqueue_export(REPO_DIR, DEVICE_ID, device_file, reason="auto-sync")
 
-        return True
+    # Push in a detached worker: failures are retried with backoff
+    # instead of being printed and forgotten
+    start_background_worker()
 
-    except subprocess.CalledProcessError as e:
-        print(f"⚠️  Git operation failed: {e}")
-        print("   (Continuing anyway - local data is safe)")
-        return False
+    print(f"✅ Queued for push ({pending} pending)")
+    print(f"   Log: {LOG_FILE}")
 
-def main():
-    """Main execution"""
+    return True
+
+def load_state():
+    """Load adaptive scheduler state"""
+    if STATE_FILE.exists():
+        try:
+            with open(STATE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    return {
+        "files": {},
+        "pending_tokens": 0,
+        "pending_files": 0,
+        "last_export_at": None,
+        "last_check_at": None
+    }
+
+def save_state(state):
+    """Save adaptive scheduler state atomically"""
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = STATE_FILE.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    tmp_file.replace(STATE_FILE)
+
+def check_usage_delta(state, settings):
+    """Cheap change check: stat every log, read only the appended bytes
+
+    Returns the number of changed files and the tokens (input + output +
+    cache creation) found in appended lines. This is an estimate for
+    triggering only; the real scan still deduplicates.
+    """
+    files = state["files"]
+    containers = state.setdefault("containers", {})
+    inventory = state.setdefault("dirs", {})
+    changed_files = 0
+    delta_tokens = 0
+    sources = []
+    failed_keys = set()
+
+    for source in iter_sources(settings, containers, inventory):
+        sources.append(source)
+        try:
+            start = resume_offset(source, files.get(source.key))
+            if start is None:
+                continue
+
+            end = start
+            for raw_line, end in source.read_complete_lines(start):
+                if b'"usage"' not in raw_line:
+                    continue
+                try:
+                    usage = json.loads(raw_line)['message']['usage']
+                except (ValueError, KeyError, TypeError):
+                    continue
+                delta_tokens += (
+                    usage.get('input_tokens', 0) +
+                    usage.get('output_tokens', 0) +
+                    usage.get('cache_creation_input_tokens', 0)
+                )
+
+            files[source.key] = make_checkpoint(source, end)
+            changed_files += 1
+
+        except Exception:  # unreadable or corrupt log/archive: retried next check
+            failed_keys.add(source.key)
+            continue
+
+    record_containers(containers, sources, failed_keys)
+
+    state["pending_tokens"] += delta_tokens
+    state["pending_files"] += changed_files
+    return changed_files, delta_tokens
+
+def sync_due(state, settings):
+    """Decide whether the pending delta warrants a full sync; returns a reason or None"""
+    if state["pending_tokens"] >= settings["sync_min_tokens"]:
+        return f"{state['pending_tokens']:,} new tokens"
+
+    if not state["pending_files"]:
+        return None
+
+    if not state["last_export_at"]:
+        return "first sync"
+
+    since_export = datetime.now(timezone.utc) - datetime.fromisoformat(state["last_export_at"])
+    if since_export >= timedelta(minutes=settings["sync_max_interval_minutes"]):
+        return f"changes pending for {since_export.total_seconds() / 60:.0f} minutes"
+
+    return None
+
+def run_adaptive():
+    """One adaptive check; runs the full sync only when it is due"""
+    settings = load_settings()
+    state = load_state()
+
+    changed_files, delta_tokens = check_usage_delta(state, settings)
+    state["last_check_at"] = datetime.now(timezone.utc).isoformat()
+
+    reason = sync_due(state, settings)
+    if not reason:
+        save_state(state)
+        print(f"💤 No sync needed ({changed_files} changed files, "
+              f"{state['pending_tokens']:,} tokens pending)")
+        return True
+
+    print(f"⏰ Sync due: {reason}")
+    ok = run_full_sync()
+    if ok:
+        state["pending_tokens"] = 0
+        state["pending_files"] = 0
+        state["last_export_at"] = datetime.now(timezone.utc).isoformat()
+    save_state(state)
+    return ok
+
+def run_full_sync():
+    """Scan, export and queue the push"""
     print()
     print("🔄 AUTOMATIC CUMULATIVE USAGE SYNC")
     print(f"Device: {DEVICE_ID}")
@@ -173,12 +263,12 @@ def main():
     # Step 1: Run cumulative tracker
     if not run_cumulative_tracker():
         print("❌ Failed at step 1")
-        sys.exit(1)
+        return False
 
     # Step 2: Export to device JSON
     if not export_to_device_json():
         print("❌ Failed at step 2")
-        sys.exit(1)
+        return False
 
     # Step 3: Backup to Git
     backup_to_git()
@@ -187,6 +277,35 @@ def main():
     print("=" * 70)
     print("✅ ALL STEPS COMPLETED")
     print("=" * 70)
+    return True
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Automatic cumulative usage sync to Git")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="only sync when the usage delta crosses the configured thresholds")
+    parser.add_argument("--loop", action="store_true",
+                        help="keep running, doing an adaptive check every --interval seconds")
+    parser.add_argument("--interval", type=int, default=300, help="seconds between checks with --loop")
+    args = parser.parse_args()
+
+    if args.loop:
+        print(f"🔁 Adaptive sync loop (every {args.interval}s, Ctrl+C to stop)")
+        try:
+            while True:
+                run_adaptive()
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            print("\n👋 Stopped")
+        return
+
+    if args.adaptive:
+        ok = run_adaptive()
+    else:
+        ok = run_full_sync()
+
+    if not ok:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Budget alerts and burn-rate guardrails (`ccusage alerts`)
+
+Rules are evaluated after every tracker run on the per-day deltas the scan
+just found, against a small persisted state (~/.claude/alert_state.json)
+holding the last weeks of per-day counters and which alerts already fired.
+No rule ever needs the full history; the state is seeded once from the
+DB's time buckets.
+
+Rules and hooks live in the sync config (~/.claude/usage_sync_config.json):
+
+    "alert_rules": [
+      {"name": "daily-budget",  "type": "cost", "threshold": 20},
+      {"name": "weekly-budget", "type": "cost", "threshold": 100, "days": 7},
+      {"name": "cache-spike",   "type": "cache_creation_spike", "factor": 3,
+       "min_tokens": 5000000, "baseline_days": 7},
+      {"name": "silent",        "type": "device_silent", "days": 3}
+    ],
+    "alert_hooks": [
+      {"type": "command", "command": "logger -t ccusage"},
+      {"type": "webhook", "url": "http://127.0.0.1:9000/alerts"},
+      {"type": "desktop"}
+    ]
+
+    cost                  estimated cost over a rolling window of `days`
+                          (default 1) is above `threshold` dollars
+    cache_creation_spike  a day's cache creation tokens exceed `factor` x the
+                          (non-zero) average of the previous `baseline_days`
+                          days; days under `min_tokens` (default 1M) never fire
+    device_silent         a device in data/ has not exported for `days` days
+
+Rules missing a required field or with a non-numeric value are reported
+and skipped; a rule without a name is named after its type.
+
+Each alert fires once (per day / window / silence episode). Hooks get the
+alert as JSON: on stdin for commands, as the POST body for webhooks.
+
+Usage:
+    ccusage alerts             # rules, hooks and recent alerts
+    ccusage alerts --check     # evaluate now without scanning (e.g. from cron)
+    ccusage alerts --test      # send a test alert through every hook
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import urllib.request
+from pathlib import Path
+from datetime import datetime, date, timezone, timedelta
+
+from ccusage_settings import load_settings
+
+# Korea Standard Time (UTC+9)
+KST = timezone(timedelta(hours=9))
+
+STATE_FILE = Path.home() / ".claude" / "alert_state.json"
+STATE_VERSION = 1
+STATE_DAYS = 35  # per-day counters kept for rolling windows and baselines
+FIRED_DAYS = 90  # how long fired alerts are remembered
+HOOK_TIMEOUT = 10  # seconds per command / webhook
+RULE_DEFAULTS = {
+    "cost": {"days": 1},
+    "cache_creation_spike": {"factor": 3, "min_tokens": 1_000_000, "baseline_days": 7},
+    "device_silent": {"days": 3}
+}
+RULE_REQUIRED = {"cost": ["threshold"]}
+
+def today_kst():
+    """Today's KST date"""
+    return datetime.now(KST).date()
+
+def load_state():
+    """Load alert state"""
+    if STATE_FILE.exists():
+        try:
+            with open(STATE_FILE, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get("version") == STATE_VERSION:
+                return state
+        except (OSError, json.JSONDecodeError):
+            pass
+    return {"version": STATE_VERSION, "generation": None, "daily": {}, "fired": {}}
+
+def save_state(state):
+    """Save alert state atomically"""
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = STATE_FILE.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+    tmp_file.replace(STATE_FILE)
+
+def load_rules(settings):
+    """Configured rules with defaults filled in; invalid rules are reported and skipped"""
+    rules = []
+    for index, rule in enumerate(settings["alert_rules"] or []):
+        try:
+            if not isinstance(rule, dict):
+                raise ValueError("not an object")
+            rule_type = rule.get("type")
+            if rule_type not in RULE_DEFAULTS:
+                raise ValueError(f"unknown type {rule_type!r}")
+            missing = [key for key in RULE_REQUIRED.get(rule_type, []) if key not in rule]
+            if missing:
+                raise ValueError(f"missing {', '.join(missing)}")
+
+            rule = dict(RULE_DEFAULTS[rule_type], **rule)
+            rule["name"] = str(rule.get("name") or f"{rule_type}-{index + 1}")
+            for key in ("threshold", "factor"):
+                if key in rule:
+                    rule[key] = float(rule[key])
+            for key in ("days", "baseline_days", "min_tokens"):
+                if key in rule:
+                    rule[key] = int(rule[key])
+            if rule.get("days", 1) < 1 or rule.get("baseline_days", 1) < 1:
+                raise ValueError("days must be at least 1")
+        except (TypeError, ValueError) as e:
+            print(f"⚠️  Skipping alert rule #{index + 1}: {e}")
+            continue
+        rules.append(rule)
+    return rules
+
+def seed_state(state, buckets, today):
+    """(Re)build the per-day window from the DB's time buckets"""
+    from ccusage_cumulative import daily_totals
+
+    start = (today - timedelta(days=STATE_DAYS - 1)).isoformat()
+    state["daily"] = daily_totals(buckets, start=start)
+
+def apply_deltas(state, new_daily, today):
+    """Add a scan's per-day deltas and drop days that left the window"""
+    from ccusage_cumulative import empty_counters
+
+    for day, delta in new_daily.items():
+        counters = state["daily"].setdefault(day, empty_counters())
+        for key in counters:
+            counters[key] += delta.get(key, 0)
+
+    cutoff = (today - timedelta(days=STATE_DAYS - 1)).isoformat()
+    state["daily"] = {day: counters for day, counters in sorted(state["daily"].items()) if day >= cutoff}
+
+    fired_cutoff = (today - timedelta(days=FIRED_DAYS)).isoformat()
+    for rule_name, keys in state["fired"].items():
+        state["fired"][rule_name] = {key: when for key, when in keys.items() if when[:10] >= fired_cutoff}
+
+def window_days(end_day, days):
+    """ISO dates of the `days`-day window ending at end_day"""
+    end = date.fromisoformat(end_day)
+    return [(end - timedelta(days=offset)).isoformat() for offset in range(days)]
+
+def evaluate_cost(rule, state, days_to_check):
+    """Rolling-window cost above a threshold; once per window"""
+    from ccusage_cumulative import calculate_cost, empty_counters
+
+    days = rule["days"]
+    fired = set(state["fired"].get(rule["name"], {}))
+    alerts = []
+
+    for day in days_to_check:
+        window = window_days(day, days)
+        if any(other in fired for other in window):
+            continue  # already alerted for an overlapping window
+
+        usage = empty_counters()
+        for other in window:
+            for key, value in state["daily"].get(other, {}).items():
+                usage[key] += value
+        cost = calculate_cost(usage)
+
+        if cost > rule["threshold"]:
+            period = day if days == 1 else f"{window[-1]} → {day}"
+            alerts.append({
+                "key": day,
+                "value": round(cost, 2),
+                "threshold": rule["threshold"],
+                "message": f"Estimated cost ${cost:.2f} over {period} is above ${rule['threshold']:g}"
+            })
+            fired.add(day)
+
+    return alerts
+
+def evaluate_cache_spike(rule, state, days_to_check):
+    """A day's cache creation far above its recent baseline; once per day"""
+    factor = rule["factor"]
+    min_tokens = rule["min_tokens"]
+    baseline_days = rule["baseline_days"]
+    fired = state["fired"].get(rule["name"], {})
+    alerts = []
+
+    for day in days_to_check:
+        if day in fired:
+            continue
+
+        value = state["daily"].get(day, {}).get("cache_creation_tokens", 0)
+        previous = window_days(day, baseline_days + 1)[1:]
+        baseline = sum(state["daily"].get(other, {}).get("cache_creation_tokens", 0)
+                       for other in previous) / baseline_days
+
+        # Without a baseline there is nothing to spike against
+        if baseline and value >= min_tokens and value > factor * baseline:
+            alerts.append({
+                "key": day,
+                "value": value,
+                "threshold": round(factor * baseline),
+                "message": (f"Cache creation on {day}: {value / 1_000_000:.2f}M tokens, "
+                            f"{value / baseline:.1f}x the {baseline_days}-day average")
+            })
+
+    return alerts
+
+def evaluate_device_silent(rule, state, devices, now):
+    """Devices whose newest export is older than `days`; once per silence episode"""
+    days = rule["days"]
+    fired = state["fired"].get(rule["name"], {})
+    alerts = []
+
+    for device in devices or []:
+        last_updated = device.get("last_updated")
+        if not last_updated:
+            continue
+        try:
+            updated = datetime.fromisoformat(last_updated.replace('Z', '+00:00'))
+        except ValueError:
+            continue
+        if updated.tzinfo is None:
+            updated = updated.replace(tzinfo=KST)
+
+        silent_days = (now - updated).total_seconds() / 86400
+        key = f"{device['device_id']}|{last_updated}"
+        if silent_days >= days and key not in fired:
+            alerts.append({
+                "key": key,
+                "value": round(silent_days, 1),
+                "threshold": days,
+                "message": f"Device {device['device_id']} has not exported for {silent_days:.1f} days"
+            })
+
+    return alerts
+
+def load_devices():
+    """Newest export per device from the synced data directory (for device_silent)"""
+    import contextlib
+    from ccusage_query import default_data_dir
+    from ccusage_total import aggregate_usage
+
+    data_dir = default_data_dir()
+    if not data_dir or not Path(data_dir).exists():
+        return []
+
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            _, devices, _, _ = aggregate_usage(data_dir)
+        except SystemExit:
+            return []
+    return devices
+
+def evaluate(rules, state, days_to_check, now):
+    """Run every rule; returns new alerts and marks them fired in the state"""
+    alerts = []
+    devices = None
+
+    for rule in rules:
+        rule_type = rule.get("type")
+        if rule_type == "cost":
+            found = evaluate_cost(rule, state, days_to_check)
+        elif rule_type == "cache_creation_spike":
+            found = evaluate_cache_spike(rule, state, days_to_check)
+        elif rule_type == "device_silent":
+            if devices is None:
+                devices = load_devices()
+            found = evaluate_device_silent(rule, state, devices, now)
+        else:
+            print(f"⚠️  Unknown alert rule type: {rule_type}")
+            continue
+
+        fired = state["fired"].setdefault(rule["name"], {})
+        for alert in found:
+            fired[alert["key"]] = now.isoformat()
+            alerts.append(dict(alert, rule=rule["name"], type=rule_type, fired_at=now.isoformat()))
+
+    return alerts
+
+def desktop_notify(title, message):
+    """Best-effort desktop notification"""
+    if sys.platform == 'darwin':
+        script = f'display notification {json.dumps(message)} with title {json.dumps(title)}'
+        command = ['osascript', '-e', script]
+    elif sys.platform == 'win32':
+        script = ("Add-Type -AssemblyName System.Windows.Forms;"
+                  "$n=New-Object System.Windows.Forms.NotifyIcon;"
+                  "$n.Icon=[System.Drawing.SystemIcons]::Warning;$n.Visible=$true;"
+                  f"$n.ShowBalloonTip(10000,{json.dumps(title)},{json.dumps(message)},'Warning');"
+                  "Start-Sleep -Seconds 10;$n.Dispose()")
+        command = ['powershell', '-NoProfile', '-Command', script]
+    else:
+        command = ['notify-send', title, message]
+
+    subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def send_alert(alert, hooks):
+    """Print an alert and pass it to every configured hook"""
+    print(f"🚨 ALERT [{alert['rule']}] {alert['message']}")
+    payload = json.dumps(alert, ensure_ascii=False)
+
+    for hook in hooks:
+        hook_type = hook.get("type")
+        try:
+            if hook_type == "command":
+                env = dict(os.environ, CCUSAGE_ALERT_RULE=alert["rule"], CCUSAGE_ALERT_MESSAGE=alert["message"])
+                subprocess.run(hook["command"], shell=True, input=payload, text=True, env=env,
+                               timeout=HOOK_TIMEOUT, check=True)
+            elif hook_type == "webhook":
+                request = urllib.request.Request(hook["url"], data=payload.encode('utf-8'), method="POST",
+                                                 headers={"Content-Type": "application/json"})
+                with urllib.request.urlopen(request, timeout=HOOK_TIMEOUT):
+                    pass
+            elif hook_type == "desktop":
+                desktop_notify(f"ccusage: {alert['rule']}", alert["message"])
+            else:
+                print(f"⚠️  Unknown alert hook type: {hook_type}")
+        except (OSError, subprocess.SubprocessError, ValueError) as e:
+            # A broken hook must never fail the tracker run
+            print(f"⚠️  Alert hook {hook_type} failed: {e}")
+
+def check_alerts(db, new_daily):
+    """Evaluate the rules after a tracker run (called with the scan's per-day deltas)"""
+    settings = load_settings()
+    rules = load_rules(settings)
+    if not rules:
+        return []
+
+    now = datetime.now(KST)
+    today = now.date()
+    state = load_state()
+
+    # The state follows the DB run by run; after a gap (alerts just enabled,
+    # a run without rules, a restored DB) it is rebuilt from the buckets,
+    # which already include this run's deltas
+    generation = db.get("generation", 0)
+    if state["generation"] == generation - 1:
+        apply_deltas(state, new_daily, today)
+    elif state["generation"] == generation:
+        apply_deltas(state, {}, today)  # `--check`: no run since the last evaluation
+    else:
+        seed_state(state, db.get("buckets", {}), today)
+        apply_deltas(state, {}, today)
+    state["generation"] = generation
+
+    # Days a delta landed on, plus today so rolling windows stay current
+    days_to_check = sorted(set(new_daily) | {today.isoformat()})
+    alerts = evaluate(rules, state, days_to_check, now)
+    save_state(state)
+
+    for alert in alerts:
+        send_alert(alert, settings["alert_hooks"])
+    return alerts
+
+def display_status(settings, state):
+    """Print rules, hooks and recently fired alerts"""
+    from ccusage_cumulative import calculate_cost
+
+    print("=" * 70)
+    print("🚨 BUDGET ALERTS")
+    print("=" * 70)
+
+    rules = load_rules(settings)
+    if not rules:
+        print("ℹ️  No rules configured (add \"alert_rules\" to ~/.claude/usage_sync_config.json)")
+    for rule in rules:
+        details = ', '.join(f"{key}={value}" for key, value in rule.items() if key not in ("name", "type"))
+        print(f"   📏 {rule['name']}: {rule['type']} ({details})")
+
+    print()
+    hooks = settings["alert_hooks"]
+    print(f"🔔 Hooks: {', '.join(hook.get('type', '?') for hook in hooks) if hooks else 'console only'}")
+
+    today = today_kst().isoformat()
+    if today in state["daily"]:
+        print(f"💰 Today so far: ${calculate_cost(state['daily'][today]):.2f}")
+
+    recent = sorted(((when, rule, key) for rule, keys in state["fired"].items() for key, when in keys.items()),
+                    reverse=True)[:10]
+    if recent:
+        print()
+        print("🕒 Recent alerts:")
+        for when, rule, key in recent:
+            print(f"   {when[:16]}  {rule}  {key}")
+
+    print("=" * 70)
+
+def main(argv=None):
+    """Main execution"""
+    from ccusage_cumulative import db_path, load_database
+
+    parser = argparse.ArgumentParser(prog="ccusage alerts", description="Budget alerts")
+    parser.add_argument("--check", action="store_true", help="evaluate the rules now without scanning")
+    parser.add_argument("--test", action="store_true", help="send a test alert through every hook")
+    args = parser.parse_args(argv)
+
+    settings = load_settings()
+
+    if args.test:
+        now = datetime.now(KST).isoformat()
+        send_alert({"rule": "test", "type": "test", "key": now, "value": 0, "threshold": 0,
+                    "message": "Test alert from ccusage", "fired_at": now}, settings["alert_hooks"])
+        return
+
+    if args.check:
+        if not db_path().exists():
+            print("⚠️  No cumulative usage database found (run 'ccusage' first)")
+            sys.exit(1)
+        # Same state as the last run; a mismatch reseeds from the buckets
+        db = load_database()
+        alerts = check_alerts(db, {})
+        if not alerts:
+            print("✅ No new alerts")
+        return
+
+    display_status(settings, load_state())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the ccusage scripts
+
+Each benchmark generates a synthetic corpus in a temporary directory, so it
+never touches ~/.claude or the real data/ directory.
+
+The scan benchmark is also a differential check: it generates randomized
+log trees and mutates them between scans (appends, half-written lines,
+truncations, rewrites, renames, copies, duplicate and malformed lines,
+rotation to .gz, deletions; timestamps around the cutoff date with
+non-UTC offsets), runs the reference full scan and every optimized scan
+mode after each round, and fails unless all of them agree on
+cumulative_usage and on the set of counted sessions.
+
+Usage:
+    python ccusage_bench.py aggregate [--devices 10000]
+    python ccusage_bench.py dbformat [--sessions 200000]
+    python ccusage_bench.py scan [--seeds 20] [--rounds 8] [--seed 1]
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import os
+import sys
+import io
+import json
+import gzip
+import time
+import heapq
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+from contextlib import redirect_stdout
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+from ccusage_total import aggregate_usage
+from ccusage_dbformat import write_compact, read_compact, read_header, write_json, read_json
+from ccusage_cumulative import SETTINGS, CUTOFF_DATE, new_database, scan_sessions, parse_usage_record
+from ccusage_sources import iter_sources, resume_offset, make_checkpoint
+from ccusage_verify import parse_log_file
+from ccusage_import import parse_source
+
+# Korea Standard Time (UTC+9)
+KST = timezone(timedelta(hours=9))
+
+# Set UTF-8 encoding for Windows
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+POOL_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # thread pool size compared against serial reads
+
+def timed(func, *args, repeat=3):
+    """Run func several times and return (best seconds, last result)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def generate_device_files(data_dir, count, seed=42):
+    """Write `count` synthetic device JSON files"""
+    rng = random.Random(seed)
+    now = datetime.now(KST)
+
+    for i in range(count):
+        input_tokens = rng.randint(0, 500_000)
+        output_tokens = rng.randint(0, 5_000_000)
+        cache_creation = rng.randint(0, 100_000_000)
+        cache_read = rng.randint(0, 700_000_000)
+        device = {
+            "device_id": f"devbox-{i:05d}" if i % 4 else f"laptop-{i:05d}",
+            "last_updated": (now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))).isoformat(),
+            "period_start": "2025-10-01",
+            "period_end": now.strftime("%Y-%m-%d"),
+            "usage": {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cache_creation_tokens": cache_creation,
+                "cache_read_tokens": cache_read,
+                "total_sessions": rng.randint(0, 20_000)
+            },
+            "estimated_cost": round(
+                input_tokens / 1e6 * 3.0 + output_tokens / 1e6 * 15.0 +
+                cache_creation / 1e6 * 3.75 + cache_read / 1e6 * 0.30, 2)
+        }
+        with open(data_dir / f"{device['device_id']}.json", 'w', encoding='utf-8') as f:
+            json.dump(device, f, indent=2)
+
+def serial_aggregate(data_dir):
+    """Reference: the original serial glob + json.load + full sort"""
+    total = {'input_tokens': 0, 'output_tokens': 0, 'cache_creation_tokens': 0,
+             'cache_read_tokens': 0, 'total_sessions': 0}
+    devices = []
+
+    for json_file in data_dir.glob("*.json"):
+        with open(json_file, 'r') as f:
+            data = json.load(f)
+        usage = data.get('usage', {})
+        for key in total:
+            total[key] += usage.get(key, 0)
+        devices.append({'device_id': data.get('device_id'), 'cost': data.get('estimated_cost', 0),
+                        'usage': usage})
+
+    devices_sorted = sorted(devices, key=lambda d: d['cost'], reverse=True)
+    return total, devices_sorted
+
+def streaming_aggregate(data_dir, top, groups, workers):
+    """aggregate_usage: streaming sum + heapq top-K, reading with `workers` threads"""
+    total, devices, _, group_totals = aggregate_usage(data_dir, groups, workers)
+    return total, heapq.nlargest(top, devices, key=lambda d: d['cost']), group_totals
+
+def bench_aggregate(args):
+    """Fleet aggregation: the original serial loop vs aggregate_usage, serial and pooled reads"""
+    groups = {"laptops": "laptop-*", "devboxes": "devbox-*"}
+
+    with tempfile.TemporaryDirectory(prefix="ccusage-bench-") as tmp:
+        data_dir = Path(tmp)
+        print(f"🏗️  Generating {args.devices:,} device files...")
+        generate_device_files(data_dir, args.devices)
+
+        serial_s, (serial_total, serial_sorted) = timed(serial_aggregate, data_dir)
+        stream_s, (stream_total, stream_top, group_totals) = timed(
+            streaming_aggregate, data_dir, args.top, groups, 1)
+        pooled_s, (pooled_total, pooled_top, _) = timed(
+            streaming_aggregate, data_dir, args.top, groups, POOL_WORKERS)
+
+    for total, top in ((stream_total, stream_top), (pooled_total, pooled_top)):
+        assert serial_total == total, "streamed totals differ from serial totals"
+        assert [d['cost'] for d in serial_sorted[:args.top]] == [d['cost'] for d in top], \
+            "top-K differs from full sort"
+    assert sum(g['devices'] for g in group_totals.values()) == args.devices
+
+    print()
+    print("=" * 70)
+    print(f"📊 AGGREGATE BENCHMARK ({args.devices:,} devices, best of 3)")
+    print("=" * 70)
+    print(f"  Serial glob + json.load + sort:  {serial_s * 1000:8.1f} ms")
+    print(f"  {f'Serial read + stream + top-{args.top}:':<33}{stream_s * 1000:8.1f} ms  {serial_s / stream_s:5.2f}x")
+    print(f"  {f'{POOL_WORKERS}-thread pool + stream + top-{args.top}:':<33}{pooled_s * 1000:8.1f} ms  "
+          f"{serial_s / pooled_s:5.2f}x  (read_workers: {POOL_WORKERS})")
+    group_summary = ', '.join(f"{name}={totals['devices']:,}" for name, totals in group_totals.items())
+    print(f"  Groups:                          {group_summary}")
+    print("  ✅ Totals, top-K and group counts match the serial reference")
+    print("=" * 70)
+
+def generate_database(sessions, seed=42):
+    """Build a synthetic cumulative DB with `sessions` hot session records"""
+    rng = random.Random(seed)
+    projects = [f"project-{i}" for i in range(40)]
+    models = ["claude-sonnet-4-5", "claude-opus-4", "claude-haiku-4-5"]
+    processed = {}
+    buckets = {}
+
+    for i in range(sessions):
+        day = f"2025-{rng.randint(10, 12)}-{rng.randint(1, 28):02d}"
+        record = {
+            "file": f"{rng.getrandbits(64):016x}.jsonl",
+            "project": rng.choice(projects),
+            "model": rng.choice(models),
+            "timestamp": f"{day}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00.000Z",
+            "input_tokens": rng.randint(0, 500),
+            "output_tokens": rng.randint(0, 5_000),
+            "cache_creation_tokens": rng.randint(0, 50_000),
+            "cache_read_tokens": rng.randint(0, 500_000)
+        }
+        processed[hashlib.md5(str(i).encode()).hexdigest()] = record
+        counters = buckets.setdefault(day, {}).setdefault(record["project"], {}).setdefault(
+            record["model"], dict.fromkeys(["input_tokens", "output_tokens", "cache_creation_tokens",
+                                            "cache_read_tokens", "sessions"], 0))
+        for key in counters:
+            counters[key] += 1 if key == "sessions" else record[key]
+
+    return {
+        "created_at": "2025-10-01T00:00:00+09:00",
+        "last_updated": "2025-12-31T23:59:59+09:00",
+        "period_start": "2025-10-01",
+        "generation": 1,
+        "cumulative_usage": {"input_tokens": 1, "output_tokens": 2, "cache_creation_tokens": 3,
+                             "cache_read_tokens": 4, "total_sessions": sessions},
+        "processed_sessions": processed,
+        "buckets": buckets
+    }
+
+def bench_dbformat(args):
+    """DB load time: legacy pretty JSON vs compact (header + gzip body)"""
+    print(f"🏗️  Generating a DB with {args.sessions:,} session records...")
+    db = generate_database(args.sessions)
+
+    with tempfile.TemporaryDirectory(prefix="ccusage-bench-") as tmp:
+        legacy_file = Path(tmp) / "cumulative_usage.json"
+        compact_file = Path(tmp) / "cumulative_usage.ccdb"
+
+        legacy_write_s, _ = timed(write_json, legacy_file, db)
+        compact_write_s, _ = timed(write_compact, compact_file, db)
+        legacy_load_s, legacy_db = timed(read_json, legacy_file)
+        compact_load_s, compact_db = timed(read_compact, compact_file)
+        header_s, header = timed(read_header, compact_file)
+        legacy_size = legacy_file.stat().st_size
+        compact_size = compact_file.stat().st_size
+
+    assert legacy_db == db and compact_db == db, "round trip changed the DB"
+    assert header["cumulative_usage"] == db["cumulative_usage"]
+
+    print()
+    print("=" * 70)
+    print(f"📊 DB FORMAT BENCHMARK ({args.sessions:,} sessions, best of 3)")
+    print("=" * 70)
+    print(f"  {'':<28}{'size':>12}{'write':>12}{'load':>12}")
+    print(f"  {'Legacy JSON (indent=2)':<28}{legacy_size / 1e6:>10.2f}MB"
+          f"{legacy_write_s * 1000:>10.1f}ms{legacy_load_s * 1000:>10.1f}ms")
+    print(f"  {'Compact (header + gzip)':<28}{compact_size / 1e6:>10.2f}MB"
+          f"{compact_write_s * 1000:>10.1f}ms{compact_load_s * 1000:>10.1f}ms")
+    print(f"  {'Compact, header only':<28}{'':>12}{'':>12}{header_s * 1000:>10.3f}ms")
+    print(f"  Totals via header:           {legacy_load_s / header_s:,.0f}x faster than a full legacy load")
+    print("  ✅ Both formats round-trip the DB exactly")
+    print("=" * 70)
+
+SCAN_PROJECTS = ["-Users-a-web", "-Users-a-api", "-home-b-ml", "-home-b-infra"]
+SCAN_MODELS = ["claude-sonnet-4-5", "claude-opus-4", "claude-haiku-4-5"]
+TIMESTAMP_OFFSETS = [timezone.utc, KST, timezone(timedelta(hours=-5)), timezone(timedelta(hours=5, minutes=30))]
+MALFORMED_LINES = [
+    b'{"timestamp": "2025-', b'not json', b'{"message": {"usage": {"input_tokens": 1', b'}',
+    b'{"timestamp": "yesterday", "message": {"usage": {"input_tokens": 1}}}',  # valid JSON, bad timestamp
+    b'\xff\xfe{"timestamp": "\xc3"}'  # invalid UTF-8
+]
+TOKEN_KEYS = ["input_tokens", "output_tokens", "cache_creation_tokens", "cache_read_tokens"]
+SCAN_OPERATIONS = {  # mutation -> weight
+    "create": 3, "append": 8, "partial": 3, "complete": 3, "malformed": 2, "duplicate": 2,
+    "truncate": 2, "rewrite": 1, "rename": 1, "copy": 1, "rotate": 1, "delete": 1
+}
+ROUND_SECONDS = 60  # simulated time between scans (directory mtimes)
+
+def random_timestamp(rng):
+    """A timestamp near the cutoff date, in a random offset and precision"""
+    if rng.random() < 0.3:
+        instant = CUTOFF_DATE + timedelta(seconds=rng.randint(-3600, 3600))
+    else:
+        instant = CUTOFF_DATE + timedelta(seconds=rng.randint(-2 * 86400, 60 * 86400))
+    offset = rng.choice(TIMESTAMP_OFFSETS)
+    text = instant.astimezone(offset).isoformat(timespec=rng.choice(["seconds", "milliseconds"]))
+    return text.replace("+00:00", "Z") if offset is timezone.utc and rng.random() < 0.5 else text
+
+def random_log_line(rng):
+    """One JSONL line: mostly assistant records with usage, some without"""
+    kind = rng.random()
+    if kind < 0.05:
+        record = {"type": "summary", "summary": "no timestamp"}
+    elif kind < 0.15:
+        record = {"type": "user", "timestamp": random_timestamp(rng), "message": {"role": "user"}}
+    else:
+        usage = {"input_tokens": rng.randint(0, 5_000), "output_tokens": rng.randint(0, 2_000)}
+        if rng.random() < 0.7:
+            usage["cache_creation_input_tokens"] = rng.randint(0, 50_000)
+            usage["cache_read_input_tokens"] = rng.randint(0, 500_000)
+        record = {"type": "assistant", "timestamp": random_timestamp(rng),
+                  "message": {"model": rng.choice(SCAN_MODELS), "usage": usage}}
+    return json.dumps(record) + "\n"
+
+class LogTree:
+    """A synthetic ~/.claude/projects tree that changes between scans"""
+
+    def __init__(self, root, rng):
+        self.root = root
+        self.rng = rng
+        self.logs = []  # plain logs still being written
+        self.pending = {}  # log -> rest of its half-written last line
+        self.touched = set()  # directories changed this round
+        self.clock = time.time_ns() - 86400 * 1_000_000_000
+
+    def new_path(self):
+        """A fresh log path in a random project"""
+        project = self.root / self.rng.choice(SCAN_PROJECTS)
+        if not project.exists():
+            project.mkdir()
+            self.touched.add(self.root)
+        self.touched.add(project)
+        return project / f"{self.rng.getrandbits(64):016x}.jsonl"
+
+    def write(self, path, text, mode='a'):
+        """Write text (or raw bytes) to a log"""
+        data = text if isinstance(text, bytes) else text.encode('utf-8')
+        with open(path, mode + 'b') as f:
+            f.write(data)
+
+    def lines(self, count):
+        """`count` random complete lines"""
+        return "".join(random_log_line(self.rng) for _ in range(count))
+
+    def create(self, lines):
+        """Add a new log"""
+        path = self.new_path()
+        self.write(path, self.lines(lines), 'w')
+        self.logs.append(path)
+        return path
+
+    def mutate(self, operations):
+        """Apply random mutations; returns what was done (for failure reports)"""
+        done = []
+        # A few hot logs take most operations, so truncate + append on one log between scans happens
+        hot = self.rng.sample(self.logs, min(3, len(self.logs)))
+
+        for _ in range(operations):
+            operation = self.rng.choices(list(SCAN_OPERATIONS), list(SCAN_OPERATIONS.values()))[0]
+            if operation == "create" or not self.logs:
+                done.append(f"create {self.create(self.rng.randint(1, 30)).name}")
+                continue
+
+            path = self.rng.choice(hot if hot and self.rng.random() < 0.6 else self.logs)
+            if path not in self.logs:
+                continue
+            done.append(f"{operation} {path.parent.name}/{path.name}")
+
+            if operation == "append":
+                self.write(path, self.lines(self.rng.randint(1, 20)))
+            elif operation == "partial" and path not in self.pending:
+                line = random_log_line(self.rng)
+                cut = self.rng.randint(1, len(line) - 2)  # never a complete JSON object
+                self.write(path, line[:cut])
+                self.pending[path] = line[cut:]
+            elif operation == "complete" and path in self.pending:
+                self.write(path, self.pending.pop(path))
+            elif operation == "malformed":
+                self.write(path, self.rng.choice(MALFORMED_LINES) + b"\n")
+            elif operation == "duplicate":
+                with open(path, 'rb') as f:
+                    complete = [line for line in f if line.endswith(b"\n")]
+                if complete:
+                    self.write(path, b"".join(self.rng.choices(complete, k=self.rng.randint(1, 5))))
+            elif operation == "truncate":
+                data = path.read_bytes()
+                ends = [i + 1 for i, byte in enumerate(data) if byte == 0x0A]
+                with open(path, 'r+b') as f:
+                    f.truncate(self.rng.choice([0] + ends))
+                self.pending.pop(path, None)
+            elif operation == "rewrite":
+                self.write(path, self.lines(self.rng.randint(1, 30)), 'w')
+                self.pending.pop(path, None)
+            elif operation == "rename":
+                target = self.new_path()
+                self.touched.add(path.parent)
+                path.rename(target)
+                self.logs[self.logs.index(path)] = target
+                if path in self.pending:
+                    self.pending[target] = self.pending.pop(path)
+            elif operation == "copy":
+                # Same file name in another project: the same session IDs
+                target = self.root / self.rng.choice(SCAN_PROJECTS) / path.name
+                if not target.exists():
+                    target.parent.mkdir(exist_ok=True)
+                    self.touched.update([self.root, target.parent])
+                    shutil.copyfile(path, target)
+                    self.logs.append(target)
+            elif operation == "rotate":
+                with open(path, 'rb') as src, gzip.open(path.with_name(path.name + ".gz"), 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                path.unlink()
+                self.forget(path)
+            elif operation == "delete":
+                path.unlink()
+                self.forget(path)
+
+        return done
+
+    def forget(self, path):
+        """Stop writing to a log that was rotated or deleted"""
+        self.logs.remove(path)
+        self.pending.pop(path, None)
+        self.touched.add(path.parent)
+
+    def settle(self):
+        """Date changed directories one simulated round later
+
+        Scans run seconds apart here, so without this every directory
+        listing would be too young for the inventory cache to trust.
+        """
+        self.clock += ROUND_SECONDS * 1_000_000_000
+        for directory in self.touched:
+            os.utime(directory, ns=(self.clock, self.clock))
+        self.touched.clear()
+
+def reference_scan(root, sessions):
+    """Reference: the original full scan (every line of every log, on every run)"""
+    for path in sorted(root.rglob("*")):
+        if path.name.endswith(".jsonl"):
+            opener, log_name = open, path.name
+        elif path.name.endswith(".jsonl.gz"):
+            opener, log_name = gzip.open, path.name[:-3]
+        else:
+            continue
+        parts = path.relative_to(root).parts
+        project = parts[0] if len(parts) > 1 else "unknown"
+
+        try:
+            with opener(path, 'rb') as f:
+                for raw_line in f:
+                    line = raw_line.decode('utf-8', errors='replace')
+                    if not line.strip():
+                        continue
+                    try:
+                        record = parse_usage_record(Path(log_name), project, line)
+                    except ValueError:
+                        continue
+                    if record and record[0] not in sessions:
+                        sessions[record[0]] = tuple(record[1][key] for key in TOKEN_KEYS)
+        except Exception:
+            continue
+    return sessions
+
+def incremental_scan(db, keep_inventory):
+    """scan_sessions itself: checkpoints, with or without the directory inventory cache"""
+    if not keep_inventory:
+        db.get("checkpoints", {}).pop("dirs", None)
+    with redirect_stdout(io.StringIO()):
+        scan_sessions(db)
+    return {session_id: tuple(data[key] for key in TOKEN_KEYS)
+            for session_id, data in db["processed_sessions"].items()}
+
+def parallel_scan(state, pool):
+    """The `ccusage import` pipeline: checkpoints + process-pool parsing"""
+    checkpoints, sessions = state.setdefault("checkpoints", {}), state.setdefault("sessions", {})
+    jobs = []
+    for source in iter_sources(SETTINGS):
+        start = resume_offset(source, checkpoints.get(source.key))
+        if start is not None:
+            jobs.append((source, start))
+
+    sources = {source.key: source for source, _ in jobs}
+    for key, records, _, end, error in pool.map(parse_source, jobs):
+        if error:
+            continue
+        for record in records:
+            sessions.setdefault(record[0].hex(), tuple(record[2:]))
+        checkpoints[key] = make_checkpoint(sources[key], end)
+    return sessions
+
+def reparse_scan(sessions, pool):
+    """The `ccusage verify` raw check: every source re-parsed from byte 0 in a process pool"""
+    for _, records, _, error in pool.map(parse_log_file, list(iter_sources(SETTINGS))):
+        if not error:
+            for session_id, data in records.items():
+                sessions.setdefault(session_id, tuple(data[key] for key in TOKEN_KEYS))
+    return sessions
+
+def usage_totals(sessions):
+    """cumulative_usage of a session set"""
+    totals = dict.fromkeys(TOKEN_KEYS, 0)
+    for tokens in sessions.values():
+        for key, value in zip(TOKEN_KEYS, tokens):
+            totals[key] += value
+    totals["total_sessions"] = len(sessions)
+    return totals
+
+def check_seed(seed, args, pool, timings):
+    """Generate one tree, mutate it round by round, and compare every mode with the reference
+
+    Returns the modes that disagreed in the first round any did (empty when
+    all modes agree throughout).
+    """
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(prefix="ccusage-bench-") as tmp:
+        root = Path(tmp) / "projects"
+        root.mkdir()
+        SETTINGS["log_roots"] = [str(root)]
+
+        tree = LogTree(root, rng)
+        for _ in range(args.files):
+            tree.create(rng.randint(1, args.lines))
+        tree.settle()
+
+        reference = {}
+        checkpoint_db, inventory_db = new_database(), new_database()
+        parallel_state, reparsed = {}, {}
+        modes = {
+            "checkpoints": lambda: incremental_scan(checkpoint_db, keep_inventory=False),
+            "checkpoints + inventory": lambda: incremental_scan(inventory_db, keep_inventory=True),
+            "parallel (import)": lambda: parallel_scan(parallel_state, pool),
+            "parallel reparse (verify)": lambda: reparse_scan(reparsed, pool)
+        }
+        dbs = {"checkpoints": checkpoint_db, "checkpoints + inventory": inventory_db}
+
+        operations = []
+        for round_number in range(args.rounds + 1):
+            if round_number:
+                operations = tree.mutate(rng.randint(1, args.operations))
+                tree.settle()
+
+            started = time.perf_counter()
+            reference_scan(root, reference)
+            timings["reference"] = timings.get("reference", 0) + time.perf_counter() - started
+            expected = usage_totals(reference)
+
+            failures = []
+            for mode, scan in modes.items():
+                started = time.perf_counter()
+                sessions = scan()
+                timings[mode] = timings.get(mode, 0) + time.perf_counter() - started
+
+                totals = dbs[mode]["cumulative_usage"] if mode in dbs else usage_totals(sessions)
+                if totals == expected and sessions.keys() == reference.keys():
+                    continue
+                failures.append({
+                    "seed": seed, "round": round_number, "mode": mode,
+                    "missing": len(reference.keys() - sessions.keys()),
+                    "extra": len(sessions.keys() - reference.keys()),
+                    "drift": {key: totals[key] - expected[key] for key in expected if totals[key] != expected[key]},
+                    "operations": operations
+                })
+            if failures:
+                return failures
+    return []
+
+def bench_scan(args):
+    """Scanner modes vs the reference full scan on randomized, changing log trees"""
+    log_roots = SETTINGS["log_roots"]
+    timings = {}
+    failures = []
+
+    print(f"🏗️  {args.seeds} seeds x {args.rounds} rounds, {args.files} logs of up to {args.lines} lines each")
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for seed in range(args.seed, args.seed + args.seeds):
+                seed_failures = check_seed(seed, args, pool, timings)
+                failures.extend(seed_failures)
+                for failure in seed_failures:
+                    print(f"  ❌ seed {seed}: {failure['mode']} differs from the reference in round {failure['round']}")
+                if not seed_failures:
+                    print(f"  ✅ seed {seed}")
+    finally:
+        SETTINGS["log_roots"] = log_roots
+
+    print()
+    print("=" * 70)
+    print(f"📊 SCAN DIFFERENTIAL CHECK ({args.seeds} seeds x {args.rounds + 1} scans)")
+    print("=" * 70)
+    reference_s = timings["reference"]
+    failed_modes = {failure["mode"] for failure in failures}
+    for mode, seconds in timings.items():
+        result = "" if mode == "reference" else ("❌" if mode in failed_modes else "✅")
+        print(f"  {mode:<28}{seconds * 1000:>10.1f} ms{reference_s / seconds:>8.2f}x  {result}")
+    print("=" * 70)
+
+    if not failures:
+        print("  ✅ Every mode matches the reference cumulative_usage and session set")
+        return
+
+    for failure in failures:
+        print(f"❌ seed {failure['seed']}, round {failure['round']}, {failure['mode']}: "
+              f"{failure['missing']} sessions missing, {failure['extra']} extra, drift {failure['drift']}")
+        for operation in failure["operations"]:
+            print(f"     {operation}")
+    print(f"   Reproduce: python ccusage_bench.py scan --seed {failures[0]['seed']} --seeds 1")
+    sys.exit(1)
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="ccusage benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    aggregate = subparsers.add_parser("aggregate", help="fleet aggregation over many device files")
+    aggregate.add_argument("--devices", type=int, default=10_000)
+    aggregate.add_argument("--top", type=int, default=20)
+    aggregate.set_defaults(func=bench_aggregate)
+
+    dbformat = subparsers.add_parser("dbformat", help="cumulative DB load time per on-disk format")
+    dbformat.add_argument("--sessions", type=int, default=200_000)
+    dbformat.set_defaults(func=bench_dbformat)
+
+    scan = subparsers.add_parser("scan", help="scanner modes checked against the reference full scan")
+    scan.add_argument("--seeds", type=int, default=20, help="random log trees to generate")
+    scan.add_argument("--seed", type=int, default=1, help="first seed")
+    scan.add_argument("--rounds", type=int, default=8, help="mutate-and-scan rounds per tree")
+    scan.add_argument("--files", type=int, default=30, help="logs in each initial tree")
+    scan.add_argument("--lines", type=int, default=200, help="max lines per initial log")
+    scan.add_argument("--operations", type=int, default=12, help="max mutations per round")
+    scan.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    scan.set_defaults(func=bench_scan)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Prompt-cache efficiency (`ccusage cache`)
+
+For every group of usage records:
+
+    hit ratio = cache_read / (cache_read + cache_creation + input)
+    savings   = cache_read x (input price - cache read price)
+              - cache_creation x (cache write price - input price)
+
+i.e. dollars saved versus sending the same prompt tokens uncached (Sonnet
+4.5 pricing, per 1M tokens: input $3.00, cache write $3.75, cache read
+$0.30). Negative savings mean the cache is written more than it is read.
+
+Answers come from rollups the scan already keeps up to date: the
+day/project/model time buckets and the per-conversation rollup (one entry
+per JSONL file), so finding the worst-caching projects or conversations
+never re-parses a log.
+
+Usage:
+    ccusage cache                               # projects, worst hit ratio first
+    ccusage cache --by conversation --top 20
+    ccusage cache --by day --from 2025-11-01 --to 2025-11-30
+    ccusage cache --by project --sort savings --json
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import sys
+import json
+import argparse
+
+from ccusage_cumulative import db_path, load_database, empty_counters
+from ccusage_settings import kst_day_arg
+
+INPUT_PRICE = 3.0  # $ per 1M tokens
+CACHE_WRITE_PRICE = 3.75
+CACHE_READ_PRICE = 0.30
+
+GROUP_BY_CHOICES = ["project", "conversation", "day", "month", "model"]
+SORT_CHOICES = ["ratio", "savings", "tokens"]
+MIN_PROMPT_TOKENS = 100_000  # groups smaller than this are left out of the ranking
+
+def prompt_tokens(counters):
+    """Prompt-side tokens: uncached input + cache writes + cache reads"""
+    return counters["input_tokens"] + counters["cache_creation_tokens"] + counters["cache_read_tokens"]
+
+def hit_ratio(counters):
+    """Share of prompt tokens served from the cache"""
+    total = prompt_tokens(counters)
+    return counters["cache_read_tokens"] / total if total else 0.0
+
+def cache_savings(counters):
+    """Dollars saved by caching versus uncached input"""
+    read_savings = counters["cache_read_tokens"] * (INPUT_PRICE - CACHE_READ_PRICE) / 1_000_000
+    write_overhead = counters["cache_creation_tokens"] * (CACHE_WRITE_PRICE - INPUT_PRICE) / 1_000_000
+    return read_savings - write_overhead
+
+def cache_stats(counters):
+    """Counters plus hit ratio and savings"""
+    return dict(counters, hit_ratio=round(hit_ratio(counters), 4), savings=round(cache_savings(counters), 2) + 0.0)  # no "-0.00"
+
+def group_buckets(buckets, group_by, start, end):
+    """Sum the time buckets by day, month, project or model within [start, end]"""
+    groups = {}
+    for day, by_project in buckets.items():
+        if (start and day < start) or (end and day > end):
+            continue
+        for project, by_model in by_project.items():
+            for model, counters in by_model.items():
+                key = {"day": day, "month": day[:7], "project": project, "model": model}[group_by]
+                target = groups.setdefault(key, empty_counters())
+                for field in target:
+                    target[field] += counters[field]
+    return groups
+
+def group_conversations(conversations, start, end):
+    """Conversations active within [start, end] (whole-conversation totals)"""
+    groups = {}
+    for key, conversation in conversations.items():
+        if (start and conversation["last_day"] < start) or (end and conversation["first_day"] > end):
+            continue
+        groups[key] = conversation
+    return groups
+
+def rank(groups, sort, min_tokens):
+    """Groups with enough prompt volume, worst first (lowest ratio / savings, or most tokens)"""
+    rows = [(key, cache_stats(counters)) for key, counters in groups.items()
+            if prompt_tokens(counters) >= min_tokens]
+    if sort == "ratio":
+        rows.sort(key=lambda row: row[1]["hit_ratio"])
+    elif sort == "savings":
+        rows.sort(key=lambda row: row[1]["savings"])
+    else:
+        rows.sort(key=lambda row: prompt_tokens(row[1]), reverse=True)
+    return rows
+
+def display_cache(rows, overall, group_by, top):
+    """Print the cache efficiency table"""
+    label = "conversation" if group_by == "conversation" else group_by
+    width = 40 if group_by in ("project", "conversation") else 16
+
+    print("=" * (width + 72))
+    print(f"♻️  PROMPT CACHE EFFICIENCY by {label}")
+    print("=" * (width + 72))
+    print(f"{label:<{width}}{'Hit ratio':>10}{'Cache read':>14}{'Cache write':>14}{'Input':>12}{'Saved':>12}{'Records':>10}")
+    print("-" * (width + 72))
+
+    for key, stats in rows[:top]:
+        name = key if len(key) <= width - 1 else "…" + key[-(width - 2):]
+        if group_by == "conversation":
+            name = f"{stats['project'][-(width - 12):]}/{key[:8]}"
+        print(f"{name:<{width}}{stats['hit_ratio'] * 100:>9.1f}%"
+              f"{stats['cache_read_tokens']:>14,}{stats['cache_creation_tokens']:>14,}"
+              f"{stats['input_tokens']:>12,}{'$' + format(stats['savings'], ',.2f'):>12}{stats['sessions']:>10,}")
+
+    print("-" * (width + 72))
+    print(f"{'TOTAL':<{width}}{overall['hit_ratio'] * 100:>9.1f}%"
+          f"{overall['cache_read_tokens']:>14,}{overall['cache_creation_tokens']:>14,}"
+          f"{overall['input_tokens']:>12,}{'$' + format(overall['savings'], ',.2f'):>12}{overall['sessions']:>10,}")
+    print("=" * (width + 72))
+    if len(rows) > top:
+        print(f"ℹ️  {len(rows) - top} more (use --top)")
+
+def main(argv=None):
+    """Main execution"""
+    parser = argparse.ArgumentParser(prog="ccusage cache", description="Prompt-cache efficiency")
+    parser.add_argument("--by", choices=GROUP_BY_CHOICES, default="project")
+    parser.add_argument("--from", dest="start", type=kst_day_arg, metavar="YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", type=kst_day_arg, metavar="YYYY-MM-DD")
+    parser.add_argument("--sort", choices=SORT_CHOICES, default="ratio",
+                        help="worst hit ratio (default), least savings, or most prompt tokens first")
+    parser.add_argument("--min-tokens", type=int, default=MIN_PROMPT_TOKENS,
+                        help="leave out groups with fewer prompt tokens")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    if not db_path().exists():
+        print(f"⚠️  No cumulative usage database found at {db_path()}")
+        print("   Run 'ccusage' first to initialize the database")
+        sys.exit(1)
+
+    db = load_database()
+    if args.by == "conversation":
+        if "conversations" not in db:
+            print("ℹ️  No conversation rollup yet (run 'ccusage' once to build it)")
+            sys.exit(1)
+        groups = group_conversations(db["conversations"], args.start, args.end)
+    else:
+        groups = group_buckets(db.get("buckets", {}), args.by, args.start, args.end)
+
+    overall = empty_counters()
+    for counters in groups.values():
+        for field in overall:
+            overall[field] += counters[field]
+    overall = cache_stats(overall)
+    rows = rank(groups, args.sort, args.min_tokens)
+
+    if args.json:
+        print(json.dumps({"group_by": args.by, "from": args.start, "to": args.end, "total": overall,
+                          "groups": [dict(stats, key=key) for key, stats in rows[:args.top]]},
+                         indent=2, ensure_ascii=False))
+    elif not rows:
+        print(f"ℹ️  No {args.by} with at least {args.min_tokens:,} prompt tokens in this range")
+    else:
+        display_cache(rows, overall, args.by, args.top)
+
+if __name__ == "__main__":
+    main()
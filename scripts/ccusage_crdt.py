@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Grow-only counter state for mergeable device snapshots
+
+Plain totals in data/*.json go backwards (or double up) when a device's DB
+is restored from an older backup. Each device therefore also publishes a
+grow-only counter state: per-day buckets whose counters only ever increase,
+keyed by the device UUID, plus a digest of its session set:
+
+    "counter_state": {
+      "version": 1,
+      "device_uuid": "6f1c...",
+      "fields": ["input_tokens", "output_tokens", "cache_creation_tokens",
+                 "cache_read_tokens", "sessions"],
+      "buckets": {"2025-10-01": [120, 3400, 56000, 780000, 42], ...},
+      "session_digest": {"count": 10997, "xor": "9a0c..."}
+    }
+
+Merging takes the element-wise maximum per (device, bucket, field), so any
+subset of snapshots merges in any order, idempotently, in
+O(devices x buckets): a stale snapshot can never lower a total, and the
+same snapshot seen twice never doubles it.
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import hashlib
+
+STATE_VERSION = 1
+FIELDS = ["input_tokens", "output_tokens", "cache_creation_tokens", "cache_read_tokens", "sessions"]
+
+def empty_digest():
+    """Digest of an empty session set"""
+    return {"count": 0, "xor": "0" * 32}
+
+def add_to_digest(digest, session_id):
+    """Fold one session ID into an order-independent set digest"""
+    value = int(digest["xor"], 16) ^ int(hashlib.md5(session_id.encode()).hexdigest(), 16)
+    digest["xor"] = f"{value:032x}"
+    digest["count"] += 1
+
+def counter_state(daily, device_uuid, session_digest):
+    """Build a device's counter state from its per-day counters"""
+    return {
+        "version": STATE_VERSION,
+        "device_uuid": device_uuid,
+        "fields": FIELDS,
+        "buckets": {day: [counters.get(field, 0) for field in FIELDS] for day, counters in daily.items()},
+        "session_digest": session_digest
+    }
+
+def merge_into(merged, state):
+    """Merge one snapshot into a fleet state {device_uuid: {"buckets", "session_digest"}}"""
+    device = merged.setdefault(state["device_uuid"], {"buckets": {}, "session_digest": empty_digest()})
+    buckets = device["buckets"]
+
+    for day, values in state.get("buckets", {}).items():
+        current = buckets.get(day)
+        if current is None:
+            buckets[day] = list(values)
+        else:
+            buckets[day] = [max(a, b) for a, b in zip(current, values)]
+
+    # The larger session set is the more complete history; equal counts
+    # (diverged copies) break the tie on the digest, so any order merges alike
+    digest = state.get("session_digest") or empty_digest()
+    current = device["session_digest"]
+    if (digest["count"], digest["xor"]) > (current["count"], current["xor"]):
+        device["session_digest"] = dict(digest)
+
+    return merged
+
+def merge_states(states):
+    """Merge any number of snapshots (order and duplicates don't matter)"""
+    merged = {}
+    for state in states:
+        merge_into(merged, state)
+    return merged
+
+def device_totals(device, start=None, end=None):
+    """Sum one merged device's buckets, optionally within [start, end]"""
+    totals = dict.fromkeys(FIELDS, 0)
+
+    for day, values in device["buckets"].items():
+        if (start and day < start) or (end and day > end):
+            continue
+        for field, value in zip(FIELDS, values):
+            totals[field] += value
+
+    return totals
+
+def daily_series(device):
+    """Per-day counters of one merged device as {day: {field: value}}"""
+    return {day: dict(zip(FIELDS, values)) for day, values in sorted(device["buckets"].items())}
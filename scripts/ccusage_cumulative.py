@@ -17,34 +17,71 @@ Built with Claude Code
 import sys
 import io
 import json
+import gzip
+import time
 import hashlib
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+from ccusage_settings import load_settings, parse_kst_date
+from ccusage_crdt import empty_digest, add_to_digest, counter_state
+from ccusage_history import migrate_from_db, record_run
+from ccusage_sources import iter_sources, record_containers, resume_offset, make_checkpoint
+from ccusage_dbformat import write_compact, read_compact, read_header, write_json, read_json
+
 # Korea Standard Time (UTC+9)
 KST = timezone(timedelta(hours=9))
 
-# Set UTF-8 encoding
-if sys.platform == 'win32':
+# Set UTF-8 encoding (once, even when imported by another ccusage script)
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 # Paths
-PROJECT_DIR = Path.home() / ".claude" / "projects"
-DB_FILE = Path.home() / ".claude" / "cumulative_usage.json"
-CUTOFF_DATE = datetime(2025, 10, 1, tzinfo=KST)
+DB_FILE = Path.home() / ".claude" / "cumulative_usage.json"  # legacy pretty JSON
+COMPACT_DB_FILE = Path.home() / ".claude" / "cumulative_usage.ccdb"  # header + gzip body
+TOTALS_FILE = Path.home() / ".claude" / "cumulative_totals.json"  # small sidecar for exporters
+SEGMENT_DIR = Path.home() / ".claude" / "cumulative_segments"
+SETTINGS = load_settings()
+CUTOFF_DATE = parse_kst_date(SETTINGS["cutoff_date"])
+DB_FORMAT = SETTINGS["db_format"]
+SEGMENT_SCHEMA = 1
+
+# Subcommands: `ccusage <command> ...` -> module providing main(argv)
+COMMANDS = {
+    "query": "ccusage_query",
+    "serve": "ccusage_serve",
+    "metrics": "ccusage_metrics",
+    "history": "ccusage_history",
+    "verify": "ccusage_verify",
+    "forecast": "ccusage_forecast",
+    "alerts": "ccusage_alerts",
+    "cache": "ccusage_cache",
+    "import": "ccusage_import"
+}
+
+def db_path():
+    """Path of the DB file in use: the configured format's, else whichever exists"""
+    preferred, other = (COMPACT_DB_FILE, DB_FILE) if DB_FORMAT == "compact" else (DB_FILE, COMPACT_DB_FILE)
+    if preferred.exists() or not other.exists():
+        return preferred
+    return other
 
 def load_database():
     """Load cumulative usage database"""
-    if DB_FILE.exists():
-        with open(DB_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    path = db_path()
+    if path.exists():
+        return read_compact(path) if path == COMPACT_DB_FILE else read_json(path)
+
+    return new_database()
 
-    # Initialize new database
+def new_database():
+    """Empty cumulative usage database"""
     return {
         "created_at": datetime.now(KST).isoformat(),
         "last_updated": datetime.now(KST).isoformat(),
-        "period_start": "2025-10-01",
+        "period_start": SETTINGS["cutoff_date"],
+        "generation": 0,  # bumped on every save
         "cumulative_usage": {
             "input_tokens": 0,
             "output_tokens": 0,
@@ -52,18 +89,275 @@ def load_database():
             "cache_read_tokens": 0,
             "total_sessions": 0
         },
-        "processed_sessions": {},  # session_id -> {tokens, timestamp}
-        "run_history": []
+        "processed_sessions": {},  # session_id -> {tokens, timestamp} (open month only)
+        "checkpoints": {},  # per-file read offsets for incremental scans
+        "segments": {},  # "YYYY-MM" -> [sealed part info]
+        "buckets": {},  # "YYYY-MM-DD" -> project -> model -> counters
+        "projects": {},  # project -> counters (all-time rollup)
+        "conversations": {},  # JSONL file stem -> project, first/last day, counters
+        "session_digest": empty_digest()  # XOR of all session IDs, for counter_state exports
     }
 
 def save_database(db):
-    """Save cumulative usage database"""
+    """Save cumulative usage database (atomically, in the configured format)"""
     db["last_updated"] = datetime.now(KST).isoformat()
+    db["generation"] = db.get("generation", 0) + 1
+
+    if DB_FORMAT == "compact":
+        path, other = COMPACT_DB_FILE, DB_FILE
+        write_compact(path, db)
+    else:
+        path, other = DB_FILE, COMPACT_DB_FILE
+        write_json(path, db)
+
+    save_totals(db, path)
+
+    # After a format switch, keep the old file only as a backup
+    if other.exists():
+        backup = other.with_name(other.name + ".bak")
+        other.replace(backup)
+        print(f"🗜️  Switched DB format to {DB_FORMAT} (previous file kept as {backup.name})")
+
+    print(f"\n✅ Database saved to: {path}")
+
+def session_month(timestamp_str):
+    """Return the KST month ("YYYY-MM") a session timestamp falls into"""
+    timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+    return timestamp.astimezone(KST).strftime('%Y-%m')
+
+def session_day(timestamp_str):
+    """Return the KST day ("YYYY-MM-DD") a session timestamp falls into"""
+    timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+    return timestamp.astimezone(KST).strftime('%Y-%m-%d')
+
+def load_segment(part):
+    """Load one sealed (gzip-compressed) month segment"""
+    with gzip.open(SEGMENT_DIR / part["file"], 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+def count_sealed_sessions(segments):
+    """Count sessions stored in sealed month segments"""
+    return sum(part["sessions"] for parts in segments.values() for part in parts)
+
+def is_sealed_session(segments, month, session_id, cache):
+    """Check a session ID against the sealed segments of its month
+
+    A month's segments are only decompressed the first time a record whose
+    timestamp falls into that month needs to be checked; `cache` keeps the
+    loaded digest sets for the rest of the scan.
+    """
+    if month not in segments:
+        return False
+
+    if month not in cache:
+        digests = set()
+        for part in segments[month]:
+            digests.update(load_segment(part)["sessions"])
+        cache[month] = digests
+
+    return session_id in cache[month]
+
+def file_sha256(path):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def seal_closed_months(db):
+    """Move sessions of closed months out of the hot DB into sealed segments
+
+    Each sealed part is immutable: late-arriving sessions for an already
+    sealed month are written as an additional part instead of rewriting it.
+    """
+    open_month = datetime.now(KST).strftime('%Y-%m')
+    processed_sessions = db.get("processed_sessions", {})
+    segments = db.setdefault("segments", {})
+
+    closed = {}
+    for session_id, session_data in processed_sessions.items():
+        month = session_month(session_data["timestamp"])
+        if month < open_month:
+            closed.setdefault(month, {})[session_id] = session_data
+
+    for month, sessions in sorted(closed.items()):
+        parts = segments.setdefault(month, [])
+        part_file = f"{month}.{len(parts)}.json.gz"
+
+        totals = {
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_creation_tokens": 0,
+            "cache_read_tokens": 0,
+            "total_sessions": len(sessions)
+        }
+        for session_data in sessions.values():
+            totals["input_tokens"] += session_data["input_tokens"]
+            totals["output_tokens"] += session_data["output_tokens"]
+            totals["cache_creation_tokens"] += session_data["cache_creation_tokens"]
+            totals["cache_read_tokens"] += session_data["cache_read_tokens"]
+
+        segment = {
+            "schema": SEGMENT_SCHEMA,
+            "month": month,
+            "sealed_at": datetime.now(KST).isoformat(),
+            "totals": totals,
+            "sessions": sessions
+        }
+
+        # Write to a temp file first so a crash never leaves a half-written part
+        SEGMENT_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = SEGMENT_DIR / (part_file + ".tmp")
+        with gzip.open(tmp_file, 'wt', encoding='utf-8') as f:
+            json.dump(segment, f, separators=(',', ':'), ensure_ascii=False)
+        tmp_file.replace(SEGMENT_DIR / part_file)
+
+        parts.append({
+            "file": part_file,
+            "sealed_at": segment["sealed_at"],
+            "sessions": len(sessions),
+            "totals": totals,
+            "sha256": file_sha256(SEGMENT_DIR / part_file)  # lets `ccusage verify` skip decoding
+        })
+
+        for session_id in sessions:
+            del processed_sessions[session_id]
+
+        print(f"📦 Sealed {len(sessions):,} sessions from {month} → {part_file}")
+
+def empty_counters():
+    """Return a zeroed token counter bucket"""
+    return {
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cache_creation_tokens": 0,
+        "cache_read_tokens": 0,
+        "sessions": 0
+    }
 
-    with open(DB_FILE, 'w', encoding='utf-8') as f:
-        json.dump(db, f, indent=2, ensure_ascii=False)
+def add_to_buckets(buckets, session_data):
+    """Add one session to the day/project/model time buckets"""
+    day = session_day(session_data["timestamp"])
+    project = session_data.get("project", "unknown")
+    model = session_data.get("model", "unknown")
+
+    by_project = buckets.setdefault(day, {}).setdefault(project, {})
+    counters = by_project.get(model)
+    if counters is None:
+        counters = by_project[model] = empty_counters()
+
+    add_session(counters, session_data)
+
+def add_session(counters, session_data):
+    """Add one session's tokens to a counter bucket"""
+    counters["input_tokens"] += session_data["input_tokens"]
+    counters["output_tokens"] += session_data["output_tokens"]
+    counters["cache_creation_tokens"] += session_data["cache_creation_tokens"]
+    counters["cache_read_tokens"] += session_data["cache_read_tokens"]
+    counters["sessions"] += 1
+
+def add_to_projects(projects, session_data):
+    """Add one session to the per-project rollup"""
+    project = session_data.get("project", "unknown")
+    counters = projects.get(project)
+    if counters is None:
+        counters = projects[project] = empty_counters()
+
+    add_session(counters, session_data)
+
+def add_to_conversations(conversations, session_data):
+    """Add one session to the per-conversation (JSONL file) rollup"""
+    key = session_data["file"].rsplit('.', 1)[0]
+    day = session_day(session_data["timestamp"])
+    conversation = conversations.get(key)
+    if conversation is None:
+        conversation = conversations[key] = {
+            "project": session_data.get("project", "unknown"), "first_day": day, "last_day": day,
+            **empty_counters()
+        }
+
+    conversation["first_day"] = min(conversation["first_day"], day)
+    conversation["last_day"] = max(conversation["last_day"], day)
+    add_session(conversation, session_data)
+
+def rebuild_conversations(db):
+    """Build the per-conversation rollup from stored session records (one-time migration)"""
+    conversations = {}
+
+    for session_data in db.get("processed_sessions", {}).values():
+        add_to_conversations(conversations, session_data)
+
+    for parts in db.get("segments", {}).values():
+        for part in parts:
+            for session_data in load_segment(part)["sessions"].values():
+                add_to_conversations(conversations, session_data)
+
+    db["conversations"] = conversations
+    print(f"🗂️  Built cache rollups for {len(conversations)} conversations")
+
+def rebuild_projects(db):
+    """Build the per-project rollup from the time buckets (one-time migration)"""
+    projects = {}
+
+    for by_project in db.get("buckets", {}).values():
+        for project, by_model in by_project.items():
+            counters = projects.setdefault(project, empty_counters())
+            for model_counters in by_model.values():
+                for key in counters:
+                    counters[key] += model_counters[key]
+
+    db["projects"] = projects
+
+def rebuild_buckets(db):
+    """Build time buckets from stored session records (hot and sealed)
+
+    Used once to migrate databases created before buckets existed. Sessions
+    recorded back then carry no project/model and land in "unknown".
+    """
+    buckets = {}
+
+    for session_data in db.get("processed_sessions", {}).values():
+        add_to_buckets(buckets, session_data)
+
+    for parts in db.get("segments", {}).values():
+        for part in parts:
+            for session_data in load_segment(part)["sessions"].values():
+                add_to_buckets(buckets, session_data)
+
+    db["buckets"] = buckets
+    print(f"🗂️  Built time buckets for {len(buckets)} days")
+
+def rebuild_session_digest(db):
+    """Build the session-set digest from stored session IDs (one-time migration)"""
+    digest = empty_digest()
+
+    for session_id in db.get("processed_sessions", {}):
+        add_to_digest(digest, session_id)
+
+    for parts in db.get("segments", {}).values():
+        for part in parts:
+            for session_id in load_segment(part)["sessions"]:
+                add_to_digest(digest, session_id)
+
+    db["session_digest"] = digest
+
+def daily_totals(buckets, start=None, end=None):
+    """Collapse time buckets into per-day counters, optionally within [start, end]"""
+    daily = {}
+
+    for day, by_project in buckets.items():
+        if (start and day < start) or (end and day > end):
+            continue
+
+        totals = empty_counters()
+        for by_model in by_project.values():
+            for counters in by_model.values():
+                for key in totals:
+                    totals[key] += counters[key]
+        daily[day] = totals
 
-    print(f"\n✅ Database saved to: {DB_FILE}")
+    return dict(sorted(daily.items()))
 
 def create_session_id(file_path, timestamp, usage_data):
     """Create unique session ID"""
@@ -71,9 +365,50 @@ def create_session_id(file_path, timestamp, usage_data):
     unique_str = f"{file_path.name}_{timestamp}_{usage_data.get('input_tokens', 0)}_{usage_data.get('output_tokens', 0)}"
     return hashlib.md5(unique_str.encode()).hexdigest()
 
+def parse_usage_record(jsonl_file, project, line):
+    """Parse one JSONL line into (session_id, session_data), or None if it carries no usage
+
+    Raises ValueError (json.JSONDecodeError included) for malformed lines
+    and unparseable timestamps.
+    """
+    data = json.loads(line)
+
+    # Check timestamp
+    if 'timestamp' not in data:
+        return None
+
+    timestamp_str = data['timestamp']
+    timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+
+    # Only count from the configured cutoff date onwards
+    if timestamp < CUTOFF_DATE:
+        return None
+
+    # Extract usage
+    if 'message' not in data or 'usage' not in data['message']:
+        return None
+
+    usage = data['message']['usage']
+    session_id = create_session_id(jsonl_file, timestamp_str, usage)
+    session_data = {
+        "file": jsonl_file.name,
+        "project": project,
+        "model": data['message'].get('model', 'unknown'),
+        "timestamp": timestamp_str,
+        "input_tokens": usage.get('input_tokens', 0),
+        "output_tokens": usage.get('output_tokens', 0),
+        "cache_creation_tokens": usage.get('cache_creation_input_tokens', 0),
+        "cache_read_tokens": usage.get('cache_read_input_tokens', 0)
+    }
+    return session_id, session_data
+
 def scan_sessions(db):
-    """Scan for new sessions and add to cumulative total"""
-    jsonl_files = list(PROJECT_DIR.glob("**/*.jsonl"))
+    """Scan for new sessions and add to cumulative total
+
+    Returns (new_sessions, new_tokens, scan_stats, new_daily) where
+    new_daily holds the new sessions' counters per KST day.
+    """
+    scan_started = time.perf_counter()
 
     new_sessions = 0
     new_tokens = {
@@ -82,74 +417,106 @@ def scan_sessions(db):
         "cache_creation_tokens": 0,
         "cache_read_tokens": 0
     }
+    new_daily = {}
 
-    processed_sessions = db.get("processed_sessions", {})
+    if "buckets" not in db:
+        rebuild_buckets(db)
+    if "projects" not in db:
+        rebuild_projects(db)
+    if "conversations" not in db:
+        rebuild_conversations(db)
+    if "session_digest" not in db:
+        rebuild_session_digest(db)
 
-    print(f"🔍 Scanning {len(jsonl_files)} JSONL files...")
-    print(f"📊 Previously processed sessions: {len(processed_sessions)}")
+    processed_sessions = db.get("processed_sessions", {})
+    segments = db.get("segments", {})
+    buckets = db["buckets"]
+    projects = db["projects"]
+    conversations = db["conversations"]
+    digest = db["session_digest"]
+    sealed_cache = {}
+
+    # Checkpoints only hold for the cutoff they were read with
+    if db.get("checkpoints", {}).get("cutoff_date") != SETTINGS["cutoff_date"]:
+        db["checkpoints"] = {"cutoff_date": SETTINGS["cutoff_date"], "files": {}}
+    checkpoints = db["checkpoints"]["files"]
+    containers = db["checkpoints"].setdefault("containers", {})
+    inventory = db["checkpoints"].setdefault("dirs", {})
+
+    print("🔍 Scanning log files...")
+    print(f"📊 Previously processed sessions: {len(processed_sessions) + count_sealed_sessions(segments)}"
+          f" ({len(processed_sessions)} hot, {len(segments)} sealed months)")
     print()
 
-    # Process each file
-    for jsonl_file in jsonl_files:
+    # Process each file as the walk finds it (only the bytes appended since its checkpoint)
+    sources = []
+    files_unchanged = 0
+    bytes_read = 0
+    failed_keys = set()
+    for source in iter_sources(SETTINGS, containers, inventory):
+        sources.append(source)
+        log_file = Path(source.name)
         try:
-            with open(jsonl_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if not line.strip():
+            start = resume_offset(source, checkpoints.get(source.key))
+            if start is None:
+                files_unchanged += 1
+                continue
+
+            end = start
+            for raw_line, end in source.read_complete_lines(start):
+                line = raw_line.decode('utf-8', errors='replace')
+                if not line.strip():
+                    continue
+
+                try:
+                    record = parse_usage_record(log_file, source.project, line)
+                    if not record:
                         continue
 
-                    try:
-                        data = json.loads(line)
-
-                        # Check timestamp
-                        if 'timestamp' in data:
-                            timestamp_str = data['timestamp']
-                            timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-
-                            # Only count from October 1, 2025 onwards
-                            if timestamp < CUTOFF_DATE:
-                                continue
-                        else:
-                            continue
-
-                        # Extract usage
-                        if 'message' in data and 'usage' in data['message']:
-                            usage = data['message']['usage']
-
-                            # Create unique session ID
-                            session_id = create_session_id(jsonl_file, timestamp_str, usage)
-
-                            # Skip if already processed
-                            if session_id in processed_sessions:
-                                continue
-
-                            # New session found!
-                            session_data = {
-                                "file": jsonl_file.name,
-                                "timestamp": timestamp_str,
-                                "input_tokens": usage.get('input_tokens', 0),
-                                "output_tokens": usage.get('output_tokens', 0),
-                                "cache_creation_tokens": usage.get('cache_creation_input_tokens', 0),
-                                "cache_read_tokens": usage.get('cache_read_input_tokens', 0)
-                            }
-
-                            # Add to processed sessions
-                            processed_sessions[session_id] = session_data
-
-                            # Add to new tokens count
-                            new_tokens["input_tokens"] += session_data["input_tokens"]
-                            new_tokens["output_tokens"] += session_data["output_tokens"]
-                            new_tokens["cache_creation_tokens"] += session_data["cache_creation_tokens"]
-                            new_tokens["cache_read_tokens"] += session_data["cache_read_tokens"]
-
-                            new_sessions += 1
-
-                    except json.JSONDecodeError:
+                    session_id, session_data = record
+
+                    # Skip if already processed (hot month first, then sealed months)
+                    if session_id in processed_sessions:
+                        continue
+                    if is_sealed_session(segments, session_month(session_data["timestamp"]),
+                                         session_id, sealed_cache):
                         continue
 
+                    # Add to processed sessions, time buckets and project/conversation rollups
+                    processed_sessions[session_id] = session_data
+                    add_to_buckets(buckets, session_data)
+                    add_to_projects(projects, session_data)
+                    add_to_conversations(conversations, session_data)
+                    add_to_digest(digest, session_id)
+                    add_session(new_daily.setdefault(session_day(session_data["timestamp"]), empty_counters()),
+                                session_data)
+
+                    # Add to new tokens count
+                    new_tokens["input_tokens"] += session_data["input_tokens"]
+                    new_tokens["output_tokens"] += session_data["output_tokens"]
+                    new_tokens["cache_creation_tokens"] += session_data["cache_creation_tokens"]
+                    new_tokens["cache_read_tokens"] += session_data["cache_read_tokens"]
+
+                    new_sessions += 1
+
+                except ValueError:  # bad JSON or timestamp: skip the line, not the rest of the file
+                    continue
+
+            checkpoints[source.key] = make_checkpoint(source, end)
+            bytes_read += end - start
+
         except Exception as e:
-            print(f"⚠️  Error reading {jsonl_file.name}: {e}")
+            print(f"⚠️  Error reading {source.member or Path(source.path).name}: {e}")
+            failed_keys.add(source.key)
             continue
 
+    record_containers(containers, sources, failed_keys)
+
+    print(f"📂 {len(sources)} log files found")
+    if files_unchanged:
+        print(f"⏭️  {files_unchanged} unchanged files skipped")
+    print()
+
     # Update database
     db["processed_sessions"] = processed_sessions
 
@@ -161,7 +528,91 @@ def scan_sessions(db):
     cumulative["cache_read_tokens"] += new_tokens["cache_read_tokens"]
     cumulative["total_sessions"] += new_sessions
 
-    return new_sessions, new_tokens
+    scan_stats = {
+        "scan_seconds": round(time.perf_counter() - scan_started, 3),
+        "files_scanned": len(sources),
+        "files_skipped": files_unchanged,
+        "bytes_read": bytes_read
+    }
+
+    return new_sessions, new_tokens, scan_stats, new_daily
+
+def build_totals(db):
+    """Everything the exporters need, sized by days and projects rather than sessions"""
+    if "session_digest" not in db:
+        rebuild_session_digest(db)
+
+    cumulative = db["cumulative_usage"]
+    return {
+        "generation": db.get("generation", 0),
+        "last_updated": db["last_updated"],
+        "period_start": db.get("period_start", SETTINGS["cutoff_date"]),
+        "cumulative_usage": cumulative,
+        "estimated_cost": round(calculate_cost(cumulative), 2),
+        "daily": daily_totals(db.get("buckets", {})),
+        "projects": project_rollups(db),
+        "session_digest": db["session_digest"]
+    }
+
+def save_totals(db, db_file):
+    """Write the sidecar totals file right after the DB (atomically)
+
+    It records the DB's generation and stat so readers can tell whether the
+    sidecar still describes the DB next to it.
+    """
+    totals = build_totals(db)
+    stat = db_file.stat()
+    totals["db_file"] = db_file.name
+    totals["db_stat"] = [stat.st_size, stat.st_mtime_ns]
+
+    tmp_file = TOTALS_FILE.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(totals, f, ensure_ascii=False, separators=(',', ':'))
+    tmp_file.replace(TOTALS_FILE)
+    return totals
+
+def load_totals():
+    """Load the sidecar totals, or None if there is no DB yet
+
+    O(1) in the history size: the sidecar is trusted when the DB's size and
+    mtime still match, or (for a compact DB that was touched or copied) when
+    its header generation matches. Otherwise the sidecar is stale (e.g. a
+    crash between the two writes, or an older tracker version saved the DB)
+    and is rebuilt from a full load.
+    """
+    path = db_path()
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+
+    try:
+        with open(TOTALS_FILE, 'r', encoding='utf-8') as f:
+            totals = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        totals = None
+
+    if totals and totals.get("db_file") == path.name:
+        if totals.get("db_stat") == [stat.st_size, stat.st_mtime_ns]:
+            return totals
+        if path == COMPACT_DB_FILE and read_header(path).get("generation") == totals.get("generation"):
+            return totals
+
+    print("🔄 Totals sidecar missing or stale, rebuilding from the DB")
+    return save_totals(load_database(), path)
+
+def export_counter_state(totals, device_uuid):
+    """Grow-only per-day counter state for device JSON export"""
+    return counter_state(totals["daily"], device_uuid, totals["session_digest"])
+
+def project_rollups(db):
+    """Per-project counters with estimated cost, for device JSON export"""
+    rollups = {}
+
+    for project, counters in db.get("projects", {}).items():
+        rollups[project] = dict(counters, estimated_cost=round(calculate_cost(counters), 2))
+
+    return rollups
 
 def calculate_cost(usage):
     """Calculate estimated cost"""
@@ -177,7 +628,7 @@ def display_results(db, new_sessions, new_tokens):
 
     print("=" * 70)
     print("📈 CUMULATIVE CLAUDE USAGE (PERMANENT RECORD)")
-    print(f"Period: October 1, 2025 - {datetime.now(KST).strftime('%B %d, %Y')}")
+    print(f"Period: {CUTOFF_DATE.strftime('%B %d, %Y')} - {datetime.now(KST).strftime('%B %d, %Y')}")
     print("=" * 70)
     print()
 
@@ -214,6 +665,15 @@ def display_results(db, new_sessions, new_tokens):
     print(f"  Cache Read:          {cumulative['cache_read_tokens']:,}")
     print()
 
+    projects = db.get("projects", {})
+    if projects:
+        top_projects = sorted(projects.items(), key=lambda item: calculate_cost(item[1]), reverse=True)[:5]
+        print("📁 TOP PROJECTS:")
+        for project, counters in top_projects:
+            processed = counters['input_tokens'] + counters['output_tokens'] + counters['cache_creation_tokens']
+            print(f"  {project[:40]:<40} {processed:>14,}  ${calculate_cost(counters):.2f}")
+        print()
+
     total_cost = calculate_cost(cumulative)
 
     print("💵 CUMULATIVE ESTIMATED COST (Sonnet 4.5):")
@@ -231,13 +691,18 @@ def display_results(db, new_sessions, new_tokens):
     print()
     print("=" * 70)
     print()
-    print("ℹ️  Database location: " + str(DB_FILE))
+    print("ℹ️  Database location: " + str(db_path()))
     print("⚠️  This count is CUMULATIVE and PERMANENT")
     print("   Even if .jsonl files are deleted, counts remain!")
     print("=" * 70)
 
 def main():
     """Main execution"""
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        module = __import__(COMMANDS[sys.argv[1]])
+        module.main(sys.argv[2:])
+        return
+
     print("🚀 Cumulative Claude Usage Tracker")
     print()
 
@@ -245,23 +710,31 @@ def main():
     db = load_database()
 
     # Scan for new sessions
-    new_sessions, new_tokens = scan_sessions(db)
+    new_sessions, new_tokens, scan_stats, new_daily = scan_sessions(db)
+
+    # Run history lives in its own append-only log (ccusage_history.py)
+    migrate_from_db(db)
 
-    # Add run history
-    if "run_history" not in db:
-        db["run_history"] = []
+    # Seal closed months so only the open month is rewritten from now on
+    seal_closed_months(db)
 
-    db["run_history"].append({
+    # Save database
+    save_database(db)
+
+    record_run({
         "timestamp": datetime.now(KST).isoformat(),
         "new_sessions": new_sessions,
-        "new_tokens": new_tokens
+        "new_tokens": new_tokens,
+        **scan_stats
     })
 
-    # Keep only last 100 runs in history
-    db["run_history"] = db["run_history"][-100:]
-
-    # Save database
-    save_database(db)
+    # Budget rules run on this scan's per-day deltas only. The DB is already
+    # saved: a failing rule must not fail the run (auto_sync would skip the export)
+    from ccusage_alerts import check_alerts
+    try:
+        check_alerts(db, new_daily)
+    except Exception as e:
+        print(f"⚠️  Alert check failed: {e}")
 
     # Display results
     display_results(db, new_sessions, new_tokens)
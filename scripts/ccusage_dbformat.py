@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compact, schema-versioned on-disk format for the cumulative DB
+
+The legacy DB is pretty-printed JSON (`indent=2`), so every command parses
+megabytes of whitespace and session records just to read five totals. The
+compact format is one JSON header line followed by the gzip-compressed,
+minified DB:
+
+    {"format":"ccusage-db","schema":2,"compression":"gzip","generation":42,
+     "last_updated":"...","period_start":"2025-10-01",
+     "cumulative_usage":{...},"session_digest":{...}}\\n
+    <gzip(minified JSON of the whole DB)>
+
+Readers that only need totals stop after the first line (`read_header`).
+`ccusage_bench.py dbformat` compares load times against the legacy format.
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import json
+import gzip
+
+FORMAT_NAME = "ccusage-db"
+DB_SCHEMA = 2
+COMPRESS_LEVEL = 6
+HEADER_KEYS = ["generation", "created_at", "last_updated", "period_start", "cumulative_usage", "session_digest"]
+
+def build_header(db):
+    """Header line contents: schema plus the DB's small top-level fields"""
+    header = {"format": FORMAT_NAME, "schema": DB_SCHEMA, "compression": "gzip"}
+    header.update({key: db[key] for key in HEADER_KEYS if key in db})
+    return header
+
+def check_header(header):
+    """Reject files written by another tool or a newer schema"""
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError("not a ccusage compact DB")
+    if header.get("schema", 0) > DB_SCHEMA:
+        raise ValueError(f"DB schema {header['schema']} is newer than this version ({DB_SCHEMA}); update the scripts")
+    if header.get("compression") != "gzip":
+        raise ValueError(f"unsupported compression: {header.get('compression')}")
+
+def write_compact(path, db):
+    """Write the DB atomically in the compact format"""
+    header = json.dumps(build_header(db), ensure_ascii=False, separators=(',', ':'))
+    body = json.dumps(db, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    tmp_file = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_file, 'wb') as f:
+        f.write(header.encode('utf-8') + b'\n')
+        f.write(gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0))
+    tmp_file.replace(path)
+
+def read_header(path):
+    """Read only the header line (totals, generation) of a compact DB"""
+    with open(path, 'rb') as f:
+        header = json.loads(f.readline())
+    check_header(header)
+    return header
+
+def read_compact(path):
+    """Read the whole DB from the compact format"""
+    with open(path, 'rb') as f:
+        header = json.loads(f.readline())
+        check_header(header)
+        body = gzip.decompress(f.read())
+    return json.loads(body)
+
+def write_json(path, db):
+    """Write the DB atomically in the legacy pretty-printed JSON format"""
+    tmp_file = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(db, f, indent=2, ensure_ascii=False)
+    tmp_file.replace(path)
+
+def read_json(path):
+    """Read a legacy JSON DB"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Goal forecasting over the daily usage series (`ccusage forecast`)
+
+The old projection was a flat average: total processed / days elapsed x
+total days. That ignores weekday/weekend cycles and ramp-ups. Forecasts
+are now made from the fleet's per-day processed tokens (input + output +
+cache creation, from the merged counter states) with three models:
+
+    ewma      exponentially weighted level (recent days count most)
+    linear    least-squares trend over the last 4 weeks
+    weekday   per-weekday mean over the last 8 weeks
+
+Each model is backtested on the last two weeks of history (fit on the days
+before, predict the held-out days) and the one with the lowest mean
+absolute error is used. Everything is O(days).
+
+Goals come from ccusage_settings.goal_list: several named goals, each with
+its own start and deadline.
+
+Usage:
+    ccusage forecast                  # all goals
+    ccusage forecast --json
+    ccusage forecast --write PATH     # precomputed JSON for the web page
+    ccusage forecast --publish        # write forecast.json into the sync repo and push it
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import sys
+import json
+import argparse
+import contextlib
+from pathlib import Path
+from datetime import datetime, date, timezone, timedelta
+
+from ccusage_crdt import FIELDS
+
+# Korea Standard Time (UTC+9)
+KST = timezone(timedelta(hours=9))
+
+PROCESSED_FIELDS = ["input_tokens", "output_tokens", "cache_creation_tokens"]
+EWMA_ALPHA = 0.3
+LINEAR_WINDOW = 28  # days the trend line is fitted over
+SEASON_WEEKS = 8  # weeks averaged per weekday
+BACKTEST_DAYS = 14
+MIN_BACKTEST_DAYS = 3
+ETA_HORIZON_DAYS = 365  # how far past today an ETA is searched for
+FORECAST_FILE = "forecast.json"  # in the sync repo root, next to data/
+
+def processed_series(states):
+    """Per-day processed tokens summed over merged device states {uuid: {"buckets"}}"""
+    indexes = [FIELDS.index(field) for field in PROCESSED_FIELDS]
+    series = {}
+    for device in states.values():
+        for day, values in device["buckets"].items():
+            series[day] = series.get(day, 0) + sum(values[i] for i in indexes)
+    return series
+
+def dense_history(series, first_day, last_day):
+    """Values for every day in [first_day, last_day], zero where nothing was recorded"""
+    days = (last_day - first_day).days + 1
+    return [series.get((first_day + timedelta(days=offset)).isoformat(), 0) for offset in range(days)]
+
+def forecast_ewma(history, first_day, horizon):
+    """Flat forecast at the exponentially weighted level"""
+    level = history[0]
+    for value in history[1:]:
+        level = EWMA_ALPHA * value + (1 - EWMA_ALPHA) * level
+    return [level] * horizon
+
+def forecast_linear(history, first_day, horizon):
+    """Least-squares trend over the last LINEAR_WINDOW days, clipped at zero"""
+    window = history[-LINEAR_WINDOW:]
+    n = len(window)
+    if n < 2:
+        return [float(window[0])] * horizon
+
+    mean_x = (n - 1) / 2
+    mean_y = sum(window) / n
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(window))
+    variance = sum((x - mean_x) ** 2 for x in range(n))
+    slope = covariance / variance
+    intercept = mean_y - slope * mean_x
+    return [max(0.0, intercept + slope * (n + step)) for step in range(horizon)]
+
+def forecast_weekday(history, first_day, horizon):
+    """Mean of the same weekday over the last SEASON_WEEKS weeks"""
+    start = max(0, len(history) - SEASON_WEEKS * 7)
+    sums = [0] * 7
+    counts = [0] * 7
+    for index in range(start, len(history)):
+        weekday = (first_day + timedelta(days=index)).weekday()
+        sums[weekday] += history[index]
+        counts[weekday] += 1
+
+    overall = sum(sums) / max(1, sum(counts))
+    means = [sums[wd] / counts[wd] if counts[wd] else overall for wd in range(7)]
+    next_day = first_day + timedelta(days=len(history))
+    return [means[(next_day + timedelta(days=step)).weekday()] for step in range(horizon)]
+
+MODELS = {
+    "ewma": forecast_ewma,
+    "linear": forecast_linear,
+    "weekday": forecast_weekday
+}
+
+def backtest(history, first_day):
+    """Mean absolute daily error of each model on the held-out last days
+
+    Returns ({model: error}, best model). With too little history every
+    model is untested and the EWMA level is used.
+    """
+    holdout = min(BACKTEST_DAYS, len(history) // 3)
+    if holdout < MIN_BACKTEST_DAYS:
+        return {}, "ewma"
+
+    train, actual = history[:-holdout], history[-holdout:]
+    errors = {}
+    for name, model in MODELS.items():
+        predicted = model(train, first_day, holdout)
+        errors[name] = round(sum(abs(p - a) for p, a in zip(predicted, actual)) / holdout, 1)
+
+    return errors, min(errors, key=errors.get)
+
+def forecast_goal(goal, series, today, model_name, predictions, observed=None, series_complete=True):
+    """Progress and projection for one goal
+
+    `predictions` are the chosen model's per-day values starting at today
+    (today's share is what is still expected on top of what was already
+    recorded today). `observed` is a fleet total for the whole period,
+    counting devices that publish no daily series; it only backs a goal
+    whose window contains today, since it includes usage after any earlier
+    deadline. Otherwise a series that does not cover every device
+    (`series_complete`) undercounts, and the goal is marked `partial`:
+    `done` is then a lower bound.
+    """
+    start = date.fromisoformat(goal["start"])
+    deadline = date.fromisoformat(goal["deadline"])
+    tokens = goal["tokens"]
+
+    done = sum(value for day, value in series.items()
+               if goal["start"] <= day <= min(today, deadline).isoformat())
+    observed_applies = observed is not None and start <= today <= deadline
+    if observed_applies:
+        done = max(done, observed)
+    partial = not series_complete and not observed_applies
+
+    days_left = max(0, (deadline - max(today, start)).days + 1)
+    remaining = tokens - done
+
+    # Walk the predicted days once: projected total at the deadline and the ETA
+    # (there is none to find for a goal that is already reached)
+    projected = done
+    eta = None
+    cumulative = done
+    for offset, value in enumerate(predictions):
+        day = today + timedelta(days=offset)
+        if day < start:
+            continue
+        if offset == 0:
+            value = max(0.0, value - series.get(day.isoformat(), 0))
+        cumulative += value
+        if day <= deadline:
+            projected = cumulative
+        if eta is None and remaining > 0 and cumulative >= tokens:
+            eta = day.isoformat()
+        if (eta or remaining <= 0) and day >= deadline:
+            break
+
+    return {
+        "name": goal["name"],
+        "tokens": tokens,
+        "start": goal["start"],
+        "deadline": goal["deadline"],
+        "done": done,
+        "remaining": remaining,
+        "progress_pct": round(done / tokens * 100, 2) if tokens else 0,
+        "partial": partial,
+        "days_left": days_left,
+        "daily_needed": round(remaining / days_left) if days_left and remaining > 0 else 0,
+        "model": model_name,
+        "expected_daily": round(predictions[1] if len(predictions) > 1 else 0),
+        "projected_total": round(projected),
+        "on_track": projected >= tokens,
+        "eta": eta
+    }
+
+def build_forecast(series, goals, today=None, observed=None, observed_start=None):
+    """Forecast every goal from one per-day series {YYYY-MM-DD: processed tokens}
+
+    History runs from the first recorded day through yesterday (today is
+    still partial). `observed` (a fleet total since `observed_start`)
+    applies to goals that start on or before it. A series that sums to
+    less than `observed` is missing devices (files without counter_state).
+    """
+    today = today or datetime.now(KST).date()
+    series_complete = observed is None or sum(series.values()) >= observed
+    days = sorted(day for day in series if day < today.isoformat())
+
+    errors, model_name = {}, None
+    predictions = []
+    last_deadline = max(date.fromisoformat(goal["deadline"]) for goal in goals)
+    horizon = max((last_deadline - today).days + 1, ETA_HORIZON_DAYS)
+
+    if days:
+        first_day = date.fromisoformat(days[0])
+        history = dense_history(series, first_day, today - timedelta(days=1))
+        errors, model_name = backtest(history, first_day)
+        predictions = MODELS[model_name](history, first_day, horizon)
+
+    return {
+        "generated_at": datetime.now(KST).isoformat(),
+        "today": today.isoformat(),
+        "history_days": len(days),
+        "backtest_mae": errors,
+        "goals": [forecast_goal(goal, series, today, model_name, predictions,
+                                observed if observed_start and goal["start"] <= observed_start else None,
+                                series_complete)
+                  for goal in goals]
+    }
+
+def display_forecast(forecast):
+    """Print every goal's progress and projection"""
+    print("=" * 70)
+    print(f"🔮 GOAL FORECAST ({forecast['history_days']} days of history)")
+    print("=" * 70)
+
+    if forecast["backtest_mae"]:
+        errors = ', '.join(f"{name} {error / 1_000_000:.2f}M" for name, error in forecast["backtest_mae"].items())
+        print(f"   Backtest (mean abs. daily error): {errors}")
+
+    for goal in forecast["goals"]:
+        print()
+        print(f"🎯 {goal['name']}: {goal['tokens'] / 1_000_000:g}M tokens, {goal['start']} → {goal['deadline']}")
+        print(f"   Done:       {goal['done'] / 1_000_000:.2f}M ({goal['progress_pct']:.1f}%)")
+        if goal["partial"]:
+            print("               (at least: some devices publish no daily series)")
+        if goal["days_left"]:
+            print(f"   Needed:     {goal['daily_needed'] / 1_000_000:.2f}M/day for {goal['days_left']} days")
+        if goal["model"]:
+            print(f"   Expected:   {goal['expected_daily'] / 1_000_000:.2f}M/day ({goal['model']})")
+            print(f"   Projected:  {goal['projected_total'] / 1_000_000:.2f}M by {goal['deadline']}")
+
+        if goal["remaining"] <= 0:
+            print("   🎉 GOAL ACHIEVED!")
+        elif not goal["days_left"] and goal["partial"]:
+            print("   ❓ Result unknown (daily series incomplete)")
+        elif not goal["days_left"]:
+            print(f"   ❌ Goal not met (short by {goal['remaining'] / 1_000_000:.2f}M)")
+        elif goal["on_track"]:
+            print(f"   ✅ ON TRACK (ETA {goal['eta']})")
+        else:
+            eta = f"ETA {goal['eta']}" if goal["eta"] else "not reached within a year"
+            print(f"   ⚠️  BEHIND PACE ({eta})")
+
+    print()
+    print("=" * 70)
+
+def write_forecast(path, forecast):
+    """Write the precomputed forecast atomically"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(forecast, f, indent=2, ensure_ascii=False)
+    tmp_file.replace(path)
+
+def main(argv=None):
+    """Main execution"""
+    from ccusage_goal import load_config, load_all_devices, goal_forecast
+
+    parser = argparse.ArgumentParser(prog="ccusage forecast", description="Forecast goal progress")
+    parser.add_argument("--json", action="store_true", help="print the forecast as JSON")
+    parser.add_argument("--write", metavar="PATH", help="write the forecast JSON to PATH")
+    parser.add_argument("--publish", action="store_true",
+                        help=f"write {FORECAST_FILE} into the sync repo and queue it for push")
+    args = parser.parse_args(argv)
+
+    # aggregation progress output must not end up in --json output
+    with contextlib.redirect_stdout(sys.stderr):
+        cumulative, devices, series = load_all_devices()
+    forecast = goal_forecast(cumulative, series)
+
+    if args.write:
+        write_forecast(args.write, forecast)
+        print(f"✅ Forecast written to {args.write}")
+
+    if args.publish:
+        from ccusage_identity import load_identity
+        from ccusage_sync_queue import enqueue_export, start_background_worker
+
+        repo_path = Path(load_config()['repo_path'])
+        write_forecast(repo_path / FORECAST_FILE, forecast)
+        enqueue_export(repo_path, load_identity()["label"], repo_path / FORECAST_FILE, reason="forecast")
+        start_background_worker()
+        print(f"✅ Forecast queued for push: {repo_path / FORECAST_FILE}")
+
+    if args.json:
+        print(json.dumps(forecast, indent=2, ensure_ascii=False))
+    elif not args.write and not args.publish:
+        display_forecast(forecast)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
 """
-Check progress toward 100M token goal by December 31, 2025
+Check progress toward the token goal (default: 100M by December 31, 2025)
 Uses multi-device total (all devices combined)
 
+Goals come from ccusage_settings (goal_tokens/goal_deadline, or several
+named goals in "goals"); the first one is shown in detail. Projections
+use the trend models in ccusage_forecast.py instead of a flat average.
+
+Usage:
+    ccusage-goal
+    ccusage-goal --cached    # instant answer from the last snapshot (ccusage_mirror.py)
+
 Created & Directed by Bohee Lee
 https://github.com/bohee-connectome
 
@@ -12,21 +20,35 @@ Built with Claude Code
 import sys
 import io
 import json
+import argparse
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+from ccusage_settings import load_settings, parse_kst_date, goal_list
+from ccusage_total import read_all_devices, combine_devices
+from ccusage_crdt import merge_into
+from ccusage_forecast import processed_series, build_forecast
+from ccusage_cumulative import load_totals
+from ccusage_identity import load_identity
+from ccusage_sync import build_export_data
+from ccusage_mirror import cached_view, save_snapshot
+
 # Korea Standard Time (UTC+9)
 KST = timezone(timedelta(hours=9))
 
 # Set UTF-8 encoding
-if sys.platform == 'win32':
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 # Paths
 CONFIG_FILE = Path.home() / ".claude" / "usage_sync_config.json"
-GOAL_TOKENS = 100_000_000  # 100M tokens
-DEADLINE = datetime(2025, 12, 31, 23, 59, 59, tzinfo=KST)
+SETTINGS = load_settings()
+GOALS = goal_list(SETTINGS)
+GOAL_TOKENS = GOALS[0]["tokens"]
+DEADLINE = parse_kst_date(GOALS[0]["deadline"]).replace(hour=23, minute=59, second=59)
+PERIOD_START = parse_kst_date(SETTINGS["cutoff_date"])
+GOAL_LABEL = f"{GOAL_TOKENS / 1_000_000:g}M"
 
 def load_config():
     """Load sync configuration"""
@@ -41,56 +63,37 @@ def load_config():
         return json.load(f)
 
 def load_all_devices():
-    """Load usage data from all devices"""
-    config = load_config()
-    data_dir = Path(config['data_dir'])
-
-    if not data_dir.exists():
-        print(f"❌ Data directory not found: {data_dir}")
-        sys.exit(1)
-
-    json_files = list(data_dir.glob("*.json"))
-
-    if not json_files:
-        print("❌ No usage data found")
-        print()
-        print("Make sure to run 'ccusage-auto-sync' first")
-        sys.exit(1)
-
-    # Aggregate data from all devices
-    total_usage = {
-        'input_tokens': 0,
-        'output_tokens': 0,
-        'cache_creation_tokens': 0,
-        'cache_read_tokens': 0,
-        'total_sessions': 0
-    }
-
-    devices = []
-
-    for json_file in json_files:
-        try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-
-            usage = data.get('usage', {})
-
-            total_usage['input_tokens'] += usage.get('input_tokens', 0)
-            total_usage['output_tokens'] += usage.get('output_tokens', 0)
-            total_usage['cache_creation_tokens'] += usage.get('cache_creation_tokens', 0)
-            total_usage['cache_read_tokens'] += usage.get('cache_read_tokens', 0)
-            total_usage['total_sessions'] += usage.get('total_sessions', 0)
+    """Load usage data from all devices
+
+    Returns (total_usage, devices, series) where series is the fleet's
+    per-day processed tokens from the merged counter states. This
+    machine's sidecar totals are merged in as well, so progress made since
+    the last sync counts without loading the whole DB. Without a sync
+    config (nothing synced yet) they are the only device.
+    """
+    totals = load_totals()
+    local = [build_export_data(totals, load_identity())] if totals else []
+    if CONFIG_FILE.exists():
+        records = list(read_all_devices(load_config()['data_dir'], extra_devices=local))
+    elif local:
+        print("ℹ️  Sync not configured, using this machine's usage only")
+        records = [(Path(f"{local[0]['device_id']}.local"), local[0], None)]
+    else:
+        load_config()  # prints the setup hint and exits
 
-            devices.append({
-                'device_id': data.get('device_id', json_file.stem),
-                'last_updated': data.get('last_updated')
-            })
+    states = {}
+    for _, data, error in records:
+        if error is None and data.get('counter_state'):
+            merge_into(states, data['counter_state'])
 
-        except Exception as e:
-            print(f"⚠️  Error reading {json_file.name}: {e}")
-            continue
+    total_usage, devices, _, _ = combine_devices(records)
+    return total_usage, devices, processed_series(states)
 
-    return total_usage, devices
+def goal_forecast(cumulative, series):
+    """Forecast all configured goals; the fleet total backs goals that span the whole period"""
+    return build_forecast(series, GOALS,
+                          observed=calculate_progress(cumulative)["total_processed"],
+                          observed_start=PERIOD_START.date().isoformat())
 
 def calculate_progress(cumulative):
     """Calculate progress toward goal"""
@@ -121,12 +124,12 @@ def calculate_progress(cumulative):
         "daily_needed": daily_needed
     }
 
-def display_goal_progress(cumulative, devices, progress):
+def display_goal_progress(cumulative, devices, goal, other_goals=()):
     """Display goal progress"""
     print()
     print("=" * 70)
-    print("🎯 100M TOKEN GOAL - PROGRESS TRACKER")
-    print(f"Deadline: December 31, 2025")
+    print(f"🎯 {GOAL_LABEL} TOKEN GOAL - PROGRESS TRACKER")
+    print(f"Deadline: {DEADLINE.strftime('%B %d, %Y')}")
     print("=" * 70)
     print()
 
@@ -138,78 +141,98 @@ def display_goal_progress(cumulative, devices, progress):
     print(f"   Output Tokens:      {cumulative['output_tokens']:,}")
     print(f"   Cache Creation:     {cumulative['cache_creation_tokens']:,}")
     print()
-    print(f"   💰 TOTAL PROCESSED:  {progress['total_processed']:,} tokens")
-    print(f"                        ({progress['total_processed']/1_000_000:.2f}M)")
+    print(f"   💰 TOTAL PROCESSED:  {goal['done']:,} tokens")
+    print(f"                        ({goal['done']/1_000_000:.2f}M)")
+    if goal['partial']:
+        print(f"                        (at least: some devices publish no daily series)")
     print()
 
     # Progress bar
     bar_length = 50
-    filled_length = int(bar_length * progress['progress_pct'] / 100)
+    filled_length = min(bar_length, int(bar_length * goal['progress_pct'] / 100))
     bar = '█' * filled_length + '░' * (bar_length - filled_length)
 
     print(f"🎯 GOAL PROGRESS:")
-    print(f"   [{bar}] {progress['progress_pct']:.1f}%")
+    print(f"   [{bar}] {goal['progress_pct']:.1f}%")
     print()
-    print(f"   Target:    {GOAL_TOKENS:,} tokens (100M)")
-    print(f"   Current:   {progress['total_processed']:,} tokens ({progress['total_processed']/1_000_000:.2f}M)")
-    print(f"   Remaining: {progress['remaining']:,} tokens ({progress['remaining']/1_000_000:.2f}M)")
+    print(f"   Target:    {GOAL_TOKENS:,} tokens ({GOAL_LABEL})")
+    print(f"   Current:   {goal['done']:,} tokens ({goal['done']/1_000_000:.2f}M)")
+    print(f"   Remaining: {goal['remaining']:,} tokens ({goal['remaining']/1_000_000:.2f}M)")
     print()
 
     # Time-based projections
     print(f"⏰ TIME REMAINING:")
-    print(f"   Days until deadline: {progress['days_remaining']}")
+    print(f"   Days until deadline: {goal['days_left']}")
     print()
 
-    if progress['days_remaining'] > 0:
+    if goal['days_left'] > 0:
         print(f"📈 DAILY TARGET:")
-        print(f"   Tokens needed per day: {progress['daily_needed']:,.0f} ({progress['daily_needed']/1_000_000:.2f}M)")
+        print(f"   Tokens needed per day: {goal['daily_needed']:,.0f} ({goal['daily_needed']/1_000_000:.2f}M)")
         print()
 
-        # Calculate if we're on track
-        # Estimate current daily average
-        period_start = datetime(2025, 10, 1, tzinfo=KST)
-        days_elapsed = (datetime.now(KST) - period_start).days
-        if days_elapsed > 0:
-            current_daily_avg = progress['total_processed'] / days_elapsed
-            print(f"📊 CURRENT PACE:")
-            print(f"   Current daily average: {current_daily_avg:,.0f} ({current_daily_avg/1_000_000:.2f}M)")
+        if goal['model']:
+            print(f"📊 EXPECTED PACE ({goal['model']} model):")
+            print(f"   Expected daily usage: {goal['expected_daily']:,.0f} ({goal['expected_daily']/1_000_000:.2f}M)")
             print()
 
             # Projection
-            total_days = (DEADLINE - period_start).days
-            projected_total = current_daily_avg * total_days
-
-            print(f"🔮 PROJECTION (at current pace):")
-            print(f"   Projected total by Dec 31: {projected_total:,.0f} ({projected_total/1_000_000:.2f}M)")
+            projected_total = goal['projected_total']
+            print(f"🔮 PROJECTION:")
+            print(f"   Projected total by {DEADLINE.strftime('%b %d')}: {projected_total:,.0f} ({projected_total/1_000_000:.2f}M)")
 
             # Check if goal already achieved
-            if progress['total_processed'] >= GOAL_TOKENS:
-                surplus = progress['total_processed'] - GOAL_TOKENS
+            if goal['remaining'] <= 0:
+                surplus = -goal['remaining']
                 print(f"   🎉 GOAL ACHIEVED! (+{surplus:,.0f} tokens, +{surplus/1_000_000:.2f}M)")
             elif projected_total >= GOAL_TOKENS:
                 surplus = projected_total - GOAL_TOKENS
-                print(f"   ✅ ON TRACK! (+{surplus:,.0f} tokens, +{surplus/1_000_000:.2f}M)")
+                print(f"   ✅ ON TRACK! (+{surplus:,.0f} tokens, +{surplus/1_000_000:.2f}M, ETA {goal['eta']})")
             else:
                 deficit = GOAL_TOKENS - projected_total
                 print(f"   ⚠️  BEHIND PACE (-{deficit:,.0f} tokens, -{deficit/1_000_000:.2f}M)")
-                print(f"   Need to increase daily usage by {(progress['daily_needed'] - current_daily_avg):,.0f} tokens")
+                print(f"   Need to increase daily usage by {(goal['daily_needed'] - goal['expected_daily']):,.0f} tokens")
 
     else:
         print("⚠️  DEADLINE HAS PASSED!")
 
-        if progress['remaining'] <= 0:
+        if goal['remaining'] <= 0:
             print(f"   🎉 GOAL ACHIEVED!")
+        elif goal['partial']:
+            print(f"   ❓ Result unknown (daily series incomplete)")
         else:
-            print(f"   ❌ Goal not met (short by {progress['remaining']:,} tokens)")
+            print(f"   ❌ Goal not met (short by {goal['remaining']:,} tokens)")
+
+    if other_goals:
+        print()
+        print(f"🗂️  OTHER GOALS (details: ccusage forecast):")
+        for other in other_goals:
+            status = "🎉" if other['remaining'] <= 0 else (
+                "❓" if other['partial'] and not other['days_left'] else ("✅" if other['on_track'] else "⚠️ "))
+            print(f"   {status} {other['name']:<16} {other['progress_pct']:>6.1f}%  "
+                  f"projected {other['projected_total']/1_000_000:.2f}M / {other['tokens']/1_000_000:g}M by {other['deadline']}")
 
     print()
     print("=" * 70)
 
 def main():
     """Main execution"""
-    cumulative, devices = load_all_devices()
-    progress = calculate_progress(cumulative)
-    display_goal_progress(cumulative, devices, progress)
+    parser = argparse.ArgumentParser(description="Check progress toward the token goal")
+    parser.add_argument("--cached", action="store_true",
+                        help="answer from the last snapshot, refresh it in the background")
+    parser.add_argument("--fresh", action="store_true", help="aggregate now (overrides offline_first)")
+    args = parser.parse_args()
+
+    cached = None
+    if (args.cached or SETTINGS["offline_first"]) and not args.fresh:
+        cached = cached_view("goal")
+
+    if cached:
+        cumulative, devices, series = cached["usage"], cached["devices"], cached["series"]
+    else:
+        cumulative, devices, series = load_all_devices()
+        save_snapshot("goal", {"usage": cumulative, "devices": devices, "series": series})
+    goals = goal_forecast(cumulative, series)["goals"]
+    display_goal_progress(cumulative, devices, goals[0], goals[1:])
 
 if __name__ == "__main__":
     main()
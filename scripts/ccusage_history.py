@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Run history as a downsampled time series (`ccusage history`)
+
+Each tracker run appends one line to ~/.claude/run_history.jsonl instead of
+rewriting a 100-entry list inside the cumulative DB. Old runs are folded
+into rollups (~/.claude/run_history_rollups.json) so long-term trends
+survive at a bounded size:
+
+    raw runs        last 7 days
+    hourly rollups  last 90 days
+    daily rollups   forever
+
+A run records what it found and what it cost:
+    {"timestamp", "new_sessions", "new_tokens", "scan_seconds",
+     "files_scanned", "files_skipped", "bytes_read"}
+
+Usage:
+    ccusage history                 # daily scan cost / throughput trend
+    ccusage history --hourly        # hourly rollups (last 90 days)
+    ccusage history --json
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import os
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+
+# Korea Standard Time (UTC+9)
+KST = timezone(timedelta(hours=9))
+
+RUN_LOG = Path.home() / ".claude" / "run_history.jsonl"
+ROLLUP_FILE = Path.home() / ".claude" / "run_history_rollups.json"
+
+RAW_DAYS = 7
+HOURLY_DAYS = 90
+TAIL_BYTES = 64 * 1024  # enough to find the last complete line of the log
+
+SUM_FIELDS = ["new_sessions", "scan_seconds", "files_scanned", "files_skipped", "bytes_read"]
+TOKEN_FIELDS = ["input_tokens", "output_tokens", "cache_creation_tokens", "cache_read_tokens"]
+
+def run_time(run):
+    """Timestamp of a run as an aware datetime"""
+    return datetime.fromisoformat(run["timestamp"]).astimezone(KST)
+
+def append_run(run):
+    """Append one run (a single small write; the log is never rewritten here)"""
+    RUN_LOG.parent.mkdir(parents=True, exist_ok=True)
+    with open(RUN_LOG, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(run, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+def read_runs():
+    """All raw runs still in the log"""
+    runs = []
+    if not RUN_LOG.exists():
+        return runs
+
+    with open(RUN_LOG, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                runs.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # torn write from a crashed run
+    return runs
+
+def last_run():
+    """The most recent run, reading only the tail of the log"""
+    try:
+        with open(RUN_LOG, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - TAIL_BYTES))
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    for line in reversed(lines):
+        try:
+            return json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+    return None
+
+def load_rollups():
+    """Load hourly/daily rollups"""
+    if ROLLUP_FILE.exists():
+        with open(ROLLUP_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"hourly": {}, "daily": {}}
+
+def save_rollups(rollups):
+    """Save rollups atomically"""
+    tmp_file = ROLLUP_FILE.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(rollups, f, ensure_ascii=False, separators=(',', ':'))
+    tmp_file.replace(ROLLUP_FILE)
+
+def empty_rollup():
+    """Aggregate of zero runs"""
+    rollup = {"runs": 0, "scan_seconds_max": 0.0}
+    rollup.update(dict.fromkeys(SUM_FIELDS, 0))
+    rollup["new_tokens"] = dict.fromkeys(TOKEN_FIELDS, 0)
+    return rollup
+
+def add_to_rollup(rollup, run):
+    """Fold a raw run (or another rollup) into a rollup"""
+    rollup["runs"] += run.get("runs", 1)
+    for field in SUM_FIELDS:
+        rollup[field] += run.get(field) or 0
+    rollup["scan_seconds_max"] = max(rollup["scan_seconds_max"],
+                                     run.get("scan_seconds_max", run.get("scan_seconds") or 0))
+    for field in TOKEN_FIELDS:
+        rollup["new_tokens"][field] += (run.get("new_tokens") or {}).get(field, 0)
+
+def compact(now=None):
+    """Downsample: raw runs older than RAW_DAYS -> hourly, hourly older than HOURLY_DAYS -> daily
+
+    Cheap when there is nothing to do: only the first line of the log is
+    read to decide whether any raw run has aged out.
+    """
+    now = now or datetime.now(KST)
+    raw_cutoff = now - timedelta(days=RAW_DAYS)
+
+    try:
+        with open(RUN_LOG, 'r', encoding='utf-8') as f:
+            oldest = json.loads(f.readline())
+        if run_time(oldest) >= raw_cutoff:
+            return False
+    except (OSError, json.JSONDecodeError, KeyError):
+        return False
+
+    rollups = load_rollups()
+    keep = []
+    for run in read_runs():
+        timestamp = run_time(run)
+        if timestamp >= raw_cutoff:
+            keep.append(run)
+        else:
+            hour = timestamp.strftime('%Y-%m-%dT%H')
+            add_to_rollup(rollups["hourly"].setdefault(hour, empty_rollup()), run)
+
+    hourly_cutoff = (now - timedelta(days=HOURLY_DAYS)).strftime('%Y-%m-%dT%H')
+    for hour in [hour for hour in rollups["hourly"] if hour < hourly_cutoff]:
+        add_to_rollup(rollups["daily"].setdefault(hour[:10], empty_rollup()), rollups["hourly"].pop(hour))
+
+    save_rollups(rollups)
+
+    tmp_file = RUN_LOG.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        for run in keep:
+            f.write(json.dumps(run, ensure_ascii=False, separators=(',', ':')) + '\n')
+    tmp_file.replace(RUN_LOG)
+    return True
+
+def migrate_from_db(db):
+    """Move a legacy `run_history` list out of the DB into the log (once)"""
+    legacy = db.pop("run_history", None)
+    if legacy and not RUN_LOG.exists():
+        for run in legacy:
+            append_run(run)
+
+def record_run(run):
+    """Append a run and downsample whatever has aged out"""
+    append_run(run)
+    compact()
+
+def series(hourly=False):
+    """Time series at one resolution: daily (rollups + raw) or hourly (last 90 days)"""
+    rollups = load_rollups()
+    points = {}
+
+    if hourly:
+        for hour, rollup in rollups["hourly"].items():
+            add_to_rollup(points.setdefault(hour, empty_rollup()), rollup)
+    else:
+        for day, rollup in rollups["daily"].items():
+            add_to_rollup(points.setdefault(day, empty_rollup()), rollup)
+        for hour, rollup in rollups["hourly"].items():
+            add_to_rollup(points.setdefault(hour[:10], empty_rollup()), rollup)
+
+    for run in read_runs():
+        key = run_time(run).strftime('%Y-%m-%dT%H' if hourly else '%Y-%m-%d')
+        add_to_rollup(points.setdefault(key, empty_rollup()), run)
+
+    return dict(sorted(points.items()))
+
+def display_series(points, hourly):
+    """Print scan cost and throughput per period"""
+    print("=" * 96)
+    print(f"⏱️  RUN HISTORY ({'hourly' if hourly else 'daily'})")
+    print("=" * 96)
+    print(f"{'period':<16}{'Runs':>6}{'New sess.':>11}{'Avg scan s':>12}{'Max scan s':>12}"
+          f"{'Files/run':>11}{'Skipped %':>11}{'MB read':>10}")
+    print("-" * 96)
+
+    for key, rollup in points.items():
+        runs = rollup["runs"] or 1
+        skipped_pct = rollup["files_skipped"] / rollup["files_scanned"] * 100 if rollup["files_scanned"] else 0
+        print(f"{key:<16}{rollup['runs']:>6,}{rollup['new_sessions']:>11,}"
+              f"{rollup['scan_seconds'] / runs:>12.3f}{rollup['scan_seconds_max']:>12.3f}"
+              f"{rollup['files_scanned'] / runs:>11,.0f}{skipped_pct:>10.1f}%"
+              f"{rollup['bytes_read'] / 1_000_000:>10.2f}")
+
+    print("=" * 96)
+
+def main(argv=None):
+    """Main execution"""
+    parser = argparse.ArgumentParser(prog="ccusage history", description="Show tracker run history")
+    parser.add_argument("--hourly", action="store_true", help="hourly rollups instead of daily")
+    parser.add_argument("--json", action="store_true", help="print the series as JSON")
+    args = parser.parse_args(argv)
+
+    points = series(args.hourly)
+    if args.json:
+        print(json.dumps(points, indent=2, ensure_ascii=False))
+    elif not points:
+        print("ℹ️  No runs recorded yet (run 'ccusage' first)")
+    else:
+        display_series(points, args.hourly)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Stable device identity for exports
+
+Device files used to be named after `socket.gethostname()` (ccusage-sync)
+or a hard-coded DEVICE_ID (auto_sync.py), so renamed machines forked into
+new files and cloned machines overwrote each other's data. Each machine now
+gets a persistent UUID plus a human label, stored in
+~/.claude/device_identity.json:
+
+    {
+      "uuid": "6f1c...",            # never changes for this machine
+      "label": "yangpyungpc",       # human name, also the data/<label>.json name
+      "data_file": "yangpyungpc.json",  # relative to data/ ("bohee/yangpyungpc.json" in a team repo)
+      "machine_fingerprint": "...", # detects a ~/.claude copied to another machine
+      "created_at": "...",
+      "previous_ids": ["yangpyungpc"]  # legacy IDs adopted with --adopt
+    }
+
+Aggregators deduplicate device files by UUID and keep the newest
+`last_updated` per identity. Legacy files (no UUID) named after one of a
+device's `previous_ids` are superseded by that device's file. A legacy
+file does not say which machine wrote it, so it is only adopted on request
+(--adopt) on the machine that wrote it.
+
+Usage:
+    python ccusage_identity.py                  # show this machine's identity
+    python ccusage_identity.py --label NAME     # set the human label
+    python ccusage_identity.py --adopt ID       # this machine wrote the legacy data/<ID>.json
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import sys
+import io
+import json
+import uuid
+import socket
+import hashlib
+import argparse
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+
+# Korea Standard Time (UTC+9)
+KST = timezone(timedelta(hours=9))
+
+# Set UTF-8 encoding for Windows
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+IDENTITY_FILE = Path.home() / ".claude" / "device_identity.json"
+LEGACY_DEVICE_ID = "yangpyungpc"  # hard-coded in auto_sync.py before identities existed (one PC)
+
+def hostname_label():
+    """Default label: the hostname, normalized like the old device IDs"""
+    return socket.gethostname().replace('.', '-').replace(' ', '-').lower()
+
+def read_machine_id():
+    """Return an OS-level machine ID, or None if unavailable"""
+    for path in ("/etc/machine-id", "/var/lib/dbus/machine-id"):
+        try:
+            machine_id = Path(path).read_text().strip()
+            if machine_id:
+                return machine_id
+        except OSError:
+            continue
+
+    if sys.platform == 'darwin':
+        try:
+            out = subprocess.run(['ioreg', '-rd1', '-c', 'IOPlatformExpertDevice'],
+                                 capture_output=True, text=True, timeout=5).stdout
+            for line in out.splitlines():
+                if 'IOPlatformUUID' in line:
+                    return line.split('"')[-2]
+        except (OSError, subprocess.SubprocessError):
+            pass
+
+    if sys.platform == 'win32':
+        try:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Cryptography") as key:
+                return winreg.QueryValueEx(key, "MachineGuid")[0]
+        except OSError:
+            pass
+
+    return None
+
+def machine_fingerprint():
+    """Hash of the machine ID (falls back to the MAC address)"""
+    raw = read_machine_id() or f"node-{uuid.getnode():x}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+def save_identity(identity):
+    """Save the device identity"""
+    IDENTITY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(IDENTITY_FILE, 'w', encoding='utf-8') as f:
+        json.dump(identity, f, indent=2, ensure_ascii=False)
+
+def new_identity(label=None):
+    """Create a fresh identity for this machine"""
+    return {
+        "uuid": str(uuid.uuid4()),
+        "label": label or hostname_label(),
+        "data_file": None,
+        "machine_fingerprint": machine_fingerprint(),
+        "created_at": datetime.now(KST).isoformat()
+    }
+
+def load_identity():
+    """Load (or create) this machine's identity
+
+    A ~/.claude copied onto another machine carries the old UUID along; the
+    fingerprint mismatch gives the clone its own identity instead of letting
+    both machines overwrite one data file.
+    """
+    if IDENTITY_FILE.exists():
+        with open(IDENTITY_FILE, 'r', encoding='utf-8') as f:
+            identity = json.load(f)
+
+        if identity.get("machine_fingerprint") == machine_fingerprint():
+            return identity
+
+        print(f"⚠️  {IDENTITY_FILE} was created on another machine (cloned?), "
+              f"creating a new identity for this one")
+        identity = new_identity()
+    else:
+        identity = new_identity()
+
+    save_identity(identity)
+    return identity
+
+def adopt_legacy_id(identity, device_id):
+    """Record a device ID this machine exported under before it had an identity
+
+    The next export takes over the legacy data/<device_id>.json if no data
+    file was chosen yet; otherwise aggregators drop the legacy file in
+    favour of this device's own.
+    """
+    previous = identity.setdefault("previous_ids", [])
+    if device_id != identity["label"] and device_id not in previous:
+        previous.append(device_id)
+    save_identity(identity)
+    return identity
+
+def file_owner(data_file):
+    """UUID recorded in a device file (None for legacy or unreadable files)"""
+    try:
+        with open(data_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get("device_uuid")
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def device_data_file(data_dir, identity, user=""):
+    """Return the data/<label>.json (team repos: data/<user>/<label>.json) path this identity exports to
+
+    The name is chosen once and remembered (and chosen again if the user
+    changes). A legacy file under one of the identity's previous IDs is
+    taken over instead of forking a second file. If another identity
+    already owns the file, a UUID suffix keeps the files apart.
+    """
+    data_dir = Path(data_dir)
+    user_dir = data_dir / user if user else data_dir
+
+    if identity.get("data_file") and (data_dir / identity["data_file"]).parent == user_dir:
+        return data_dir / identity["data_file"]
+
+    legacy_files = [user_dir / f"{previous}.json" for previous in identity.get("previous_ids", [])]
+    legacy_files = [path for path in legacy_files if path.exists() and file_owner(path) is None]
+
+    data_file = legacy_files[0] if legacy_files else user_dir / f"{identity['label']}.json"
+    if data_file.exists():
+        owner = file_owner(data_file)
+
+        # Legacy files (no UUID) with our label are ours to take over
+        if owner and owner != identity["uuid"]:
+            data_file = user_dir / f"{identity['label']}-{identity['uuid'][:8]}.json"
+
+    identity["data_file"] = data_file.relative_to(data_dir).as_posix()
+    save_identity(identity)
+    return data_file
+
+def identity_key(data, fallback):
+    """Deduplication key for a device file: its UUID, or its legacy device ID"""
+    return data.get("device_uuid") or f"id:{data.get('device_id', fallback)}"
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Show or change this machine's device identity")
+    parser.add_argument("--label", help="set the human label (also renames the data file on next export)")
+    parser.add_argument("--adopt", metavar="ID",
+                        help="claim the legacy data/<ID>.json (no UUID) this machine exported before")
+    args = parser.parse_args()
+
+    identity = load_identity()
+
+    if args.label:
+        identity["label"] = args.label
+        identity["data_file"] = None
+        save_identity(identity)
+        print(f"✅ Label set to {args.label}")
+        print()
+
+    if args.adopt:
+        adopt_legacy_id(identity, args.adopt)
+        print(f"✅ Legacy device '{args.adopt}' adopted (its file now counts as this machine's)")
+        print()
+
+    print(f"🆔 UUID:       {identity['uuid']}")
+    print(f"🏷️  Label:      {identity['label']}")
+    print(f"📄 Data file:  {identity.get('data_file') or '(chosen on next export)'}")
+    if identity.get("previous_ids"):
+        print(f"🔗 Adopted:    {', '.join(identity['previous_ids'])}")
+    print(f"📍 Stored in:  {IDENTITY_FILE}")
+
+if __name__ == "__main__":
+    main()
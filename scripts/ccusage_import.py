@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Import another machine's logs as their own device (`ccusage import`)
+
+Onboarding an old machine or recovering a backup used to mean copying its
+.jsonl files into ~/.claude/projects, which attributed every session to
+this machine. `ccusage import` reads a directory, a single log, a
+.jsonl.gz/.zst archive or a tar bundle (anything ccusage_sources.py
+reads) into a separate device namespace instead:
+
+    ~/.claude/imports/<device>/state.json    identity, totals, per-source checkpoints
+    ~/.claude/imports/<device>/sessions.bin  16-byte session IDs, in import order
+
+Logs are parsed in a process pool, like `ccusage verify`, with progress
+reported every few seconds, and the namespace is saved periodically, so an
+interrupted multi-GB import resumes where it stopped: unchanged sources
+are skipped by their checkpoints, grown ones are read from their offset.
+
+A record is only counted once across devices. It is dropped when its
+session ID is already in this machine's DB (hot or sealed months), in any
+other import namespace, or earlier in this one. Other machines publish
+only a count/XOR digest of their session set, which allows no membership
+test; an import whose digest equals a published device's is refused as a
+duplicate of that device unless --force is given.
+
+The result is exported as data/[<user>/]<device>.json and queued for Git
+sync, so it shows up in ccusage-total like any other device.
+
+Don't also copy the imported logs into ~/.claude/projects: the local scan
+does not check import namespaces, and those sessions would count twice.
+
+Usage:
+    ccusage import ~/backup/old-laptop/.claude --device old-laptop
+    ccusage import logs-2025.tar.gz --device old-laptop --workers 8
+    ccusage import --list
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+from ccusage_cumulative import (
+    SETTINGS, db_path, load_database, count_sealed_sessions, is_sealed_session, session_day,
+    parse_usage_record, empty_counters, calculate_cost
+)
+from ccusage_crdt import empty_digest, add_to_digest
+from ccusage_sources import sources_for_path, resume_offset, make_checkpoint
+from ccusage_identity import load_identity
+from ccusage_sync import load_config, build_export_data
+from ccusage_sync_queue import enqueue_export, start_background_worker, LOG_FILE
+from ccusage_total import device_files
+
+# Korea Standard Time (UTC+9)
+KST = timezone(timedelta(hours=9))
+
+IMPORT_DIR = Path.home() / ".claude" / "imports"
+IMPORT_WORKERS = os.cpu_count() or 1
+PROGRESS_SECONDS = 2  # progress line at most this often
+SAVE_SECONDS = 60  # namespace saved at least this often during a long import
+ID_BYTES = 16
+TOKEN_KEYS = ["input_tokens", "output_tokens", "cache_creation_tokens", "cache_read_tokens"]
+DEVICE_LABEL = re.compile(r"[\w][\w.-]*")
+
+def namespace_dir(device):
+    """Directory of one import namespace"""
+    return IMPORT_DIR / device
+
+def new_state(device):
+    """Fresh namespace state: a device identity of its own and empty totals"""
+    return {
+        "uuid": str(uuid.uuid4()),
+        "label": device,
+        "created_at": datetime.now(KST).isoformat(),
+        "last_updated": None,
+        "cutoff_date": SETTINGS["cutoff_date"],
+        "sessions": 0,  # session IDs in sessions.bin that belong to this state
+        "cumulative_usage": {**{key: 0 for key in TOKEN_KEYS}, "total_sessions": 0},
+        "daily": {},
+        "projects": {},
+        "session_digest": empty_digest(),
+        "sources": {}  # source key -> checkpoint
+    }
+
+def load_state(device):
+    """Load a namespace's state, or None if it does not exist"""
+    state_file = namespace_dir(device) / "state.json"
+    if not state_file.exists():
+        return None
+    with open(state_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_session_ids(device, state):
+    """Session IDs of a namespace (as 16-byte values)
+
+    sessions.bin is appended before state.json is written, so bytes past
+    the count recorded in the state are from an interrupted save and are
+    ignored.
+    """
+    try:
+        with open(namespace_dir(device) / "sessions.bin", 'rb') as f:
+            data = f.read(state["sessions"] * ID_BYTES)
+    except FileNotFoundError:
+        return set()
+    return {data[i:i + ID_BYTES] for i in range(0, len(data), ID_BYTES)}
+
+def save_namespace(device, state, pending):
+    """Append new session IDs, then write the state that counts them (atomically)"""
+    directory = namespace_dir(device)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    ids_file = directory / "sessions.bin"
+    with open(ids_file, 'r+b' if ids_file.exists() else 'wb') as f:
+        f.seek(state["sessions"] * ID_BYTES)
+        f.truncate()
+        f.write(b"".join(pending))
+    state["sessions"] += len(pending)
+    pending.clear()
+
+    state["last_updated"] = datetime.now(KST).isoformat()
+    tmp_file = directory / "state.json.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+    tmp_file.replace(directory / "state.json")
+
+def other_namespace_ids(device):
+    """Session IDs of every other import namespace"""
+    ids = set()
+    if not IMPORT_DIR.exists():
+        return ids
+    for entry in os.scandir(IMPORT_DIR):
+        if entry.is_dir() and entry.name != device:
+            state = load_state(entry.name)
+            if state:
+                ids |= load_session_ids(entry.name, state)
+    return ids
+
+def parse_source(job):
+    """Worker: parse one log source from `start` into compact usage records
+
+    Records are (session ID bytes, KST day, input, output, cache write,
+    cache read), so a multi-GB log does not travel back as dicts.
+    """
+    source, start = job
+    log_file = Path(source.name)
+    records = []
+    malformed = 0
+    end = start
+
+    try:
+        for raw_line, end in source.read_complete_lines(start):
+            line = raw_line.decode('utf-8', errors='replace')
+            if not line.strip():
+                continue
+            try:
+                record = parse_usage_record(log_file, source.project, line)
+            except ValueError:
+                malformed += 1
+                continue
+            if record:
+                session_id, data = record
+                records.append((bytes.fromhex(session_id), session_day(data["timestamp"]),
+                                data["input_tokens"], data["output_tokens"],
+                                data["cache_creation_tokens"], data["cache_read_tokens"]))
+    except Exception as e:  # unreadable file or corrupt archive
+        return source.key, [], 0, start, str(e)
+
+    return source.key, records, malformed, end, None
+
+def add_record(state, project, record):
+    """Add one new record to the namespace totals"""
+    _, day, *tokens = record
+    cumulative = state["cumulative_usage"]
+    day_counters = state["daily"].setdefault(day, empty_counters())
+    project_counters = state["projects"].setdefault(project, empty_counters())
+
+    for key, value in zip(TOKEN_KEYS, tokens):
+        cumulative[key] += value
+        day_counters[key] += value
+        project_counters[key] += value
+    cumulative["total_sessions"] += 1
+    day_counters["sessions"] += 1
+    project_counters["sessions"] += 1
+
+def format_bytes(size):
+    """Human-readable byte count"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def unread_bytes(source, start):
+    """Bytes left to read in a source (compressed sources: the whole file size)"""
+    return source.size - start if source.compression == "plain" else source.size
+
+def print_progress(done_bytes, total_bytes, stats, started):
+    """One progress line"""
+    elapsed = time.perf_counter() - started
+    percent = done_bytes / total_bytes * 100 if total_bytes else 100
+    rate = done_bytes / elapsed if elapsed else 0
+    print(f"📥 {format_bytes(done_bytes)} / {format_bytes(total_bytes)} ({percent:.0f}%), "
+          f"{stats['records']:,} records, {stats['new']:,} new, "
+          f"{format_bytes(rate)}/s", flush=True)
+
+def import_logs(path, device, state, workers):
+    """Parse every changed source under path into the namespace; returns the run stats"""
+    if state.get("cutoff_date") != SETTINGS["cutoff_date"]:
+        # Checkpoints only hold for the cutoff they were read with
+        state["cutoff_date"] = SETTINGS["cutoff_date"]
+        state["sources"] = {}
+    checkpoints = state["sources"]
+
+    print("🔍 Finding log files...")
+    sources = list(sources_for_path(path))
+    jobs = []
+    for source in sources:
+        start = resume_offset(source, checkpoints.get(source.key))
+        if start is not None:
+            jobs.append((source, start))
+    total_bytes = sum(unread_bytes(source, start) for source, start in jobs)
+    print(f"📂 {len(sources)} log files found, {len(jobs)} to read ({format_bytes(total_bytes)})")
+
+    stats = {"files": len(sources), "read": len(jobs), "records": 0, "new": 0,
+             "duplicates": 0, "malformed_lines": 0, "errors": []}
+    if not jobs:
+        return stats
+
+    # Everything already counted somewhere else on this machine
+    print("🔎 Loading session IDs to deduplicate against...")
+    own_ids = load_session_ids(device, state)
+    other_ids = other_namespace_ids(device)
+    db = load_database() if db_path().exists() else {}
+    processed = db.get("processed_sessions", {})
+    segments = db.get("segments", {})
+    sealed_cache = {}
+    print(f"   {len(processed) + count_sealed_sessions(segments):,} local, "
+          f"{len(other_ids):,} in other imports, {len(own_ids):,} already imported")
+    print()
+
+    pending = []
+    done_bytes = 0
+    started = last_progress = last_save = time.perf_counter()
+    jobs_by_key = {source.key: (source, start) for source, start in jobs}
+    chunksize = max(1, min(len(jobs) // (workers * 4), 16))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for key, records, malformed, end, error in pool.map(parse_source, jobs, chunksize=chunksize):
+                source, start = jobs_by_key[key]
+                done_bytes += unread_bytes(source, start)
+                stats["malformed_lines"] += malformed
+                if error:
+                    stats["errors"].append({"file": key, "error": error})
+                    continue
+
+                for record in records:
+                    stats["records"] += 1
+                    session_id = record[0]
+                    if session_id in own_ids or session_id in other_ids:
+                        stats["duplicates"] += 1
+                        continue
+                    hex_id = session_id.hex()
+                    # record[1] is the KST day, so its first 7 characters are the session month
+                    if hex_id in processed or is_sealed_session(segments, record[1][:7], hex_id, sealed_cache):
+                        stats["duplicates"] += 1
+                        continue
+
+                    own_ids.add(session_id)
+                    pending.append(session_id)
+                    add_record(state, source.project, record)
+                    add_to_digest(state["session_digest"], hex_id)
+                    stats["new"] += 1
+
+                checkpoints[key] = make_checkpoint(source, end)
+
+                now = time.perf_counter()
+                if now - last_progress >= PROGRESS_SECONDS:
+                    print_progress(done_bytes, total_bytes, stats, started)
+                    last_progress = now
+                if now - last_save >= SAVE_SECONDS:
+                    save_namespace(device, state, pending)
+                    last_save = now
+    finally:
+        # Interrupted or not, keep what was read so the next run resumes
+        save_namespace(device, state, pending)
+
+    print_progress(done_bytes, total_bytes, stats, started)
+    print()
+    return stats
+
+def device_export_path(data_dir, state, user):
+    """data/[<user>/]<device>.json, or None if another device owns that name"""
+    user_dir = Path(data_dir) / user if user else Path(data_dir)
+    data_file = user_dir / f"{state['label']}.json"
+    if data_file.exists():
+        try:
+            with open(data_file, 'r', encoding='utf-8') as f:
+                owner = json.load(f).get("device_uuid")
+        except (OSError, json.JSONDecodeError):
+            owner = None
+        if owner and owner != state["uuid"]:
+            return None
+    return data_file
+
+def published_overlap(data_dir, state):
+    """Compare the import with the published devices
+
+    Returns (duplicate, overlaps): the device whose session set has the same
+    digest, if any, and [(device, shared days)] for devices with usage on
+    some of the same days in the same projects. The digest only catches an
+    exact match; a machine that still syncs part of these logs shows up as
+    an overlap.
+    """
+    digest = state["session_digest"]
+    days = set(state["daily"])
+    projects = set(state["projects"])
+    overlaps = []
+    for device_file in device_files(data_dir):
+        try:
+            with open(device_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if data.get("device_uuid") == state["uuid"]:
+            continue
+
+        name = data.get("device_label") or data.get("device_id")
+        counter_state = data.get("counter_state") or {}
+        if counter_state.get("session_digest") == digest:
+            return name, []
+        shared_days = days.intersection(counter_state.get("buckets", {}))
+        if shared_days and projects.intersection(data.get("projects", {})):
+            overlaps.append((name, len(shared_days)))
+    return None, overlaps
+
+def export_namespace(state, user, force, push):
+    """Write the namespace's device file into the sync repo and queue it for push"""
+    config = load_config()
+    if not config:
+        print("ℹ️  Sync not configured (run ccusage-sync once), import kept locally")
+        return False
+
+    data_dir = Path(config['data_dir'])
+    if state["session_digest"]["count"] and not force:
+        duplicate, overlaps = published_overlap(data_dir, state)
+        if duplicate:
+            print(f"⚠️  These sessions match device '{duplicate}' exactly; it already syncs them")
+            print("   Not exported (use --force to export anyway)")
+            return False
+        for name, shared_days in overlaps:
+            print(f"⚠️  Device '{name}' has usage in the same projects on {shared_days} of these days;")
+            print("   if it still syncs some of these logs, those sessions are counted twice")
+
+    data_file = device_export_path(data_dir, state, user)
+    if data_file is None:
+        print(f"❌ Another device already exports as '{state['label']}', choose another --device")
+        return False
+
+    totals = {
+        "cumulative_usage": state["cumulative_usage"],
+        "period_start": state["cutoff_date"],
+        "daily": dict(sorted(state["daily"].items())),
+        "projects": {project: dict(counters, estimated_cost=round(calculate_cost(counters), 2))
+                     for project, counters in state["projects"].items()},
+        "session_digest": state["session_digest"]
+    }
+    export_data = build_export_data(totals, state)
+    export_data["user"] = user or None
+    export_data["hostname"] = None
+    export_data["imported_by"] = load_identity()["label"]
+    export_data["imported_at"] = state["last_updated"]
+
+    data_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(export_data, f, indent=2, ensure_ascii=False)
+    print(f"✅ Exported {state['label']}: {export_data['usage']['total_sessions']:,} sessions, "
+          f"${export_data['estimated_cost']:.2f} → {data_file}")
+
+    if push:
+        pending = enqueue_export(config['repo_path'], state["label"], data_file, reason="import")
+        start_background_worker()
+        print(f"🔄 Queued for Git sync ({pending} pending), pushing in the background")
+        print(f"   Log: {LOG_FILE}")
+    return True
+
+def display_summary(state, stats):
+    """Print the import result"""
+    print("=" * 70)
+    print(f"📥 IMPORT: {state['label']}")
+    print("=" * 70)
+    print(f"Files read:        {stats['read']:,} of {stats['files']:,}")
+    print(f"Usage records:     {stats['records']:,}")
+    print(f"  new:             {stats['new']:,}")
+    print(f"  duplicates:      {stats['duplicates']:,}")
+    if stats["malformed_lines"]:
+        print(f"Malformed lines:   {stats['malformed_lines']:,}")
+    for error in stats["errors"]:
+        print(f"⚠️  {error['file']}: {error['error']}")
+    print("-" * 70)
+
+    cumulative = state["cumulative_usage"]
+    print(f"Device total:      {cumulative['total_sessions']:,} sessions, "
+          f"${calculate_cost(cumulative):,.2f}")
+    print(f"Namespace:         {namespace_dir(state['label'])}")
+    print("=" * 70)
+
+def display_namespaces():
+    """List import namespaces"""
+    devices = sorted(entry.name for entry in os.scandir(IMPORT_DIR) if entry.is_dir()) \
+        if IMPORT_DIR.exists() else []
+    if not devices:
+        print("ℹ️  No imported devices yet")
+        return
+
+    print(f"{'Device':<24}{'Sessions':>12}{'Cost':>12}{'Sources':>10}  Last import")
+    print("-" * 80)
+    for device in devices:
+        state = load_state(device)
+        if not state:
+            continue
+        cumulative = state["cumulative_usage"]
+        print(f"{device:<24}{cumulative['total_sessions']:>12,}"
+              f"{'$' + format(calculate_cost(cumulative), ',.2f'):>12}{len(state['sources']):>10}"
+              f"  {(state['last_updated'] or '-')[:16]}")
+
+def main(argv=None):
+    """Main execution"""
+    parser = argparse.ArgumentParser(prog="ccusage import",
+                                     description="Import another machine's logs as a separate device")
+    parser.add_argument("path", nargs="?", help="log directory, log file, .gz/.zst archive or tar bundle")
+    parser.add_argument("--device", help="device name the logs belong to")
+    parser.add_argument("--user", help="team user the device belongs to (default: the configured user)")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS)
+    parser.add_argument("--force", action="store_true",
+                        help="export even if a published device has the same sessions")
+    parser.add_argument("--no-export", action="store_true", help="only update the local namespace")
+    parser.add_argument("--no-push", action="store_true", help="export without queueing a Git push")
+    parser.add_argument("--list", action="store_true", help="list imported devices")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        display_namespaces()
+        return
+    if not args.path or not args.device:
+        parser.error("path and --device are required")
+    if not DEVICE_LABEL.fullmatch(args.device):
+        parser.error("--device may only contain letters, digits, '.', '-' and '_'")
+    if not Path(args.path).expanduser().exists():
+        print(f"❌ Not found: {args.path}")
+        sys.exit(1)
+    if args.device == load_identity()["label"]:
+        print(f"❌ '{args.device}' is this machine; import into a name of its own")
+        sys.exit(1)
+
+    state = load_state(args.device)
+    if state is None:
+        state = new_state(args.device)
+        print(f"🆕 New device namespace '{args.device}'")
+
+    print(f"🚀 Importing {args.path} as {args.device}")
+    print()
+    stats = import_logs(args.path, args.device, state, max(1, args.workers))
+    display_summary(state, stats)
+
+    if not args.no_export:
+        print()
+        user = SETTINGS["user"] if args.user is None else args.user
+        if export_namespace(state, user, args.force, not args.no_push):
+            save_namespace(args.device, state, [])
+
+    if stats["errors"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+OpenMetrics / Prometheus exporter for token usage and tool health
+
+Renders the cumulative counters and the tool's own health as a metrics
+exposition, from data that is already on disk (cumulative DB, device JSON
+files, sync queue) - nothing is rescanned per scrape:
+
+- this machine: tokens by type, sessions, estimated cost, per model and
+  per project (from the DB's time buckets)
+- the fleet: the same per device and per project (from data/*.json)
+- health: last scan duration / files scanned / skipped / bytes read, DB and
+  segment size, last scan time, last successful push, push failures,
+  pending exports
+
+Usage:
+    ccusage metrics                                   # OpenMetrics on stdout
+    ccusage metrics --textfile /var/lib/node_exporter/textfile/ccusage.prom
+    ccusage serve                                     # also serves GET /metrics
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import os
+import sys
+import argparse
+import contextlib
+from pathlib import Path
+from datetime import datetime
+
+from ccusage_cumulative import SEGMENT_DIR, db_path, load_database, empty_counters, calculate_cost
+from ccusage_sync_queue import QUEUE_FILE, load_queue
+from ccusage_history import last_run
+
+TOKEN_TYPES = {
+    "input_tokens": "input",
+    "output_tokens": "output",
+    "cache_creation_tokens": "cache_creation",
+    "cache_read_tokens": "cache_read"
+}
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def timestamp_seconds(iso_string):
+    """Unix timestamp of an ISO-8601 string, or None"""
+    if not iso_string:
+        return None
+    try:
+        return datetime.fromisoformat(iso_string.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+def directory_size(path):
+    """Total size of the files directly inside a directory"""
+    try:
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    except OSError:
+        return 0
+
+def summarize_db(db, db_size):
+    """Reduce the cumulative DB to what the exporter needs"""
+    by_model = {}
+    by_project = {}
+
+    for by_proj in db.get("buckets", {}).values():
+        for project, by_mod in by_proj.items():
+            for model, counters in by_mod.items():
+                for target in (by_model.setdefault(model, empty_counters()),
+                               by_project.setdefault(project, empty_counters())):
+                    for key in target:
+                        target[key] += counters.get(key, 0)
+
+    cumulative = db.get("cumulative_usage", {})
+    return {
+        "usage": cumulative,
+        "estimated_cost": calculate_cost(cumulative) if cumulative else 0,
+        "by_model": by_model,
+        "by_project": by_project,
+        "last_run": last_run(),
+        "db_size": db_size,
+        "segments_size": directory_size(SEGMENT_DIR)
+    }
+
+def load_local_summary():
+    """Summarize this machine's DB, or None if there is none yet"""
+    try:
+        db_size = db_path().stat().st_size
+        return summarize_db(load_database(), db_size)
+    except (OSError, ValueError):
+        return None
+
+def escape_label(value):
+    """Escape a label value for the text exposition"""
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+def format_sample(name, labels, value):
+    """One sample line"""
+    value_str = repr(value) if isinstance(value, float) else str(value)
+    if not labels:
+        return f"{name} {value_str}"
+    label_str = ','.join(f'{key}="{escape_label(val)}"' for key, val in labels.items())
+    return f"{name}{{{label_str}}} {value_str}"
+
+class Exposition:
+    """Collects metric families and renders them"""
+
+    def __init__(self):
+        self.families = []
+
+    def add(self, name, metric_type, help_text, samples, unit=None):
+        """Add a family; samples are (labels, value) pairs, None values are dropped"""
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if samples:
+            self.families.append((name, metric_type, help_text, unit, samples))
+
+    def render(self, openmetrics=True):
+        """Render as OpenMetrics (`# EOF`-terminated) or Prometheus 0.0.4 text
+
+        OpenMetrics names a counter family without the `_total` suffix its
+        samples carry; the Prometheus text format (node_exporter's textfile
+        collector) wants the sample name on the TYPE line too.
+        """
+        lines = []
+        for name, metric_type, help_text, unit, samples in self.families:
+            sample_name = f"{name}_total" if metric_type == "counter" else name
+            family = name if openmetrics else sample_name
+            lines.append(f"# TYPE {family} {metric_type}")
+            if unit and openmetrics:
+                lines.append(f"# UNIT {family} {unit}")
+            lines.append(f"# HELP {family} {help_text}")
+            lines.extend(format_sample(sample_name, labels, value) for labels, value in samples)
+
+        if openmetrics:
+            lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+def token_samples(counters, **labels):
+    """One sample per token type"""
+    return [({**labels, "type": label}, counters.get(key, 0)) for key, label in TOKEN_TYPES.items()]
+
+def build_exposition(local, devices=None, projects=None, queue=None):
+    """Build all metric families from already-loaded data"""
+    exposition = Exposition()
+
+    if local:
+        usage = local["usage"]
+        exposition.add("ccusage_tokens", "counter", "Tokens counted on this machine since the cutoff date",
+                       token_samples(usage))
+        exposition.add("ccusage_sessions", "counter", "Usage records counted on this machine",
+                       [({}, usage.get("total_sessions", 0))])
+        exposition.add("ccusage_estimated_cost_dollars", "gauge", "Estimated cost on this machine (Sonnet 4.5 pricing)",
+                       [({}, round(local["estimated_cost"], 4))], unit="dollars")
+        exposition.add("ccusage_model_tokens", "counter", "Tokens on this machine by model",
+                       [sample for model, counters in sorted(local["by_model"].items())
+                        for sample in token_samples(counters, model=model)])
+        exposition.add("ccusage_project_tokens", "counter", "Tokens on this machine by project",
+                       [sample for project, counters in sorted(local["by_project"].items())
+                        for sample in token_samples(counters, project=project)])
+
+        run = local["last_run"] or {}
+        exposition.add("ccusage_scan_duration_seconds", "gauge", "Duration of the last scan",
+                       [({}, run.get("scan_seconds"))], unit="seconds")
+        exposition.add("ccusage_scan_files", "gauge", "JSONL files seen by the last scan",
+                       [({}, run.get("files_scanned"))])
+        exposition.add("ccusage_scan_files_skipped", "gauge", "Unchanged JSONL files skipped by the last scan",
+                       [({}, run.get("files_skipped"))])
+        exposition.add("ccusage_scan_read_bytes", "gauge", "Bytes of JSONL read by the last scan",
+                       [({}, run.get("bytes_read"))], unit="bytes")
+        exposition.add("ccusage_scan_new_sessions", "gauge", "New usage records found by the last scan",
+                       [({}, run.get("new_sessions"))])
+        exposition.add("ccusage_last_scan_timestamp_seconds", "gauge", "Time of the last scan",
+                       [({}, timestamp_seconds(run.get("timestamp")))], unit="seconds")
+        exposition.add("ccusage_db_size_bytes", "gauge", "Size of the cumulative DB file",
+                       [({}, local["db_size"])], unit="bytes")
+        exposition.add("ccusage_segments_size_bytes", "gauge", "Size of the sealed month segments",
+                       [({}, local["segments_size"])], unit="bytes")
+
+    if devices:
+        fleet = dict.fromkeys(TOKEN_TYPES, 0)
+        for device in devices:
+            for key in fleet:
+                fleet[key] += device["usage"].get(key, 0)
+
+        exposition.add("ccusage_fleet_devices", "gauge", "Devices with a data file",
+                       [({}, len(devices))])
+        exposition.add("ccusage_fleet_tokens", "counter", "Tokens across all devices",
+                       token_samples(fleet))
+        exposition.add("ccusage_fleet_device_tokens", "counter", "Tokens by device",
+                       [sample for device in devices
+                        for sample in token_samples(device["usage"], device=device["device_id"])])
+        exposition.add("ccusage_fleet_device_sessions", "counter", "Usage records by device",
+                       [({"device": d["device_id"]}, d["usage"].get("total_sessions", 0)) for d in devices])
+        exposition.add("ccusage_fleet_device_estimated_cost_dollars", "gauge", "Estimated cost by device",
+                       [({"device": d["device_id"]}, float(d["cost"])) for d in devices], unit="dollars")
+        exposition.add("ccusage_fleet_device_last_updated_timestamp_seconds", "gauge", "Last export time by device",
+                       [({"device": d["device_id"]}, timestamp_seconds(d.get("last_updated"))) for d in devices],
+                       unit="seconds")
+
+    if projects:
+        exposition.add("ccusage_fleet_project_tokens", "counter", "Tokens by project across all devices",
+                       [sample for project, counters in sorted(projects.items())
+                        for sample in token_samples(counters, project=project)])
+
+    if queue:
+        exposition.add("ccusage_sync_push_failures", "counter", "Failed git push attempts",
+                       [({}, queue.get("push_failures", 0))])
+        exposition.add("ccusage_sync_pending_exports", "gauge", "Exports waiting to be pushed",
+                       [({}, len(queue.get("pending", [])))])
+        exposition.add("ccusage_sync_last_success_timestamp_seconds", "gauge", "Time of the last successful push",
+                       [({}, timestamp_seconds(queue.get("last_success_at")))], unit="seconds")
+
+    return exposition
+
+def load_fleet(data_dir):
+    """Aggregate device files (aggregate_usage's progress output goes to stderr)"""
+    from ccusage_total import aggregate_usage
+
+    if not data_dir or not Path(data_dir).exists():
+        return None, None
+
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            _, devices, projects, _ = aggregate_usage(data_dir)
+        except SystemExit:
+            return None, None
+    return devices, projects
+
+def write_textfile(path, text):
+    """Write atomically, as the node_exporter textfile collector expects"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f".{path.name}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    tmp_file.replace(path)
+
+def main(argv=None):
+    """Main execution"""
+    from ccusage_query import default_data_dir
+
+    parser = argparse.ArgumentParser(prog="ccusage metrics", description="Export usage metrics")
+    parser.add_argument("--textfile", metavar="PATH",
+                        help="write Prometheus text format to PATH (node_exporter textfile collector)")
+    parser.add_argument("--data-dir", help="device JSON directory (default: from the sync config)")
+    parser.add_argument("--no-fleet", action="store_true", help="only export this machine's metrics")
+    args = parser.parse_args(argv)
+
+    devices, projects = (None, None) if args.no_fleet else load_fleet(args.data_dir or default_data_dir())
+    queue = load_queue() if QUEUE_FILE.exists() else None
+    exposition = build_exposition(load_local_summary(), devices, projects, queue)
+
+    if args.textfile:
+        write_textfile(args.textfile, exposition.render(openmetrics=False))
+        print(f"✅ Wrote {len(exposition.families)} metric families to {args.textfile}")
+    else:
+        sys.stdout.write(exposition.render())
+
+if __name__ == "__main__":
+    main()
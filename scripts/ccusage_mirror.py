@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Offline-first snapshots for ccusage-total and ccusage-goal (stale-while-revalidate)
+
+`ccusage-total` used to `git pull` before every run, so a slow or offline
+network stalled it for seconds before it fell back to local data anyway.
+With --cached (or "offline_first": true in the sync config) both commands
+answer immediately from the last aggregated snapshot
+(~/.claude/usage_snapshot.json), show how old it is, and start a detached
+refresh: `git pull` bounded by PULL_TIMEOUT, then a fresh aggregation
+written back to the snapshot. Interactive latency never waits on the
+network; the next run shows the refreshed numbers.
+
+Every foreground (non-cached) run also stores what it computed, so the
+snapshot stays warm either way.
+
+Usage:
+    ccusage-total --cached
+    ccusage-goal --cached
+    python ccusage_mirror.py refresh     # pull + re-aggregate now (what the background job runs)
+    python ccusage_mirror.py status      # snapshot ages
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+
+# Korea Standard Time (UTC+9)
+KST = timezone(timedelta(hours=9))
+
+# Set UTF-8 encoding for Windows
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+SNAPSHOT_FILE = Path.home() / ".claude" / "usage_snapshot.json"
+LOCK_FILE = Path.home() / ".claude" / "usage_snapshot.lock"
+LOG_FILE = Path.home() / ".claude" / "usage_snapshot.log"
+PULL_TIMEOUT = 20  # seconds a background (or foreground) git pull may take
+MIN_REFRESH_SECONDS = 60  # a snapshot younger than this is not refreshed again
+STALE_LOCK_SECONDS = 10 * 60
+
+def load_snapshot():
+    """Load the snapshot file ({kind: {"generated_at", "pulled_at", "data"}})"""
+    if not SNAPSHOT_FILE.exists():
+        return {}
+    try:
+        with open(SNAPSHOT_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def save_snapshot(kind, data, pulled_at=None):
+    """Store one aggregation result ("total" or "goal") atomically"""
+    snapshot = load_snapshot()
+    previous = snapshot.get(kind, {})
+    snapshot[kind] = {
+        "generated_at": datetime.now(KST).isoformat(),
+        "pulled_at": pulled_at or previous.get("pulled_at"),
+        "data": data
+    }
+
+    SNAPSHOT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = SNAPSHOT_FILE.with_name(f"{SNAPSHOT_FILE.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    tmp_file.replace(SNAPSHOT_FILE)
+
+def age_seconds(timestamp):
+    """Seconds since an ISO timestamp (None if missing)"""
+    if not timestamp:
+        return None
+    return (datetime.now(KST) - datetime.fromisoformat(timestamp)).total_seconds()
+
+def describe_age(seconds):
+    """Human-readable age: "just now", "12 min ago", "3 h ago", "2 days ago" """
+    if seconds is None:
+        return "never"
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min ago"
+    if seconds < 86400:
+        return f"{seconds / 3600:.0f} h ago"
+    days = round(seconds / 86400)
+    return f"{days} day{'s' if days > 1 else ''} ago"
+
+def pull_repo(repo_path, timeout=PULL_TIMEOUT):
+    """`git pull` that gives up after `timeout` seconds; returns (ok, message)"""
+    try:
+        result = subprocess.run(
+            ['git', 'pull', '--ff-only', '--quiet'],
+            cwd=repo_path,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            # Never wait for a credential prompt nobody will answer
+            env=dict(os.environ, GIT_TERMINAL_PROMPT='0')
+        )
+    except subprocess.TimeoutExpired:
+        return False, f"timed out after {timeout}s"
+    except OSError as e:
+        return False, str(e)
+
+    if result.returncode != 0:
+        return False, result.stderr.strip()
+    return True, None
+
+def acquire_lock():
+    """Take the refresh lock (one refresh at a time), breaking a stale one"""
+    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            if time.time() - LOCK_FILE.stat().st_mtime < STALE_LOCK_SECONDS:
+                return False
+            LOCK_FILE.unlink()
+        except FileNotFoundError:
+            pass
+        return acquire_lock()
+
+    with os.fdopen(fd, 'w') as f:
+        f.write(str(os.getpid()))
+    return True
+
+def release_lock():
+    """Release the refresh lock"""
+    try:
+        LOCK_FILE.unlink()
+    except FileNotFoundError:
+        pass
+
+def refresh(timeout=PULL_TIMEOUT):
+    """Pull the sync repo (bounded) and re-aggregate both snapshots"""
+    from ccusage_total import load_config, aggregate_usage, SETTINGS
+    from ccusage_goal import load_all_devices
+
+    if not acquire_lock():
+        print("ℹ️  A refresh is already running")
+        return False
+
+    try:
+        config = load_config()
+        ok, error = pull_repo(config['repo_path'], timeout)
+        pulled_at = datetime.now(KST).isoformat() if ok else None
+        print(f"{datetime.now(KST).isoformat()} " +
+              ("✅ Pulled latest data" if ok else f"⚠️  Pull failed ({error}), aggregating local data"))
+
+        total_usage, devices, projects, groups = aggregate_usage(config['data_dir'], SETTINGS["device_groups"])
+        save_snapshot("total", {"usage": total_usage, "devices": devices,
+                                "projects": projects, "groups": groups}, pulled_at)
+
+        cumulative, goal_devices, series = load_all_devices()
+        save_snapshot("goal", {"usage": cumulative, "devices": goal_devices, "series": series}, pulled_at)
+        return True
+    finally:
+        release_lock()
+
+def start_background_refresh(kind):
+    """Start a detached refresh unless the snapshot is fresh or one is running"""
+    entry = load_snapshot().get(kind, {})
+    age = age_seconds(entry.get("generated_at"))
+    if age is not None and age < MIN_REFRESH_SECONDS:
+        return False
+    try:
+        if time.time() - LOCK_FILE.stat().st_mtime < STALE_LOCK_SECONDS:
+            return False
+    except FileNotFoundError:
+        pass
+
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    log = open(LOG_FILE, 'a', encoding='utf-8')
+
+    kwargs = {}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+
+    subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), 'refresh'],
+        stdin=subprocess.DEVNULL,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        env=dict(os.environ, PYTHONIOENCODING='utf-8'),
+        **kwargs
+    )
+    log.close()
+    return True
+
+def cached_view(kind):
+    """Return a snapshot's data right away (and revalidate it in the background)
+
+    Prints the snapshot's age. Returns None when there is no snapshot yet;
+    the caller then aggregates in the foreground.
+    """
+    entry = load_snapshot().get(kind)
+    if not entry:
+        return None
+    refreshing = start_background_refresh(kind)
+
+    pulled = describe_age(age_seconds(entry.get("pulled_at")))
+    print(f"⚡ Snapshot from {describe_age(age_seconds(entry['generated_at']))} "
+          f"(data pulled {pulled}){', refreshing in the background' if refreshing else ''}")
+    print()
+    return entry["data"]
+
+def display_status():
+    """Show the snapshot ages"""
+    snapshot = load_snapshot()
+    for kind in ("total", "goal"):
+        entry = snapshot.get(kind)
+        if not entry:
+            print(f"📸 {kind:<6} no snapshot yet")
+            continue
+        print(f"📸 {kind:<6} aggregated {describe_age(age_seconds(entry['generated_at']))}, "
+              f"data pulled {describe_age(age_seconds(entry.get('pulled_at')))}")
+    if LOCK_FILE.exists():
+        print("🔄 Refresh running")
+    print(f"📝 Log: {LOG_FILE}")
+
+def main():
+    """Main execution"""
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "refresh":
+        sys.exit(0 if refresh() else 1)
+    elif command == "status":
+        display_status()
+    else:
+        print("Usage: ccusage_mirror.py [refresh|status]")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
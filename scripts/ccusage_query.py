@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+On-demand range queries over the cumulative usage store
+
+Answers from the time buckets kept in the cumulative DB (and the per-day
+counter state exported in each device's JSON for --group-by device), so any
+reporting window can be queried without touching the raw JSONL logs.
+
+Usage:
+    ccusage query --from 2025-11-01 --to 2025-11-30 --group-by project
+    ccusage query --group-by device --json
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import sys
+import json
+import argparse
+
+from ccusage_cumulative import db_path, load_database, empty_counters, calculate_cost
+from ccusage_settings import CONFIG_FILE, kst_day_arg
+from ccusage_crdt import merge_into, device_totals
+from ccusage_total import device_files
+
+GROUP_BY_CHOICES = ["day", "month", "project", "model", "device"]
+
+def in_range(day, start, end):
+    """Check whether a YYYY-MM-DD key falls into [start, end]"""
+    return (not start or day >= start) and (not end or day <= end)
+
+def add_counters(target, counters):
+    """Add one counter bucket into another"""
+    for key in target:
+        target[key] += counters.get(key, 0)
+
+def query_local(group_by, start, end):
+    """Group the local DB's time buckets by day, month, project or model"""
+    if not db_path().exists():
+        print(f"⚠️  No cumulative usage database found at {db_path()}")
+        print("   Run 'ccusage' first to initialize the database")
+        sys.exit(1)
+
+    buckets = load_database().get("buckets", {})
+    groups = {}
+
+    for day, by_project in buckets.items():
+        if not in_range(day, start, end):
+            continue
+
+        for project, by_model in by_project.items():
+            for model, counters in by_model.items():
+                key = {
+                    "day": day,
+                    "month": day[:7],
+                    "project": project,
+                    "model": model
+                }[group_by]
+                add_counters(groups.setdefault(key, empty_counters()), counters)
+
+    return groups
+
+def query_devices(data_dir, start, end):
+    """Group the per-day series exported by each device
+
+    Counter states of the same device (stale copies, renamed files) are
+    merged by element-wise max before summing, so nothing counts twice.
+    """
+    groups = {}
+    states = {}
+    labels = {}
+
+    for json_file in sorted(device_files(data_dir)):
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Error reading {json_file.name}: {e}", file=sys.stderr)
+            continue
+
+        device_id = data.get('device_id', json_file.stem)
+        state = data.get('counter_state')
+        if state:
+            merge_into(states, state)
+            labels[state['device_uuid']] = device_id
+            continue
+
+        daily = data.get('daily')
+        if daily is None:
+            print(f"⚠️  {device_id} has no per-day series yet (run ccusage-sync there)", file=sys.stderr)
+            continue
+
+        totals = groups.setdefault(device_id, empty_counters())
+        for day, counters in daily.items():
+            if in_range(day, start, end):
+                add_counters(totals, counters)
+
+    for device_uuid, device in states.items():
+        add_counters(groups.setdefault(labels[device_uuid], empty_counters()),
+                     device_totals(device, start, end))
+
+    return groups
+
+def default_data_dir():
+    """Return the synced data directory from the sync config"""
+    if CONFIG_FILE.exists():
+        with open(CONFIG_FILE, 'r') as f:
+            return json.load(f).get('data_dir')
+    return None
+
+def format_cost(counters):
+    """Format the estimated cost of a counter bucket"""
+    return f"${calculate_cost(counters):.2f}"
+
+def display_groups(groups, group_by, start, end):
+    """Print query results as a table"""
+    window = f"{start or 'beginning'} → {end or 'today'}"
+    print("=" * 96)
+    print(f"📊 USAGE BY {group_by.upper()} ({window})")
+    print("=" * 96)
+    print(f"{group_by:<32} {'Sessions':>9} {'Input':>10} {'Output':>11} "
+          f"{'Cache Write':>13} {'Processed':>12} {'Cost':>9}")
+    print("-" * 96)
+
+    # Time-like groups read best chronologically, the rest by size
+    if group_by in ("day", "month"):
+        rows = sorted(groups.items())
+    else:
+        rows = sorted(groups.items(), key=lambda item: calculate_cost(item[1]), reverse=True)
+
+    total = empty_counters()
+    for key, counters in rows:
+        add_counters(total, counters)
+        processed = counters['input_tokens'] + counters['output_tokens'] + counters['cache_creation_tokens']
+        print(f"{key[:32]:<32} {counters['sessions']:>9,} {counters['input_tokens']:>10,} "
+              f"{counters['output_tokens']:>11,} {counters['cache_creation_tokens']:>13,} "
+              f"{processed:>12,} {format_cost(counters):>9}")
+
+    processed = total['input_tokens'] + total['output_tokens'] + total['cache_creation_tokens']
+    print("-" * 96)
+    print(f"{'TOTAL':<32} {total['sessions']:>9,} {total['input_tokens']:>10,} "
+          f"{total['output_tokens']:>11,} {total['cache_creation_tokens']:>13,} "
+          f"{processed:>12,} {format_cost(total):>9}")
+    print("=" * 96)
+
+def main(argv=None):
+    """Main execution"""
+    parser = argparse.ArgumentParser(prog="ccusage query", description="Query usage over any date range")
+    parser.add_argument("--from", dest="start", type=kst_day_arg, metavar="YYYY-MM-DD",
+                        help="first day (inclusive, KST)")
+    parser.add_argument("--to", dest="end", type=kst_day_arg, metavar="YYYY-MM-DD", help="last day (inclusive, KST)")
+    parser.add_argument("--group-by", choices=GROUP_BY_CHOICES, default="day")
+    parser.add_argument("--data-dir", help="device JSON directory for --group-by device")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+    if args.start and args.end and args.start > args.end:
+        parser.error(f"--from {args.start} is after --to {args.end}")
+
+    if args.group_by == "device":
+        data_dir = args.data_dir or default_data_dir()
+        if not data_dir:
+            print("❌ No data directory configured (run ccusage-sync or pass --data-dir)")
+            sys.exit(1)
+        groups = query_devices(data_dir, args.start, args.end)
+    else:
+        groups = query_local(args.group_by, args.start, args.end)
+
+    if args.json:
+        print(json.dumps({
+            "from": args.start,
+            "to": args.end,
+            "group_by": args.group_by,
+            "groups": groups
+        }, indent=2, ensure_ascii=False))
+    else:
+        display_groups(groups, args.group_by, args.start, args.end)
+
+if __name__ == "__main__":
+    main()
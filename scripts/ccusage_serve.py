@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Local HTTP usage API (`ccusage serve`)
+
+Holds the aggregated multi-device state and this machine's DB summary in
+memory and serves them as JSON, so dashboards can poll cheaply instead of
+running a CLI script or fetching raw GitHub URLs:
+
+    GET /totals                         fleet totals + local DB summary
+    GET /devices                        per-device usage (newest per identity)
+    GET /timeseries?from=&to=&device=   per-day counters (fleet, or one device
+                                        by UUID/label, or device=local)
+    GET /goal                           goal progress and forecast (all goals)
+    GET /metrics                        OpenMetrics / Prometheus exposition
+                                        (see ccusage_metrics.py)
+
+Every response carries an ETag; `If-None-Match` gets a 304. Before answering,
+the cache re-stats data/*.json, the cumulative DB and the sync queue (at most once every
+--check-interval seconds) and re-reads only the files whose mtime/size
+changed.
+
+No CORS header is sent by default, so other web pages open in the browser
+cannot read the usage data; `--allow-origin` lets one dashboard origin in.
+
+Usage:
+    ccusage serve [--host 127.0.0.1] [--port 8765] [--data-dir DIR] [--allow-origin ORIGIN]
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import contextlib
+from collections import OrderedDict
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from ccusage_cumulative import db_path, load_database, daily_totals, calculate_cost
+from ccusage_total import read_device_files, combine_devices, device_files
+from ccusage_query import default_data_dir
+from ccusage_crdt import merge_into, daily_series
+from ccusage_goal import GOAL_TOKENS, DEADLINE, goal_forecast
+from ccusage_forecast import processed_series
+from ccusage_metrics import (
+    OPENMETRICS_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE, summarize_db, build_exposition
+)
+from ccusage_sync_queue import QUEUE_FILE, load_queue
+from ccusage_history import RUN_LOG, last_run
+
+# Korea Standard Time (UTC+9)
+KST = timezone(timedelta(hours=9))
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+CHECK_INTERVAL = 2.0  # seconds between stat passes over data/ and the DB
+RESPONSE_CACHE_SIZE = 256  # cached responses per generation (least recently used dropped)
+
+class UsageCache:
+    """In-memory usage state, invalidated by file stat changes"""
+
+    def __init__(self, data_dir, check_interval=CHECK_INTERVAL):
+        self.data_dir = Path(data_dir) if data_dir else None
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.files = {}  # path -> ((mtime_ns, size), (json_file, data, error))
+        self.db_key = None
+        self.local = None
+        self.local_metrics = None
+        self.queue_key = None
+        self.queue = None
+        self.checked_at = 0.0
+        self.generation = 0
+        self.state = {}
+        self.responses = OrderedDict()  # (path, params, openmetrics) -> (etag, body, content type), LRU
+
+    def refresh(self):
+        """Re-read changed device files and DB; rebuild the state if anything changed"""
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval and self.generation:
+            return
+        self.checked_at = now
+
+        changed = self.refresh_device_files()
+        changed = self.refresh_local() or changed
+        changed = self.refresh_queue() or changed
+
+        if changed or not self.generation:
+            self.rebuild()
+
+    def refresh_device_files(self):
+        """Stat the device files; returns True if any file was added, changed or removed"""
+        if not self.data_dir or not self.data_dir.exists():
+            return False
+
+        changed = False
+        seen = set()
+        for json_file in device_files(self.data_dir):
+            try:
+                stat = json_file.stat()
+            except OSError:
+                continue
+            key = (stat.st_mtime_ns, stat.st_size)
+            path = str(json_file)
+            seen.add(path)
+
+            cached = self.files.get(path)
+            if cached and cached[0] == key:
+                continue
+
+            self.files[path] = (key, read_device_files([json_file])[0])
+            changed = True
+
+        for path in set(self.files) - seen:
+            del self.files[path]
+            changed = True
+
+        return changed
+
+    def refresh_local(self):
+        """Reload this machine's DB summary if the DB changed"""
+        try:
+            stat = db_path().stat()
+        except OSError:
+            return False
+
+        # The run log is appended right after the DB is saved
+        run_log_mtime = RUN_LOG.stat().st_mtime_ns if RUN_LOG.exists() else None
+        key = (stat.st_mtime_ns, stat.st_size, run_log_mtime)
+        if key == self.db_key:
+            return False
+
+        db = load_database()
+
+        cumulative = db.get("cumulative_usage", {})
+        self.local = {
+            "last_updated": db.get("last_updated"),
+            "period_start": db.get("period_start"),
+            "usage": cumulative,
+            "estimated_cost": round(calculate_cost(cumulative), 2),
+            "hot_sessions": len(db.get("processed_sessions", {})),
+            "sealed_months": len(db.get("segments", {})),
+            "last_run": last_run(),
+            "daily": daily_totals(db.get("buckets", {}))
+        }
+        self.local_metrics = summarize_db(db, stat.st_size)
+        self.db_key = key
+        return True
+
+    def refresh_queue(self):
+        """Reload the sync queue state (push health) if it changed"""
+        try:
+            stat = QUEUE_FILE.stat()
+        except OSError:
+            return False
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key == self.queue_key:
+            return False
+
+        self.queue = load_queue()
+        self.queue_key = key
+        return True
+
+    def rebuild(self):
+        """Recompute fleet aggregates from the cached device files"""
+        records = [record for _, record in self.files.values()]
+        # combine_devices reports skipped files on stdout; keep the request log clean
+        with contextlib.redirect_stdout(sys.stderr):
+            total_usage, devices, projects, groups = combine_devices(records) if records else ({}, [], {}, {})
+
+        states = {}
+        labels = {}
+        for _, data, error in records:
+            if error is None and data.get('counter_state'):
+                merge_into(states, data['counter_state'])
+                labels[data.get('device_id')] = data['counter_state']['device_uuid']
+
+        self.state = {
+            "total_usage": total_usage,
+            "devices": devices,
+            "projects": projects,
+            "states": states,
+            "labels": labels,
+            "updated_at": datetime.now(KST).isoformat()
+        }
+        self.generation += 1
+        self.responses.clear()
+
+    def response(self, target, openmetrics=True):
+        """Return (etag, body, content type) for a request target, or None if unknown"""
+        with self.lock:
+            self.refresh()
+
+            url = urlsplit(target)
+            path = url.path.rstrip('/') or '/'
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()
+                      if key in VIEW_PARAMS.get(path, ())}
+
+            # Unknown parameters and their order don't make a new response
+            cache_key = (path, tuple(sorted(params.items())), openmetrics)
+            if cache_key in self.responses:
+                self.responses.move_to_end(cache_key)
+                return self.responses[cache_key]
+
+            if path == "/metrics":
+                exposition = build_exposition(self.local_metrics, self.state["devices"],
+                                              self.state["projects"], self.queue)
+                body = exposition.render(openmetrics).encode('utf-8')
+                content_type = OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE
+            elif path in VIEWS:
+                payload = VIEWS[path](self, params)
+                payload["generation"] = self.generation
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                content_type = "application/json; charset=utf-8"
+            else:
+                return None
+
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            self.responses[cache_key] = (etag, body, content_type)
+            if len(self.responses) > RESPONSE_CACHE_SIZE:
+                self.responses.popitem(last=False)
+            return self.responses[cache_key]
+
+def totals_view(cache, params):
+    """GET /totals"""
+    usage = cache.state["total_usage"]
+    return {
+        "devices": len(cache.state["devices"]),
+        "usage": usage,
+        "total_processed": sum(usage.get(key, 0) for key in
+                               ("input_tokens", "output_tokens", "cache_creation_tokens")),
+        "estimated_cost": round(sum(d["cost"] for d in cache.state["devices"]), 2),
+        "updated_at": cache.state["updated_at"],
+        "local": {key: value for key, value in (cache.local or {}).items() if key != "daily"}
+    }
+
+def devices_view(cache, params):
+    """GET /devices"""
+    devices = sorted(cache.state["devices"], key=lambda d: d["cost"], reverse=True)
+    return {"devices": devices}
+
+def timeseries_view(cache, params):
+    """GET /timeseries?from=YYYY-MM-DD&to=YYYY-MM-DD&device=UUID|label|local"""
+    start, end, device = params.get("from"), params.get("to"), params.get("device")
+
+    if device == "local":
+        series = (cache.local or {}).get("daily", {})
+    else:
+        states = cache.state["states"]
+        if device:
+            device_uuid = cache.state["labels"].get(device, device)
+            states = {device_uuid: states[device_uuid]} if device_uuid in states else {}
+
+        series = {}
+        for merged in states.values():
+            for day, counters in daily_series(merged).items():
+                totals = series.setdefault(day, dict.fromkeys(counters, 0))
+                for key, value in counters.items():
+                    totals[key] += value
+
+    series = {day: counters for day, counters in sorted(series.items())
+              if (not start or day >= start) and (not end or day <= end)}
+    return {"from": start, "to": end, "device": device, "daily": series}
+
+def goal_view(cache, params):
+    """GET /goal"""
+    usage = cache.state["total_usage"]
+    if not usage:
+        return {"goal_tokens": GOAL_TOKENS, "deadline": DEADLINE.isoformat(), "progress": None}
+
+    forecast = goal_forecast(usage, processed_series(cache.state["states"]))
+    goal = forecast["goals"][0]
+    return {
+        "goal_tokens": GOAL_TOKENS,
+        "deadline": DEADLINE.isoformat(),
+        "progress": goal,
+        "model": goal["model"],
+        "expected_daily": goal["expected_daily"],
+        "projected_total": goal["projected_total"],
+        "on_track": goal["on_track"],
+        "forecast": forecast
+    }
+
+VIEWS = {
+    "/totals": totals_view,
+    "/devices": devices_view,
+    "/timeseries": timeseries_view,
+    "/goal": goal_view
+}
+VIEW_PARAMS = {"/timeseries": ("from", "to", "device")}  # query parameters each view reads
+
+def make_handler(cache, allow_origin=None):
+    """Build a request handler bound to one cache (CORS only for `allow_origin`)"""
+
+    class UsageHandler(BaseHTTPRequestHandler):
+        server_version = "ccusage-serve/1"
+
+        def do_GET(self):
+            openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+            result = cache.response(self.path, openmetrics)
+            if result is None:
+                self.send_error(404, f"Unknown endpoint (try {', '.join(VIEWS)}, /metrics)")
+                return
+
+            etag, body, content_type = result
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_cors_header()
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_cors_header()
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_cors_header(self):
+            if allow_origin:
+                self.send_header("Access-Control-Allow-Origin", allow_origin)
+
+        def log_message(self, format, *args):
+            print(f"🌐 {self.address_string()} {format % args}")
+
+    return UsageHandler
+
+def main(argv=None):
+    """Main execution"""
+    parser = argparse.ArgumentParser(prog="ccusage serve", description="Serve usage totals over local HTTP")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--data-dir", help="device JSON directory (default: from the sync config)")
+    parser.add_argument("--check-interval", type=float, default=CHECK_INTERVAL,
+                        help="seconds between checks for changed files")
+    parser.add_argument("--allow-origin", metavar="ORIGIN",
+                        help="let browser pages from ORIGIN (e.g. https://you.github.io) read the API")
+    args = parser.parse_args(argv)
+
+    data_dir = args.data_dir or default_data_dir()
+    if not data_dir:
+        print("⚠️  No data directory configured: serving this machine's DB only")
+
+    cache = UsageCache(data_dir, args.check_interval)
+    with cache.lock:
+        cache.refresh()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cache, args.allow_origin))
+    print(f"🚀 Serving usage API on http://{args.host}:{args.port} ({', '.join(VIEWS)}, /metrics)")
+    print(f"   {len(cache.files)} device files, DB: {db_path()}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
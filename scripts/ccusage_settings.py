@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Shared reporting settings for the ccusage scripts
+
+Cutoff date and goal window used to be module constants spread across
+ccusage_cumulative.py, ccusage_goal.py and index.html. They now live in the
+sync config file (~/.claude/usage_sync_config.json) and fall back to the
+original values when not set:
+
+    {
+      "cutoff_date": "2025-10-01",
+      "goal_tokens": 100000000,
+      "goal_deadline": "2025-12-31",
+      "sync_mode": "cas"
+    }
+
+Several named goals, each with its own window, go in "goals" (see
+goal_list); without it the single goal_tokens/goal_deadline goal is used.
+Where session logs are read from is set by "log_roots" (see ccusage_sources).
+In a repo shared by a team, "user" puts this machine's export under
+data/<user>/ (see ccusage_total --team).
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import json
+import argparse
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+# Korea Standard Time (UTC+9)
+KST = timezone(timedelta(hours=9))
+
+CONFIG_FILE = Path.home() / ".claude" / "usage_sync_config.json"
+
+DEFAULT_SETTINGS = {
+    "cutoff_date": "2025-10-01",  # Sessions before this date are never counted
+    "goal_tokens": 100_000_000,
+    "goal_deadline": "2025-12-31",
+    "sync_mode": "cas",  # "cas" (lock-free tree merge) or "rebase" (pull --rebase)
+    "sync_min_tokens": 1_000_000,  # auto_sync --adaptive: sync once this many new tokens pile up
+    "sync_max_interval_minutes": 360,  # ...or once any change is this old
+    "device_groups": {},  # group name -> hostname glob(s), e.g. {"containers": "devbox-*"}
+    "db_format": "compact",  # "compact" (header + gzip body, ccusage_dbformat.py) or "json" (legacy)
+    "goals": [],  # [{"name": "Q1", "tokens": 50000000, "start": "2026-01-01", "deadline": "2026-03-31"}]
+    "alert_rules": [],  # budget rules evaluated after each run (ccusage_alerts.py)
+    "alert_hooks": [],  # where alerts go besides the console: command / webhook / desktop
+    "log_roots": [],  # where session logs are read from (ccusage_sources.py); [] = ~/.claude/projects
+    "user": "",  # team repos: export to data/<user>/<device>.json ("" = flat data/<device>.json)
+    "offline_first": False,  # ccusage-total/-goal answer from the last snapshot (ccusage_mirror.py)
+    "read_workers": 1  # threads reading device files; 1 = serial (a pool only pays off on network filesystems)
+}
+
+def load_settings():
+    """Load reporting settings, falling back to defaults"""
+    settings = dict(DEFAULT_SETTINGS)
+
+    if CONFIG_FILE.exists():
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                config = json.load(f)
+            for key in DEFAULT_SETTINGS:
+                if key in config:
+                    settings[key] = config[key]
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    return settings
+
+def parse_kst_date(date_str):
+    """Parse a YYYY-MM-DD string as midnight KST"""
+    return datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=KST)
+
+def kst_day_arg(value):
+    """argparse type for a YYYY-MM-DD (KST) day, zero-padded so it compares with the day keys"""
+    try:
+        return parse_kst_date(value).strftime("%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}' (expected YYYY-MM-DD)")
+
+def goal_list(settings):
+    """Named goals with their windows; the legacy single goal if none are configured
+
+    Each goal is {"name", "tokens", "start", "deadline"} with dates as
+    YYYY-MM-DD (KST); "start" defaults to the cutoff date.
+    """
+    goals = []
+    for index, goal in enumerate(settings.get("goals") or []):
+        goals.append({
+            "name": goal.get("name") or f"goal-{index + 1}",
+            "tokens": int(goal["tokens"]),
+            "start": max(goal.get("start") or settings["cutoff_date"], settings["cutoff_date"]),
+            "deadline": goal["deadline"]
+        })
+
+    if not goals:
+        goals.append({
+            "name": f"{settings['goal_tokens'] / 1_000_000:g}M",
+            "tokens": settings["goal_tokens"],
+            "start": settings["cutoff_date"],
+            "deadline": settings["goal_deadline"]
+        })
+
+    return goals
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Log-source adapters: where usage records are read from
+
+The scan used to read only ~/.claude/projects/**/*.jsonl. Logs are now
+found under any number of roots ("log_roots" in the sync config, default
+~/.claude/projects) by three adapters:
+
+    jsonl    plain session logs (*.jsonl)
+    archive  rotated logs compressed as *.jsonl.gz or *.jsonl.zst
+             (.zst needs the optional `zstandard` package)
+    tar      bundles (*.tar, *.tar.gz, *.tgz) of session logs
+
+    "log_roots": [
+      "~/.claude/projects",
+      {"path": "/mnt/devbox/home/me/.claude/projects"},
+      {"path": "~/claude-log-archive", "adapters": ["archive", "tar"]}
+    ]
+
+Every adapter yields LogSource objects that read the same way: a stream of
+complete lines starting at an uncompressed byte offset, plus a size/mtime
+and a fingerprint of the first bytes. So the per-file checkpoints
+(offset + fingerprint) work for all of them; compressed streams are
+decompressed as they are read, never loaded whole.
+
+Finding the logs is cheap on big or network-mounted trees: directories
+are read with os.scandir and their listings cached by directory mtime,
+so only directories that gained or lost entries are listed again, and
+sources are yielded while the walk is still going.
+
+An archived log keeps the name of the log it was rotated from (x.jsonl.gz
+counts as x.jsonl), so records seen before rotation are not counted again.
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import io
+import os
+import gzip
+import time
+import tarfile
+import hashlib
+from pathlib import Path, PurePosixPath
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for *.zst archives
+    zstandard = None
+
+DEFAULT_ROOT = Path.home() / ".claude" / "projects"
+ADAPTERS = ["jsonl", "archive", "tar"]
+HEAD_BYTES = 1024  # bytes fingerprinted to detect rewritten log files
+SKIP_CHUNK = 1 << 20  # bytes decompressed at a time when skipping to an offset
+DIR_SETTLE_NS = 2_000_000_000  # directory listings younger than this are re-read next time
+
+ARCHIVE_SUFFIXES = {".jsonl.gz": "gzip", ".jsonl.zst": "zstd"}
+TAR_SUFFIXES = {".tar": "plain", ".tar.gz": "gzip", ".tgz": "gzip", ".tar.zst": "zstd"}
+
+zstd_warned = False  # the missing-zstandard warning is printed once per process
+
+class LogSource:
+    """One log stream: a plain file, a compressed archive, or a member of a tar bundle
+
+    Plain data (picklable), so sources can be handed to worker processes.
+    """
+
+    def __init__(self, path, compression, project, name, size, mtime_ns,
+                 member=None, start=0, length=None, container=None):
+        self.path = str(path)
+        self.compression = compression  # "plain", "gzip" or "zstd" (of the file at path)
+        self.project = project
+        self.name = name  # log name used in session IDs ("<uuid>.jsonl")
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.member = member  # tar member name
+        self.start = start  # offset of the log inside the decompressed file
+        self.length = length  # bytes of the log (tar members), None = to the end
+        self.container = container  # [size, mtime_ns] of the tar bundle a member came from
+
+    @property
+    def key(self):
+        """Checkpoint key"""
+        return f"{self.path}::{self.member}" if self.member else self.path
+
+    def open_stream(self, offset):
+        """Binary stream positioned at `offset` bytes into the log"""
+        position = self.start + offset
+        if self.compression == "plain":
+            stream = open(self.path, 'rb')
+            stream.seek(position)
+            return stream
+
+        if self.compression == "gzip":
+            stream = gzip.open(self.path, 'rb')
+        elif zstandard is not None:
+            raw = zstandard.ZstdDecompressor().stream_reader(open(self.path, 'rb'), read_across_frames=True)
+            stream = io.BufferedReader(raw)
+        else:
+            raise OSError("reading .zst logs needs the zstandard package (pip install zstandard)")
+
+        # Compressed streams can only move forward: decompress and discard
+        while position > 0:
+            skipped = len(stream.read(min(position, SKIP_CHUNK)))
+            if not skipped:
+                break
+            position -= skipped
+        return stream
+
+    def head_digest(self):
+        """Fingerprint of the first bytes of the log"""
+        limit = HEAD_BYTES if self.length is None else min(HEAD_BYTES, self.length)
+        with self.open_stream(0) as stream:
+            return hashlib.md5(stream.read(limit)).hexdigest()
+
+    def tail_digest(self, offset):
+        """Fingerprint of the bytes just before offset (plain files only, else None)
+
+        Catches a log that was truncated and then grew past its old
+        checkpoint between two scans: size and head both look fine then.
+        """
+        if self.compression != "plain":
+            return None
+        with open(self.path, 'rb') as stream:
+            stream.seek(self.start + max(0, offset - HEAD_BYTES))
+            return hashlib.md5(stream.read(min(offset, HEAD_BYTES))).hexdigest()
+
+    def read_complete_lines(self, offset):
+        """Yield (line bytes, end offset) for every complete line after offset
+
+        A trailing line without newline is still being written; it is left
+        for the next run instead of being consumed half-way.
+        """
+        remaining = None if self.length is None else self.length - offset
+        with self.open_stream(offset) as stream:
+            for raw_line in stream:
+                if remaining is not None:
+                    if remaining <= 0:
+                        break
+                    raw_line = raw_line[:remaining]
+                    remaining -= len(raw_line)
+                if not raw_line.endswith(b'\n'):
+                    break
+                offset += len(raw_line)
+                yield raw_line, offset
+
+def resume_offset(source, checkpoint):
+    """Return the byte offset to resume reading at, or None if unchanged
+
+    Claude session logs are append-only, so a log whose size and mtime
+    match its checkpoint has nothing new. A log that shrank or whose first
+    bytes changed was rewritten and is read again from the start (already
+    counted records are still deduplicated by session ID), and so is one
+    whose bytes before the checkpoint changed (truncated, then appended to).
+    """
+    if not checkpoint:
+        return 0
+
+    if source.size == checkpoint["size"] and source.mtime_ns == checkpoint["mtime_ns"]:
+        return None
+
+    if (source.compression == "plain" and source.size < checkpoint["offset"]) \
+            or source.head_digest() != checkpoint["head"]:
+        return 0
+
+    # Checkpoints written before the tail fingerprint existed have none
+    if checkpoint.get("tail") and source.tail_digest(checkpoint["offset"]) != checkpoint["tail"]:
+        return 0
+
+    return checkpoint["offset"]
+
+def make_checkpoint(source, offset):
+    """Build the checkpoint stored for a log after reading it up to offset"""
+    return {
+        "size": source.size,
+        "mtime_ns": source.mtime_ns,
+        "offset": offset,
+        "head": source.head_digest(),
+        "tail": source.tail_digest(offset)
+    }
+
+def configured_roots(settings):
+    """[(root Path, adapters)] from the "log_roots" setting"""
+    roots = []
+    for entry in settings.get("log_roots") or [str(DEFAULT_ROOT)]:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        adapters = [adapter for adapter in entry.get("adapters", ADAPTERS) if adapter in ADAPTERS]
+        roots.append((Path(entry["path"]).expanduser(), adapters))
+    return roots
+
+def project_for(parts):
+    """Project directory of a log from its path parts below the root"""
+    return parts[0] if len(parts) > 1 else "unknown"
+
+def below_projects(parts):
+    """Path parts below the last projects/ directory (copies of a whole ~/.claude)"""
+    if "projects" in parts[:-1]:
+        return parts[len(parts) - 1 - parts[::-1].index("projects"):][1:]
+    return parts
+
+def classify(name, adapters):
+    """(adapter, compression, log name) for a file name, or None if no adapter reads it"""
+    if "jsonl" in adapters and name.endswith(".jsonl"):
+        return "jsonl", "plain", name
+    if "archive" in adapters:
+        for suffix, compression in ARCHIVE_SUFFIXES.items():
+            if name.endswith(suffix):
+                return "archive", compression, name[:-len(suffix)] + ".jsonl"
+    if "tar" in adapters:
+        for suffix, compression in TAR_SUFFIXES.items():
+            if name.endswith(suffix):
+                return "tar", compression, None
+    return None
+
+def tar_members(path, compression, stat):
+    """Sources for the *.jsonl members of a tar bundle (reads the tar headers once)"""
+    mode = {"plain": "r:", "gzip": "r:gz"}.get(compression)
+    if mode is None:
+        # tarfile cannot read zstd itself: list the members from a decompressing stream
+        source = LogSource(path, compression, "unknown", path.name, stat.st_size, stat.st_mtime_ns)
+        tar = tarfile.open(fileobj=source.open_stream(0), mode="r|")
+    else:
+        tar = tarfile.open(path, mode)
+
+    with tar:
+        for info in tar:
+            if not info.isfile() or not info.name.endswith(".jsonl"):
+                continue
+            parts = below_projects(PurePosixPath(info.name).parts)
+            yield LogSource(path, compression, project_for(parts), parts[-1], info.size,
+                            int(info.mtime) * 1_000_000_000, member=info.name,
+                            start=info.offset_data, length=info.size,
+                            container=[stat.st_size, stat.st_mtime_ns])
+
+def list_directory(directory):
+    """(log file names, subdirectory names) of one directory, read with os.scandir
+
+    Names are kept for every adapter, so the cached listing stays valid
+    when a root's adapters are changed.
+    """
+    files, subdirs = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif classify(entry.name, ADAPTERS):
+                    files.append(entry.name)
+            except OSError:
+                continue
+    return files, subdirs
+
+def walk_logs(root, cached=None, listed=None):
+    """Yield (path, stat) for every log file under root, depth-first as found
+
+    A directory's mtime only changes when entries are added, removed or
+    renamed in it, so the previous run's listing (`cached`, {directory:
+    [mtime_ns, files, subdirs]}) lets an unchanged directory be stat()ed
+    instead of listed again; logs inside it are still stat()ed one by one,
+    since appending to a file does not touch its directory. Every
+    directory walked is recorded in `listed`. Listings younger than
+    DIR_SETTLE_NS are not trusted next time: an entry created within the
+    same mtime tick would otherwise go unnoticed.
+    """
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            continue
+
+        entry = cached.get(directory) if cached else None
+        if not entry or entry[0] != mtime_ns:
+            try:
+                files, subdirs = list_directory(directory)
+            except OSError:
+                continue
+            settled = time.time_ns() - mtime_ns > DIR_SETTLE_NS
+            entry = [mtime_ns if settled else None, files, subdirs]
+        if listed is not None:
+            listed[directory] = entry
+        files, subdirs = entry[1], entry[2]
+
+        for name in files:
+            path = os.path.join(directory, name)
+            try:
+                yield Path(path), os.stat(path)
+            except OSError:
+                continue
+
+        stack.extend(os.path.join(directory, name) for name in reversed(subdirs))
+
+def file_sources(path, stat, parts, adapters, containers=None):
+    """Sources read from one log file or tar bundle (`parts`: its path parts below the root)
+
+    A tar bundle is only opened when its own size/mtime differ from
+    `containers` ({path: [size, mtime_ns]}, see record_containers);
+    otherwise its members are all unchanged and skipped without reading it.
+    """
+    global zstd_warned
+
+    kind = classify(path.name, adapters)
+    if kind is None:
+        return
+
+    adapter, compression, log_name = kind
+    if compression == "zstd" and zstandard is None:
+        if not zstd_warned:
+            print("⚠️  Skipping .zst logs: install zstandard to read them (pip install zstandard)")
+            zstd_warned = True
+        return
+
+    if adapter != "tar":
+        yield LogSource(path, compression, project_for(parts), log_name,
+                        stat.st_size, stat.st_mtime_ns)
+        return
+
+    if containers is not None and containers.get(str(path)) == [stat.st_size, stat.st_mtime_ns]:
+        return
+    try:
+        members = list(tar_members(path, compression, stat))
+    except (OSError, tarfile.TarError, EOFError) as e:
+        print(f"⚠️  Error reading {path.name}: {e}")
+        return
+    yield from members
+
+def iter_sources(settings, containers=None, inventory=None):
+    """Yield a LogSource for every log under the configured roots, as soon as it is found
+
+    `inventory` is the cached directory listing (see walk_logs), replaced
+    by the new one once the walk is complete. Unchanged tar bundles are
+    skipped via `containers` (see file_sources).
+    """
+    listed = {}
+    for root, adapters in configured_roots(settings):
+        if not root.exists():
+            continue
+
+        for path, stat in walk_logs(root, inventory, listed):
+            yield from file_sources(path, stat, path.relative_to(root).parts, adapters, containers)
+
+    if inventory is not None:
+        inventory.clear()
+        inventory.update(listed)
+
+def sources_for_path(path):
+    """Yield a LogSource for every log in one file, archive, tar bundle or directory tree
+
+    For logs found outside the configured roots (`ccusage import`). A copy
+    of a whole ~/.claude keeps the project layout below projects/; a single
+    file takes its parent directory as project.
+    """
+    path = Path(path).expanduser().resolve()
+    if path.is_file():
+        yield from file_sources(path, path.stat(), (path.parent.name, path.name), ADAPTERS)
+        return
+
+    for log_path, stat in walk_logs(path):
+        yield from file_sources(log_path, stat, below_projects(log_path.relative_to(path).parts), ADAPTERS)
+
+def record_containers(containers, sources, failed_keys):
+    """Remember tar bundles whose members were all read without error
+
+    `failed_keys` are the keys of sources that could not be read; their
+    bundles stay unrecorded so the next run opens them again.
+    """
+    failed = {source.path for source in sources if source.key in failed_keys}
+    for source in sources:
+        if source.container and source.path not in failed:
+            containers[source.path] = source.container
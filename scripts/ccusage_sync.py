@@ -12,16 +12,20 @@ import os
 import sys
 import io
 import json
-import socket
 import subprocess
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
 
+from ccusage_cumulative import db_path, load_totals, export_counter_state
+from ccusage_settings import load_settings
+from ccusage_identity import load_identity, device_data_file, hostname_label
+from ccusage_sync_queue import enqueue_export, drain, start_background_worker, LOG_FILE
+
 # Korea Standard Time (UTC+9)
 KST = timezone(timedelta(hours=9))
 
 # Set UTF-8 encoding for Windows
-if sys.platform == 'win32':
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
@@ -42,48 +46,52 @@ def save_config(config):
     with open(CONFIG_FILE, 'w') as f:
         json.dump(config, f, indent=2)
 
-def export_usage_data(output_file):
-    """Export cumulative usage data to JSON file"""
-    db_file = Path.home() / ".claude" / "cumulative_usage.json"
-
-    if not db_file.exists():
-        print(f"⚠️  No cumulative usage database found at {db_file}")
-        print("   Run 'ccusage' first to initialize the database")
-        return False
+def build_export_data(totals, identity):
+    """Device JSON contents (web dashboard format) from the sidecar totals"""
+    cumulative = totals["cumulative_usage"]
+
+    # Calculate estimated cost (Sonnet 4.5 pricing)
+    input_cost = (cumulative.get("input_tokens", 0) / 1_000_000) * 3.0
+    output_cost = (cumulative.get("output_tokens", 0) / 1_000_000) * 15.0
+    cache_write_cost = (cumulative.get("cache_creation_tokens", 0) / 1_000_000) * 3.75
+    cache_read_cost = (cumulative.get("cache_read_tokens", 0) / 1_000_000) * 0.30
+    estimated_cost = input_cost + output_cost + cache_write_cost + cache_read_cost
+
+    return {
+        "device_id": identity["label"],
+        "device_uuid": identity["uuid"],
+        "device_label": identity["label"],
+        "previous_ids": identity.get("previous_ids", []),
+        "user": load_settings()["user"] or None,
+        "hostname": hostname_label(),
+        "last_updated": datetime.now(KST).isoformat(),
+        "period_start": totals["period_start"],
+        "period_end": datetime.now(KST).strftime("%Y-%m-%d"),
+        "usage": {
+            "input_tokens": cumulative.get("input_tokens", 0),
+            "output_tokens": cumulative.get("output_tokens", 0),
+            "cache_creation_tokens": cumulative.get("cache_creation_tokens", 0),
+            "cache_read_tokens": cumulative.get("cache_read_tokens", 0),
+            "total_sessions": cumulative.get("total_sessions", 0)
+        },
+        "estimated_cost": round(estimated_cost, 2),
+        "counter_state": export_counter_state(totals, identity["uuid"]),
+        "projects": totals["projects"]
+    }
 
+def export_usage_data(output_file, identity=None):
+    """Export cumulative usage data to JSON file"""
     try:
-        # Load cumulative database
-        with open(db_file, 'r', encoding='utf-8') as f:
-            db = json.load(f)
-
-        # Get device info
-        device_id = socket.gethostname().replace('.', '-').replace(' ', '-').lower()
-
-        # Get cumulative usage
-        cumulative = db.get("cumulative_usage", {})
-
-        # Calculate estimated cost (Sonnet 4.5 pricing)
-        input_cost = (cumulative.get("input_tokens", 0) / 1_000_000) * 3.0
-        output_cost = (cumulative.get("output_tokens", 0) / 1_000_000) * 15.0
-        cache_write_cost = (cumulative.get("cache_creation_tokens", 0) / 1_000_000) * 3.75
-        cache_read_cost = (cumulative.get("cache_read_tokens", 0) / 1_000_000) * 0.30
-        estimated_cost = input_cost + output_cost + cache_write_cost + cache_read_cost
+        # Load the sidecar totals (not the whole DB)
+        totals = load_totals()
+        if totals is None:
+            print(f"⚠️  No cumulative usage database found at {db_path()}")
+            print("   Run 'ccusage' first to initialize the database")
+            return False
 
         # Prepare export data (compatible with web dashboard format)
-        export_data = {
-            "device_id": device_id,
-            "last_updated": datetime.now(KST).isoformat(),
-            "period_start": db.get("period_start", "2025-10-01"),
-            "period_end": datetime.now(KST).strftime("%Y-%m-%d"),
-            "usage": {
-                "input_tokens": cumulative.get("input_tokens", 0),
-                "output_tokens": cumulative.get("output_tokens", 0),
-                "cache_creation_tokens": cumulative.get("cache_creation_tokens", 0),
-                "cache_read_tokens": cumulative.get("cache_read_tokens", 0),
-                "total_sessions": cumulative.get("total_sessions", 0)
-            },
-            "estimated_cost": round(estimated_cost, 2)
-        }
+        identity = identity or load_identity()
+        export_data = build_export_data(totals, identity)
 
         # Save to output file
         output_file.parent.mkdir(parents=True, exist_ok=True)
@@ -91,15 +99,13 @@ def export_usage_data(output_file):
             json.dump(export_data, f, indent=2, ensure_ascii=False)
 
         # Display summary
-        total_input = cumulative.get("input_tokens", 0)
-        total_output = cumulative.get("output_tokens", 0)
-        total_sessions = cumulative.get("total_sessions", 0)
-
-        print(f"✅ Exported usage data for {device_id}")
-        print(f"   Sessions: {total_sessions:,}")
-        print(f"   Input tokens: {total_input:,}")
-        print(f"   Output tokens: {total_output:,}")
-        print(f"   Estimated cost: ${estimated_cost:.2f}")
+        usage = export_data["usage"]
+
+        print(f"✅ Exported usage data for {export_data['device_id']}")
+        print(f"   Sessions: {usage['total_sessions']:,}")
+        print(f"   Input tokens: {usage['input_tokens']:,}")
+        print(f"   Output tokens: {usage['output_tokens']:,}")
+        print(f"   Estimated cost: ${export_data['estimated_cost']:.2f}")
         print(f"   → {output_file}")
 
         return True
@@ -199,8 +205,8 @@ Generated by Claude Code.
 
     return config
 
-def sync_usage():
-    """Export usage and sync to Git"""
+def sync_usage(wait=False):
+    """Export usage and sync to Git (in the background unless wait=True)"""
     # Load config
     config = load_config()
 
@@ -224,102 +230,29 @@ def sync_usage():
     print()
 
     # Export usage
-    device_id = socket.gethostname().replace('.', '-').replace(' ', '-').lower()
-    output_file = data_dir / f"{device_id}.json"
+    identity = load_identity()
+    device_id = identity["label"]
+    output_file = device_data_file(data_dir, identity, load_settings()["user"])
 
     print("📊 Exporting local usage...")
-    if not export_usage_data(output_file):
+    if not export_usage_data(output_file, identity):
         print("❌ Export failed")
         sys.exit(1)
 
     print()
 
-    # Git sync
-    print("🔄 Syncing to Git...")
+    # Git sync: queue the export and let the sync worker push it
+    pending = enqueue_export(repo_path, device_id, output_file)
 
-    should_pop_stash = False
-    try:
-        # Check for unstaged changes (excluding data/)
-        status_result = subprocess.run(
-            ['git', 'status', '--porcelain'],
-            cwd=repo_path,
-            capture_output=True,
-            text=True
-        )
-        
-        # Check if there are changes other than data/ directory
-        other_changes = [line for line in status_result.stdout.splitlines() 
-                        if line and not line.strip().startswith('??') and 'data/' not in line]
-        
-        # Stash other changes if any (before pull --rebase)
-        if other_changes:
-            print("📦 Stashing other changes...")
-            subprocess.run(['git', 'stash', '--include-untracked', '-m', 'Auto-stash before sync'], 
-                         cwd=repo_path, check=False, capture_output=True)
-            should_pop_stash = True
-
-        # Fetch and pull FIRST (before adding local changes)
-        subprocess.run(['git', 'fetch', 'origin'], cwd=repo_path, check=False, capture_output=True)
-
-        pull_result = subprocess.run(
-            ['git', 'pull', '--rebase', 'origin', 'main'],
-            cwd=repo_path,
-            capture_output=True,
-            text=True
-        )
-
-        # Add data changes AFTER pull (so rebase doesn't unstage them)
-        subprocess.run(['git', 'add', 'data/'], cwd=repo_path, check=True)
-
-        # Commit data changes if any
-        commit_msg = f"Update usage from {device_id} - {datetime.now(KST).strftime('%Y-%m-%d %H:%M KST')}"
-        result = subprocess.run(
-            ['git', 'commit', '-m', commit_msg],
-            cwd=repo_path,
-            capture_output=True,
-            text=True
-        )
-
-        if result.returncode == 0:
-            print("✅ Changes committed")
-
-            # Push
-            push_result = subprocess.run(
-                ['git', 'push'],
-                cwd=repo_path,
-                capture_output=True,
-                text=True
-            )
-
-            if push_result.returncode == 0:
-                print("✅ Pushed to remote")
-            else:
-                print("⚠️  Push failed (may need to set up remote)")
-                print(push_result.stderr)
-        else:
-            if "nothing to commit" in result.stdout:
-                print("ℹ️  No changes since last sync")
-            else:
-                print("⚠️  Commit failed")
-                print(result.stderr)
-        
-        # Restore stashed changes if any
-        if should_pop_stash:
-            pop_result = subprocess.run(
-                ['git', 'stash', 'pop'],
-                cwd=repo_path,
-                capture_output=True,
-                text=True
-            )
-            if pop_result.returncode == 0:
-                print("📦 Restored stashed changes")
-
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Git operation failed: {e}")
-        # Restore stash even on error
-        if should_pop_stash:
-            subprocess.run(['git', 'stash', 'pop'], cwd=repo_path, check=False)
-        sys.exit(1)
+    if wait:
+        print("🔄 Syncing to Git...")
+        if not drain():
+            print("⚠️  Push failed, export stays queued and will be retried")
+            print("   Check: python scripts/ccusage_sync_queue.py status")
+    else:
+        start_background_worker()
+        print(f"🔄 Queued for Git sync ({pending} pending), pushing in the background")
+        print(f"   Log: {LOG_FILE}")
 
     print()
     print("=" * 70)
@@ -330,4 +263,4 @@ def sync_usage():
     print("=" * 70)
 
 if __name__ == "__main__":
-    sync_usage()
+    sync_usage(wait='--wait' in sys.argv[1:])
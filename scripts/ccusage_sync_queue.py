@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Background Git sync queue with retry/backoff
+
+ccusage-sync and auto_sync.py used to block on `git fetch`/`pull`/`push`
+and simply print a failed push. Exports are now recorded in a local queue
+(~/.claude/sync_queue.json) and pushed by a detached asyncio worker:
+
+- several queued exports coalesce into one commit + one push
+- failed pushes are retried with exponential backoff (and stay queued
+  across runs until they succeed)
+- only one worker runs at a time (lock file next to the queue, kept
+  fresh while it works); queue updates from exporters and the worker are
+  serialized by a second, short-lived lock
+
+Two push strategies, chosen by "sync_mode" in the sync config:
+
+- "cas" (default): each device owns exactly one data file, so instead of
+  `pull --rebase` we fetch, build a commit whose tree is the remote tree
+  with this device's blob(s) replaced (in a private index file), and push
+  it as a fast-forward. If another device won the race the push is
+  rejected and we rebuild on the new remote head (compare-and-swap). No
+  rebase, no stash, no working-tree changes.
+- "rebase": commit locally, `pull --rebase --autostash`, push.
+
+Either way the pushed tree carries data/_index.json, the list of device
+files the web dashboard loads (it cannot list data/ itself). It is
+rebuilt from the tree being pushed, so racing devices never drop each
+other's entries. Its "team_rollup_current" says whether that push also
+carried data/_team.json (ccusage-total --team --publish); a plain device
+push makes the rollup stale and the dashboard reads the device files.
+
+Usage:
+    python ccusage_sync_queue.py drain     # run the worker in the foreground
+    python ccusage_sync_queue.py status    # show pending exports / last error
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import uuid
+import random
+import asyncio
+import contextlib
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+
+from ccusage_settings import load_settings
+
+# Korea Standard Time (UTC+9)
+KST = timezone(timedelta(hours=9))
+
+# Set UTF-8 encoding for Windows
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+QUEUE_FILE = Path.home() / ".claude" / "sync_queue.json"
+LOCK_FILE = Path.home() / ".claude" / "sync_queue.lock"
+QUEUE_LOCK_FILE = Path.home() / ".claude" / "sync_queue.json.lock"
+LOG_FILE = Path.home() / ".claude" / "sync_queue.log"
+
+BACKOFF_BASE = 5          # seconds before the first retry
+BACKOFF_MAX = 15 * 60     # never wait longer than this between retries
+MAX_ATTEMPTS = 8          # per worker run; the queue survives for the next run
+GIT_TIMEOUT = 120         # seconds per git command
+CAS_RETRIES = 20          # compare-and-swap rounds before falling back to backoff
+STALE_LOCK_SECONDS = 60 * 60
+STALE_QUEUE_LOCK_SECONDS = 30  # a queue update takes milliseconds
+DEVICE_MANIFEST = "data/_index.json"  # device file list for the web dashboard, repo-relative
+TEAM_ROLLUP_PATH = "data/_team.json"  # ccusage_total.TEAM_ROLLUP, repo-relative
+
+def load_queue():
+    """Load the sync queue state"""
+    if QUEUE_FILE.exists():
+        try:
+            with open(QUEUE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    return {
+        "pending": [],
+        "attempts": 0,
+        "next_attempt_at": None,
+        "last_error": None,
+        "last_success_at": None,
+        "push_failures": 0
+    }
+
+def save_queue(queue):
+    """Save the sync queue state atomically"""
+    QUEUE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = QUEUE_FILE.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(queue, f, indent=2, ensure_ascii=False)
+    tmp_file.replace(QUEUE_FILE)
+
+@contextlib.contextmanager
+def locked_queue():
+    """Load the queue for a read-modify-write; saved on exit
+
+    Exporters and the worker update the queue from different processes, so
+    the update runs under an exclusive lock file (broken if its owner died
+    mid-update) instead of last-writer-wins.
+    """
+    QUEUE_LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        try:
+            fd = os.open(QUEUE_LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - QUEUE_LOCK_FILE.stat().st_mtime > STALE_QUEUE_LOCK_SECONDS:
+                    QUEUE_LOCK_FILE.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.01)
+
+    try:
+        os.close(fd)
+        queue = load_queue()
+        yield queue
+        save_queue(queue)
+    finally:
+        QUEUE_LOCK_FILE.unlink(missing_ok=True)
+
+def enqueue_export(repo_path, device_id, data_file, reason="sync"):
+    """Record an exported device file that still has to be pushed"""
+    with locked_queue() as queue:
+        queue["pending"].append({
+            "id": uuid.uuid4().hex,
+            "enqueued_at": datetime.now(KST).isoformat(),
+            "repo_path": str(repo_path),
+            "device_id": device_id,
+            "file": str(data_file),
+            "reason": reason
+        })
+        # A fresh export is worth trying right away
+        queue["next_attempt_at"] = None
+    return len(queue["pending"])
+
+def is_device_path(path):
+    """data/<device>.json or data/<user>/<device>.json (layout of ccusage_total.device_files_by_user)"""
+    parts = path.split('/')
+    return (parts[0] == 'data' and len(parts) in (2, 3) and parts[-1].endswith('.json')
+            and not any(part.startswith(('_', '.')) for part in parts[1:]))
+
+def manifest_json(paths, rollup_current):
+    """data/_index.json contents for the repo-relative `paths` of a tree"""
+    files = sorted(path[len('data/'):] for path in paths if is_device_path(path))
+    return json.dumps({"files": files, "team_rollup_current": rollup_current},
+                      indent=2, ensure_ascii=False) + "\n"
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter for the given attempt number"""
+    delay = min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+def acquire_lock():
+    """Take the single-worker lock, breaking it if its owner is long gone"""
+    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        if time.time() - LOCK_FILE.stat().st_mtime < STALE_LOCK_SECONDS:
+            return False
+        LOCK_FILE.unlink()
+        return acquire_lock()
+
+    with os.fdopen(fd, 'w') as f:
+        f.write(str(os.getpid()))
+    return True
+
+def touch_lock():
+    """Mark the worker lock as alive so a long run is not mistaken for a dead one"""
+    try:
+        os.utime(LOCK_FILE)
+    except FileNotFoundError:
+        pass
+
+def release_lock():
+    """Release the single-worker lock"""
+    try:
+        LOCK_FILE.unlink()
+    except FileNotFoundError:
+        pass
+
+async def run_git(repo_path, *args, env=None):
+    """Run a git command without blocking the event loop
+
+    Messages are matched below ("rejected", "nothing to commit"), so git
+    runs in the C locale whatever the user's language is.
+    """
+    process = await asyncio.create_subprocess_exec(
+        'git', *args,
+        cwd=repo_path,
+        env=dict(env or os.environ, LC_ALL='C'),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), GIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return 1, "", f"git {args[0]} timed out after {GIT_TIMEOUT}s"
+
+    return process.returncode, stdout.decode('utf-8', 'replace'), stderr.decode('utf-8', 'replace')
+
+async def push_batch(repo_path, batch):
+    """Commit and push a coalesced batch of exports; returns an error or None"""
+    files = sorted({entry["file"] for entry in batch})
+    devices = sorted({entry["device_id"] for entry in batch})
+
+    code, _, err = await run_git(repo_path, 'add', '--', *files)
+    if code != 0:
+        return f"git add failed: {err.strip()}"
+
+    commit_msg = (f"Update usage from {', '.join(devices)} - "
+                  f"{datetime.now(KST).strftime('%Y-%m-%d %H:%M KST')}")
+    if len(batch) > 1:
+        commit_msg += f" ({len(batch)} exports)"
+
+    code, out, err = await run_git(repo_path, 'commit', '-m', commit_msg, '--', *files)
+    if code != 0 and "nothing to commit" not in out + err and "no changes added" not in out + err:
+        return f"git commit failed: {err.strip() or out.strip()}"
+
+    # Integrate remote changes (other devices) before pushing
+    code, _, err = await run_git(repo_path, 'pull', '--rebase', '--autostash', 'origin', 'main')
+    if code != 0:
+        await run_git(repo_path, 'rebase', '--abort')
+        return f"git pull --rebase failed: {err.strip()}"
+
+    # Refresh the device manifest from the rebased tree
+    code, out, err = await run_git(repo_path, 'ls-tree', '-r', '-z', '--name-only', 'HEAD', '--', 'data')
+    if code != 0:
+        return f"git ls-tree failed: {err.strip()}"
+    manifest = Path(repo_path) / DEVICE_MANIFEST
+    repo_root = Path(repo_path).resolve()
+    pushed = {Path(data_file).resolve().relative_to(repo_root).as_posix() for data_file in files}
+    content = manifest_json(out.split('\0'), TEAM_ROLLUP_PATH in pushed)
+    if not manifest.exists() or manifest.read_text(encoding='utf-8') != content:
+        manifest.write_text(content, encoding='utf-8')
+        await run_git(repo_path, 'add', '--', DEVICE_MANIFEST)
+        code, out, err = await run_git(repo_path, 'commit', '-m', 'Update device manifest', '--', DEVICE_MANIFEST)
+        if code != 0:
+            return f"git commit failed: {err.strip() or out.strip()}"
+
+    code, _, err = await run_git(repo_path, 'push', 'origin', 'HEAD:main')
+    if code != 0:
+        return f"git push failed: {err.strip()}"
+
+    return None
+
+async def push_batch_cas(repo_path, batch):
+    """Push a batch as "remote tree + our blobs" with compare-and-swap retry"""
+    repo_root = Path(repo_path).resolve()
+    files = sorted({entry["file"] for entry in batch})
+    devices = sorted({entry["device_id"] for entry in batch})
+
+    # Store our blobs once; they don't change between CAS rounds
+    blobs = {}
+    for data_file in files:
+        code, out, err = await run_git(repo_path, 'hash-object', '-w', '--', data_file)
+        if code != 0:
+            return f"git hash-object failed: {err.strip()}"
+        blobs[Path(data_file).resolve().relative_to(repo_root).as_posix()] = out.strip()
+
+    code, git_dir, err = await run_git(repo_path, 'rev-parse', '--absolute-git-dir')
+    if code != 0:
+        return f"not a git repository: {err.strip()}"
+
+    # Private index so the user's index and working tree are never touched
+    scratch = Path(git_dir.strip()) / f"ccusage-sync-{os.getpid()}"
+    env = dict(os.environ, GIT_INDEX_FILE=str(scratch.with_suffix(".index")))
+
+    try:
+        for round_number in range(1, CAS_RETRIES + 1):
+            touch_lock()
+            code, _, err = await run_git(repo_path, 'fetch', '--quiet', 'origin', 'main')
+            if code != 0:
+                return f"git fetch failed: {err.strip()}"
+
+            code, out, _ = await run_git(repo_path, 'rev-parse', '--verify', '--quiet', 'FETCH_HEAD^{commit}')
+            remote_head = out.strip()
+
+            if remote_head:
+                code, _, err = await run_git(repo_path, 'read-tree', remote_head, env=env)
+            else:
+                code, _, err = await run_git(repo_path, 'read-tree', '--empty', env=env)
+            if code != 0:
+                return f"git read-tree failed: {err.strip()}"
+
+            for path, blob in blobs.items():
+                code, _, err = await run_git(
+                    repo_path, 'update-index', '--add', '--cacheinfo', f"100644,{blob},{path}", env=env)
+                if code != 0:
+                    return f"git update-index failed: {err.strip()}"
+
+            error = await stage_manifest(repo_path, env, scratch.with_suffix(".manifest"), TEAM_ROLLUP_PATH in blobs)
+            if error:
+                return error
+
+            code, out, err = await run_git(repo_path, 'write-tree', env=env)
+            if code != 0:
+                return f"git write-tree failed: {err.strip()}"
+            tree = out.strip()
+
+            if remote_head:
+                _, remote_tree, _ = await run_git(repo_path, 'rev-parse', f"{remote_head}^{{tree}}")
+                if remote_tree.strip() == tree:
+                    print("ℹ️  Remote already has this data")
+                    return None
+
+            commit_msg = (f"Update usage from {', '.join(devices)} - "
+                          f"{datetime.now(KST).strftime('%Y-%m-%d %H:%M KST')}")
+            parents = ['-p', remote_head] if remote_head else []
+            code, out, err = await run_git(repo_path, 'commit-tree', tree, *parents, '-m', commit_msg)
+            if code != 0:
+                return f"git commit-tree failed: {err.strip()}"
+            commit = out.strip()
+
+            # A plain (non-force) push only succeeds if main is still remote_head
+            code, _, err = await run_git(repo_path, 'push', '--quiet', 'origin', f"{commit}:refs/heads/main")
+            if code == 0:
+                await run_git(repo_path, 'update-ref', 'refs/remotes/origin/main', commit)
+                await stage_clean_paths(repo_path, blobs)
+                return None
+
+            if "rejected" not in err and "fetch first" not in err and "non-fast-forward" not in err:
+                return f"git push failed: {err.strip()}"
+
+            # Lost the race to another device: rebuild on the new head
+            print(f"🔀 Remote moved, retrying on new head (round {round_number})")
+            await asyncio.sleep(random.uniform(0, 0.2 * round_number))
+
+        return f"git push kept losing the race after {CAS_RETRIES} rounds"
+
+    finally:
+        for suffix in (".index", ".manifest"):
+            scratch.with_suffix(suffix).unlink(missing_ok=True)
+
+async def stage_manifest(repo_path, env, scratch_file, rollup_current):
+    """Add data/_index.json for the tree in the private index; returns an error or None"""
+    code, out, err = await run_git(repo_path, 'ls-files', '-z', '--', 'data', env=env)
+    if code != 0:
+        return f"git ls-files failed: {err.strip()}"
+    scratch_file.write_text(manifest_json(out.split('\0'), rollup_current), encoding='utf-8')
+
+    code, out, err = await run_git(repo_path, 'hash-object', '-w', '--', str(scratch_file))
+    if code != 0:
+        return f"git hash-object failed: {err.strip()}"
+    code, _, err = await run_git(
+        repo_path, 'update-index', '--add', '--cacheinfo', f"100644,{out.strip()},{DEVICE_MANIFEST}", env=env)
+    if code != 0:
+        return f"git update-index failed: {err.strip()}"
+    return None
+
+async def stage_clean_paths(repo_path, blobs):
+    """Stage pushed blobs in the user's index where nothing else is staged
+
+    Lets a later `git pull` fast-forward over our (identical) working-tree
+    files instead of refusing. A path the user has staged changes for is
+    left alone, so their index is never overwritten.
+    """
+    for path, blob in blobs.items():
+        code, _, _ = await run_git(repo_path, 'diff', '--cached', '--quiet', 'HEAD', '--', path)
+        if code == 0:
+            await run_git(repo_path, 'update-index', '--add', '--cacheinfo', f"100644,{blob},{path}")
+
+async def drain_queue():
+    """Push pending exports until the queue is empty or retries run out"""
+    attempts_this_run = 0
+
+    while True:
+        touch_lock()
+        queue = load_queue()
+        if not queue["pending"]:
+            print("✅ Sync queue empty")
+            return True
+
+        if queue["next_attempt_at"]:
+            wait = (datetime.fromisoformat(queue["next_attempt_at"]) - datetime.now(KST)).total_seconds()
+            if wait > 0:
+                print(f"⏳ Next attempt in {wait:.0f}s")
+                await asyncio.sleep(wait)
+                continue
+
+        # Coalesce everything queued so far, grouped per repository
+        batch = queue["pending"]
+        by_repo = {}
+        for entry in batch:
+            by_repo.setdefault(entry["repo_path"], []).append(entry)
+
+        push = push_batch if load_settings()["sync_mode"] == "rebase" else push_batch_cas
+
+        print(f"🔄 Pushing {len(batch)} queued export(s)...")
+        errors = []
+        for repo_path, entries in by_repo.items():
+            error = await push(repo_path, entries)
+            if error:
+                errors.append(error)
+
+        # Re-read under the lock: exports may have been queued while we were pushing
+        if not errors:
+            done = {entry["id"] for entry in batch}
+            with locked_queue() as queue:
+                queue["pending"] = [entry for entry in queue["pending"] if entry["id"] not in done]
+                queue["attempts"] = 0
+                queue["next_attempt_at"] = None
+                queue["last_error"] = None
+                queue["last_success_at"] = datetime.now(KST).isoformat()
+            print(f"✅ Pushed {len(batch)} export(s)")
+            continue
+
+        attempts_this_run += 1
+        with locked_queue() as queue:
+            queue["attempts"] += 1
+            queue["push_failures"] += 1
+            queue["last_error"] = "; ".join(errors)
+            delay = backoff_delay(queue["attempts"])
+            queue["next_attempt_at"] = (datetime.now(KST) + timedelta(seconds=delay)).isoformat()
+        print(f"⚠️  {queue['last_error']}")
+
+        if attempts_this_run >= MAX_ATTEMPTS:
+            print(f"❌ Giving up for now after {attempts_this_run} attempts (exports stay queued)")
+            return False
+
+        print(f"🔁 Retrying in {delay:.0f}s (attempt {queue['attempts']})")
+
+def drain():
+    """Run the worker in the foreground, unless another worker already runs"""
+    while True:
+        if not acquire_lock():
+            print("ℹ️  Another sync worker is already running")
+            return True
+
+        try:
+            ok = asyncio.run(drain_queue())
+        finally:
+            release_lock()
+
+        # An export queued between the last empty check and release_lock()
+        # saw our lock and started no worker: it is ours to push
+        if not ok or not load_queue()["pending"]:
+            return ok
+
+def start_background_worker():
+    """Start a detached worker process so the caller returns immediately"""
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    log = open(LOG_FILE, 'a', encoding='utf-8')
+
+    kwargs = {}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+
+    subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), 'drain'],
+        stdin=subprocess.DEVNULL,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        env=dict(os.environ, PYTHONIOENCODING='utf-8'),
+        **kwargs
+    )
+    log.close()
+
+def display_status():
+    """Show the queue state"""
+    queue = load_queue()
+    print(f"📦 Pending exports:   {len(queue['pending'])}")
+    for entry in queue["pending"]:
+        print(f"   - {entry['device_id']} ({entry['reason']}) queued {entry['enqueued_at']}")
+    print(f"🔁 Failed attempts:   {queue['attempts']} (total push failures: {queue['push_failures']})")
+    if queue["next_attempt_at"]:
+        print(f"⏳ Next attempt at:   {queue['next_attempt_at']}")
+    if queue["last_error"]:
+        print(f"⚠️  Last error:        {queue['last_error']}")
+    print(f"✅ Last success:      {queue['last_success_at'] or 'never'}")
+
+def main():
+    """Main execution"""
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "drain":
+        print(f"🚀 Sync worker started at {datetime.now(KST).strftime('%Y-%m-%d %H:%M:%S KST')}")
+        sys.exit(0 if drain() else 1)
+    elif command == "status":
+        display_status()
+    else:
+        print(f"Usage: {Path(__file__).name} [drain|status]")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
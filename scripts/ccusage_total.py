@@ -2,28 +2,66 @@
 """
 Show combined Claude usage from all devices
 
+Device files live in data/<device>.json, or in a repo shared by a team in
+data/<user>/<device>.json ("user" in the sync config). With --team the
+aggregation is hierarchical, device -> user -> team:
+
+    data/<user>/_user.json   per-user summary (devices, totals, projects)
+    data/_team.json          team rollup read by the web dashboard in one fetch
+
+A user's summary is only rebuilt when one of their device files changed
+(size/mtime, remembered in ~/.claude/team_rollup_state.json); the team
+rollup is then summed from the small per-user summaries. Flat device
+files in data/ count as the user "(unassigned)".
+
+Usage:
+    ccusage-total                    # all devices
+    ccusage-total --team             # per-user breakdown, update the rollups
+    ccusage-total --team --publish   # ...and queue changed rollups for push
+    ccusage-total --cached           # instant answer from the last snapshot (ccusage_mirror.py)
+
 Created & Directed by Bohee Lee
 https://github.com/bohee-connectome
 
 Built with Claude Code
 """
 
+import os
 import json
 import sys
 import io
-import subprocess
+import heapq
+import argparse
+from fnmatch import fnmatch
+from itertools import chain
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from ccusage_settings import load_settings, parse_kst_date
+from ccusage_identity import identity_key
+from ccusage_cumulative import calculate_cost
+from ccusage_crdt import merge_into, device_totals
+from ccusage_mirror import pull_repo, cached_view, save_snapshot
 
 # Korea Standard Time (UTC+9)
 KST = timezone(timedelta(hours=9))
 
 # Set UTF-8 encoding for Windows
-if sys.platform == 'win32':
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 CONFIG_FILE = Path.home() / ".claude" / "usage_sync_config.json"
+TEAM_STATE_FILE = Path.home() / ".claude" / "team_rollup_state.json"
+SETTINGS = load_settings()
+PERIOD_START = parse_kst_date(SETTINGS["cutoff_date"])
+READ_WORKERS = SETTINGS["read_workers"]  # 1 = serial (faster on local disks, see ccusage_bench aggregate)
+READ_BATCH = 64  # device files per worker task
+USER_SUMMARY = "_user.json"  # per-user summary, next to the user's device files
+TEAM_ROLLUP = "_team.json"  # team rollup, in data/
+UNASSIGNED_USER = "(unassigned)"  # owner of flat data/<device>.json files
+TEAM_TOP_PROJECTS = 100  # projects kept in the team rollup
 
 def load_config():
     """Load sync configuration"""
@@ -38,39 +76,129 @@ def load_config():
         return json.load(f)
 
 def pull_latest(repo_path):
-    """Pull latest data from Git"""
+    """Pull latest data from Git (bounded by PULL_TIMEOUT); returns True on success"""
     print("🔄 Pulling latest data...")
-    result = subprocess.run(
-        ['git', 'pull'],
-        cwd=repo_path,
-        capture_output=True,
-        text=True
-    )
+    ok, error = pull_repo(repo_path)
 
-    if result.returncode != 0:
-        print("⚠️  Pull failed (continuing with local data)")
-        print(result.stderr)
+    if not ok:
+        print(f"⚠️  Pull failed (continuing with local data): {error}")
     else:
         print("✅ Data synced")
 
     print()
-
-def aggregate_usage(data_dir):
-    """Aggregate usage from all device JSON files"""
+    return ok
+
+def is_device_file(entry):
+    """Device JSON files; "_"-prefixed rollups and other files are skipped"""
+    return entry.name.endswith('.json') and not entry.name.startswith('_') and entry.is_file()
+
+def device_files_by_user(data_dir):
+    """{user: [device file Path]} for data/<device>.json and data/<user>/<device>.json"""
+    users = {}
+    for entry in os.scandir(data_dir):
+        if is_device_file(entry):
+            users.setdefault(UNASSIGNED_USER, []).append(Path(entry.path))
+        elif entry.is_dir() and not entry.name.startswith(('.', '_')):
+            files = [Path(sub.path) for sub in os.scandir(entry.path) if is_device_file(sub)]
+            if files:
+                users[entry.name] = files
+    return users
+
+def device_files(data_dir):
+    """Every device file under data/, flat or per user"""
+    return list(chain.from_iterable(device_files_by_user(data_dir).values()))
+
+def read_device_files(json_files):
+    """Read a batch of device JSON files (runs in a worker thread)
+
+    Files are handed out in batches: one future per file costs more than
+    reading a small JSON file from a warm cache.
+    """
+    results = []
+    for json_file in json_files:
+        try:
+            with open(json_file, 'r') as f:
+                results.append((json_file, json.load(f), None))
+        except Exception as e:
+            results.append((json_file, None, e))
+    return results
+
+def parse_updated(last_updated):
+    """Parse a device file's last_updated for newest-wins comparisons"""
+    try:
+        dt = datetime.fromisoformat(last_updated.replace('Z', '+00:00'))
+        return dt if dt.tzinfo else dt.replace(tzinfo=KST)
+    except (AttributeError, ValueError):
+        return datetime.min.replace(tzinfo=timezone.utc)
+
+def device_group(device_id, data, group_patterns):
+    """Return the group a device belongs to: its own label, else the first matching pattern"""
+    if data.get('group'):
+        return data['group']
+
+    for name, patterns in group_patterns.items():
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        if any(fnmatch(device_id, pattern) for pattern in patterns):
+            return name
+
+    return None
+
+def aggregate_usage(data_dir, group_patterns=None, workers=READ_WORKERS, extra_devices=()):
+    """Aggregate usage from all device JSON files
+
+    Devices are optionally rolled up into groups by hostname pattern
+    (fnmatch) or by a "group" label in their JSON.
+
+    Devices that publish a counter_state are counted from the merge of all
+    their snapshots (element-wise max per day bucket) rather than from the
+    newest file alone, so a device restored from an old backup cannot make
+    the fleet total go backwards.
+
+    `extra_devices` are device dicts not (yet) in data_dir, e.g. this
+    machine's unsynced totals; they merge like any other file.
+    """
+    return combine_devices(read_all_devices(data_dir, workers, extra_devices), group_patterns)
+
+def read_all_devices(data_dir, workers=READ_WORKERS, extra_devices=()):
+    """Stream (json_file, data, error) records for every device file plus extras
+
+    Files are read serially unless `workers` > 1 (a thread pool, for data
+    on a slow network filesystem); results stream in so callers can reduce
+    them without holding every file at once.
+    """
     data_dir = Path(data_dir)
 
     if not data_dir.exists():
         print(f"❌ Data directory not found: {data_dir}")
         sys.exit(1)
 
-    json_files = list(data_dir.glob("*.json"))
+    json_files = device_files(data_dir)
 
-    if not json_files:
+    if not json_files and not extra_devices:
         print("❌ No usage data found")
         print()
         print("Make sure to run 'ccusage-sync' on each device first")
         sys.exit(1)
 
+    if workers > 1:
+        batches = [json_files[i:i + READ_BATCH] for i in range(0, len(json_files), READ_BATCH)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            yield from chain.from_iterable(pool.map(read_device_files, batches))
+    else:
+        yield from read_device_files(json_files)
+    for data in extra_devices:
+        yield Path(f"{data['device_id']}.local"), data, None
+
+def combine_devices(records, group_patterns=None):
+    """Reduce (json_file, data, error) records to fleet totals
+
+    Returns (total_usage, devices, projects, groups). Shared by
+    aggregate_usage and the long-running `ccusage serve` cache, which feeds
+    it device files it already holds in memory.
+    """
+    group_patterns = group_patterns or {}
+
     # Aggregate data
     total_usage = {
         'input_tokens': 0,
@@ -81,42 +209,278 @@ def aggregate_usage(data_dir):
     }
 
     devices = []
+    projects = {}
+    groups = {}
+
+    # Keep only the newest file per device identity (renamed machines and
+    # leftover files would otherwise be counted twice)
+    newest = {}
+    states = {}
+    seen = 0
+    overridden = 0  # published files of a device whose local (".local") totals were passed in
+    claimed = set()  # legacy IDs adopted by UUID devices (ccusage_identity.py --adopt)
+    for json_file, data, error in records:
+        seen += 1
+        if error is not None:
+            print(f"⚠️  Error reading {json_file.name}: {error}")
+            continue
 
-    for json_file in json_files:
-        try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
+        if data.get('counter_state'):
+            merge_into(states, data['counter_state'])
+        if data.get('device_uuid'):
+            claimed.update(f"id:{previous}" for previous in data.get('previous_ids') or [])
+
+        key = identity_key(data, json_file.stem)
+        if key in newest and '.local' in (json_file.suffix, newest[key][1].suffix):
+            overridden += 1
+        updated = parse_updated(data.get('last_updated'))
+        if key not in newest or updated > newest[key][0]:
+            newest[key] = (updated, json_file, data)
+
+    # A legacy file is the same machine's data from before it had a UUID
+    for key in claimed.intersection(newest):
+        del newest[key]
+
+    duplicates = seen - len(newest) - overridden
+    if duplicates > 0:
+        print(f"ℹ️  Ignored {duplicates} stale or unreadable device file(s)")
+        print()
 
-            device_info = {
-                'device_id': data.get('device_id', json_file.stem),
-                'last_updated': data.get('last_updated'),
-                'cost': data.get('estimated_cost', 0)
-            }
+    for key, (_, json_file, data) in newest.items():
+        device_info = {
+            'device_id': data.get('device_id', json_file.stem),
+            'device_uuid': data.get('device_uuid'),
+            'previous_ids': data.get('previous_ids') or [],
+            'last_updated': data.get('last_updated'),
+            'cost': data.get('estimated_cost', 0)
+        }
+
+        usage = data.get('usage', {})
+        if key in states:
+            merged = device_totals(states[key])
+            usage = {k: merged[k] for k in total_usage if k in merged}
+            usage['total_sessions'] = merged['sessions']
+            device_info['cost'] = round(calculate_cost(usage), 2)
+
+        # Add to totals
+        for field in total_usage:
+            total_usage[field] += usage.get(field, 0)
+
+        # Store device info
+        device_info['usage'] = usage
+        devices.append(device_info)
+
+        # Roll the device up into its group
+        group = device_group(device_info['device_id'], data, group_patterns)
+        if group:
+            group_totals = groups.setdefault(group, dict.fromkeys([*total_usage, 'devices', 'cost'], 0))
+            for field in total_usage:
+                group_totals[field] += usage.get(field, 0)
+            group_totals['devices'] += 1
+            group_totals['cost'] += device_info['cost']
+
+        # Merge per-project rollups (same project may appear on several devices)
+        for project, counters in data.get('projects', {}).items():
+            merged = projects.setdefault(project, {
+                'input_tokens': 0,
+                'output_tokens': 0,
+                'cache_creation_tokens': 0,
+                'cache_read_tokens': 0,
+                'sessions': 0,
+                'estimated_cost': 0,
+                'devices': 0
+            })
+            for field in merged:
+                merged[field] += counters.get(field, 0)
+            merged['devices'] += 1
+
+    return total_usage, devices, projects, groups
+
+def build_user_summary(user, json_files):
+    """Summarize one user's device files (newest per identity, merged counter states)
+
+    Each device keeps its own project rollup so the team rollup can count a
+    device exported under two users (e.g. after "user" was set) only once.
+    """
+    records = read_device_files(json_files)
+    total_usage, devices, _, _ = combine_devices(records)
+
+    newest = {}
+    for json_file, data, error in records:
+        if error is not None:
+            continue
+        key = identity_key(data, json_file.stem)
+        if key not in newest or parse_updated(data.get('last_updated')) > parse_updated(newest[key].get('last_updated')):
+            newest[key] = data
+
+    for device in devices:
+        device['projects'] = newest.get(identity_key(device, None), {}).get('projects', {})
+
+    return {
+        'user': user,
+        'generated_at': datetime.now(KST).isoformat(),
+        'usage': total_usage,
+        'estimated_cost': round(sum(device['cost'] for device in devices), 2),
+        'devices': devices,
+        'last_updated': max((device['last_updated'] for device in devices if device['last_updated']),
+                            key=parse_updated, default=None)
+    }
+
+def team_rollup(summaries):
+    """Sum per-user summaries into the team rollup
+
+    Returns (rollup, devices). A device found under several users counts
+    once, for the user with its newest export, and a legacy file (e.g. at
+    the data/ root) claimed through a device's previous_ids not at all.
+    """
+    owners = {}
+    for user, summary in summaries.items():
+        for device in summary['devices']:
+            key = identity_key(device, None)
+            updated = parse_updated(device.get('last_updated'))
+            if key in owners:
+                print(f"ℹ️  {device['device_id']} is exported under both {owners[key][1]} and {user}, counting the newest")
+                if updated <= owners[key][0]:
+                    continue
+            owners[key] = (updated, user, device)
+
+    for _, _, device in list(owners.values()):
+        if device.get('device_uuid'):
+            for previous in device.get('previous_ids') or []:
+                owners.pop(f"id:{previous}", None)
+
+    usage_keys = ['input_tokens', 'output_tokens', 'cache_creation_tokens', 'cache_read_tokens', 'total_sessions']
+    total_usage = dict.fromkeys(usage_keys, 0)
+    users = {}
+    projects = {}
+    devices = []
 
-            usage = data.get('usage', {})
+    for _, user, device in owners.values():
+        usage = device['usage']
+        totals = users.setdefault(user, {'usage': dict.fromkeys(usage_keys, 0), 'estimated_cost': 0,
+                                         'devices': 0, 'last_updated': None})
+        for key in usage_keys:
+            totals['usage'][key] += usage.get(key, 0)
+            total_usage[key] += usage.get(key, 0)
+        totals['estimated_cost'] += device['cost']
+        totals['devices'] += 1
+        if device['last_updated'] and (not totals['last_updated'] or
+                                       parse_updated(device['last_updated']) > parse_updated(totals['last_updated'])):
+            totals['last_updated'] = device['last_updated']
+
+        for project, counters in device.get('projects', {}).items():
+            merged = projects.setdefault(project, dict.fromkeys(
+                ['input_tokens', 'output_tokens', 'cache_creation_tokens', 'cache_read_tokens',
+                 'sessions', 'estimated_cost', 'devices'], 0))
+            for key in merged:
+                merged[key] += counters.get(key, 0)
+            merged['devices'] += 1
+
+        devices.append({key: value for key, value in device.items() if key != 'projects'})
+
+    for totals in users.values():
+        totals['estimated_cost'] = round(totals['estimated_cost'], 2)
+    for counters in projects.values():
+        counters['estimated_cost'] = round(counters['estimated_cost'], 2)
+
+    top_projects = sorted(projects.items(), key=lambda item: item[1]['estimated_cost'], reverse=True)
+    rollup = {
+        'generated_at': datetime.now(KST).isoformat(),
+        'period_start': SETTINGS['cutoff_date'],
+        'usage': total_usage,
+        'estimated_cost': round(sum(totals['estimated_cost'] for totals in users.values()), 2),
+        'devices': len(devices),
+        'users': dict(sorted(users.items(), key=lambda item: item[1]['estimated_cost'], reverse=True)),
+        'projects': dict(top_projects[:TEAM_TOP_PROJECTS]),
+        'projects_total': len(projects),
+        'last_updated': max((totals['last_updated'] for totals in users.values() if totals['last_updated']),
+                            key=parse_updated, default=None)
+    }
+    return rollup, devices
+
+def file_signature(path):
+    """[size, mtime_ns] of a file"""
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+def write_rollup(path, data):
+    """Write a rollup atomically unless only its generated_at would change; returns True if written"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+        if {**existing, 'generated_at': None} == {**data, 'generated_at': None}:
+            return False
+    except (OSError, json.JSONDecodeError):
+        pass
+
+    tmp_file = path.with_name(path.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    tmp_file.replace(path)
+    return True
+
+def update_rollups(data_dir, force=False):
+    """Refresh the per-user summaries that are out of date, then the team rollup
+
+    Returns (rollup, devices, rebuilt users, written files).
+    """
+    data_dir = Path(data_dir).resolve()
+    state = {}
+    if TEAM_STATE_FILE.exists():
+        try:
+            with open(TEAM_STATE_FILE, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            state = {}
+    if state.get('data_dir') != str(data_dir):
+        state = {'data_dir': str(data_dir), 'users': {}}
+
+    by_user = device_files_by_user(data_dir)
+    summaries = {}
+    rebuilt = []
+    written = []
+
+    for user, json_files in sorted(by_user.items()):
+        summary_file = (data_dir if user == UNASSIGNED_USER else data_dir / user) / USER_SUMMARY
+        signature = {json_file.name: file_signature(json_file) for json_file in json_files}
+        cached = state['users'].get(user)
+
+        # Unchanged subtree: reuse the summary written last time
+        if not force and cached and cached['files'] == signature and summary_file.exists() \
+                and file_signature(summary_file) == cached['summary']:
+            try:
+                with open(summary_file, 'r', encoding='utf-8') as f:
+                    summaries[user] = json.load(f)
+                continue
+            except (OSError, json.JSONDecodeError):
+                pass
 
-            # Add to totals
-            total_usage['input_tokens'] += usage.get('input_tokens', 0)
-            total_usage['output_tokens'] += usage.get('output_tokens', 0)
-            total_usage['cache_creation_tokens'] += usage.get('cache_creation_tokens', 0)
-            total_usage['cache_read_tokens'] += usage.get('cache_read_tokens', 0)
-            total_usage['total_sessions'] += usage.get('total_sessions', 0)
+        summary = build_user_summary(user, json_files)
+        if write_rollup(summary_file, summary):
+            written.append(summary_file)
+        state['users'][user] = {'files': signature, 'summary': file_signature(summary_file)}
+        summaries[user] = summary
+        rebuilt.append(user)
 
-            # Store device info
-            device_info['usage'] = usage
-            devices.append(device_info)
+    for user in set(state['users']) - set(by_user):
+        del state['users'][user]
 
-        except Exception as e:
-            print(f"⚠️  Error reading {json_file.name}: {e}")
-            continue
+    rollup, devices = team_rollup(summaries)
+    team_file = data_dir / TEAM_ROLLUP
+    if write_rollup(team_file, rollup):
+        written.append(team_file)
 
-    return total_usage, devices
+    TEAM_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(TEAM_STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
 
-def display_results(total_usage, devices):
-    """Display formatted results"""
+    return rollup, devices, rebuilt, written
+
+def display_results(total_usage, devices, top=20):
+    """Display formatted results (top devices by cost)"""
     print("=" * 70)
     print("CLAUDE TOTAL USAGE (All Devices)")
-    print(f"Period: October 1, 2025 - {datetime.now(KST).strftime('%B %d, %Y')}")
+    print(f"Period: {PERIOD_START.strftime('%B %d, %Y')} - {datetime.now(KST).strftime('%B %d, %Y')}")
     print("=" * 70)
     print()
 
@@ -160,10 +524,10 @@ def display_results(total_usage, devices):
     print("=" * 70)
     print()
 
-    # Sort devices by cost
-    devices_sorted = sorted(devices, key=lambda d: d['cost'], reverse=True)
+    # Top-K by cost without sorting the whole fleet
+    top_devices = heapq.nlargest(top, devices, key=lambda d: d['cost'])
 
-    for device in devices_sorted:
+    for device in top_devices:
         usage = device['usage']
         device_total = (
             usage.get('input_tokens', 0) +
@@ -187,10 +551,131 @@ def display_results(total_usage, devices):
         print(f"   Updated: {last_updated}")
         print()
 
+    if len(devices) > top:
+        print(f"... and {len(devices) - top:,} more devices (use --top N to show more)")
+        print()
+
+    print("=" * 70)
+
+def display_groups(groups):
+    """Display usage rolled up by device group"""
+    print("🗂️  BREAKDOWN BY DEVICE GROUP:")
+    print("=" * 70)
+    print()
+    print(f"{'Group':<28} {'Devices':>8} {'Processed':>16} {'Cost':>12}")
+    print("-" * 67)
+
+    for name, totals in sorted(groups.items(), key=lambda item: item[1]['cost'], reverse=True):
+        processed = totals['input_tokens'] + totals['output_tokens'] + totals['cache_creation_tokens']
+        print(f"{name[:28]:<28} {totals['devices']:>8,} {processed:>16,} "
+              f"{'$' + format(totals['cost'], '.2f'):>12}")
+
+    print()
     print("=" * 70)
 
+def display_users(rollup, top):
+    """Display the team rollup by user"""
+    print("👥 BREAKDOWN BY USER:")
+    print("=" * 70)
+    print()
+    print(f"{'User':<28} {'Devices':>8} {'Processed':>16} {'Cost':>12}")
+    print("-" * 67)
+
+    for user, totals in list(rollup['users'].items())[:top]:
+        usage = totals['usage']
+        processed = usage['input_tokens'] + usage['output_tokens'] + usage['cache_creation_tokens']
+        print(f"{user[:28]:<28} {totals['devices']:>8,} {processed:>16,} "
+              f"{'$' + format(totals['estimated_cost'], '.2f'):>12}")
+
+    if len(rollup['users']) > top:
+        print(f"... and {len(rollup['users']) - top} more users")
+    print()
+    print("=" * 70)
+
+def display_projects(projects, top):
+    """Display the top projects across all devices"""
+    print("📁 TOP PROJECTS (All Devices):")
+    print("=" * 70)
+    print()
+
+    if not projects:
+        print("ℹ️  No per-project data yet (run ccusage-sync on each device)")
+        print()
+        print("=" * 70)
+        return
+
+    top_projects = sorted(projects.items(), key=lambda item: item[1]['estimated_cost'], reverse=True)[:top]
+
+    print(f"{'Project':<40} {'Processed':>14} {'Sessions':>9} {'Cost':>10}")
+    print("-" * 76)
+    for project, counters in top_projects:
+        processed = counters['input_tokens'] + counters['output_tokens'] + counters['cache_creation_tokens']
+        print(f"{project[:40]:<40} {processed:>14,} {counters['sessions']:>9,} "
+              f"{'$' + format(counters['estimated_cost'], '.2f'):>10}")
+
+    if len(projects) > top:
+        print(f"... and {len(projects) - top} more projects")
+    print()
+    print("=" * 70)
+
+def run_team(repo_path, data_dir, args):
+    """Hierarchical team aggregation: refresh changed user summaries, then the team rollup"""
+    if not data_dir.exists():
+        print(f"❌ Data directory not found: {data_dir}")
+        sys.exit(1)
+
+    rollup, devices, rebuilt, written = update_rollups(data_dir, force=args.rebuild)
+    if not devices:
+        print("❌ No usage data found")
+        sys.exit(1)
+
+    print(f"🧮 User summaries rebuilt: {len(rebuilt)}" + (f" ({', '.join(rebuilt[:10])})" if rebuilt else ""))
+    print()
+
+    display_results(rollup['usage'], devices, args.top)
+    print()
+    display_users(rollup, args.top)
+
+    if args.by_project:
+        print()
+        display_projects(rollup['projects'], args.top)
+
+    if args.publish:
+        from ccusage_identity import load_identity
+        from ccusage_sync_queue import enqueue_export, start_background_worker
+
+        if not written:
+            print("ℹ️  Rollups unchanged, nothing to push")
+            return
+        label = load_identity()["label"]
+        for path in written:
+            enqueue_export(repo_path, label, path, reason="team rollup")
+        start_background_worker()
+        print(f"✅ {len(written)} rollup file(s) queued for push")
+
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Show combined Claude usage from all devices")
+    parser.add_argument("--by-project", action="store_true", help="also show top projects across devices")
+    parser.add_argument("--top", type=int, default=20, help="number of devices/projects to show (default: 20)")
+    parser.add_argument("--group", action="append", default=[], metavar="NAME=PATTERN",
+                        help="roll devices matching a hostname pattern into a group (repeatable)")
+    parser.add_argument("--team", action="store_true",
+                        help="aggregate device -> user -> team and update the data/ rollups")
+    parser.add_argument("--publish", action="store_true", help="with --team: queue changed rollups for push")
+    parser.add_argument("--rebuild", action="store_true", help="with --team: rebuild every user summary")
+    parser.add_argument("--cached", action="store_true",
+                        help="answer from the last snapshot, refresh it in the background")
+    parser.add_argument("--fresh", action="store_true", help="pull and aggregate now (overrides offline_first)")
+    args = parser.parse_args()
+
+    # Fresh lists, so --group never appends to the configured ones in SETTINGS
+    group_patterns = {name: [patterns] if isinstance(patterns, str) else list(patterns)
+                      for name, patterns in SETTINGS["device_groups"].items()}
+    for spec in args.group:
+        name, _, pattern = spec.partition('=')
+        group_patterns.setdefault(name, []).append(pattern or name)
+
     print("🚀 Claude Total Usage Calculator")
     print()
 
@@ -200,14 +685,38 @@ def main():
     repo_path = Path(config['repo_path'])
     data_dir = Path(config['data_dir'])
 
-    # Pull latest data
-    pull_latest(repo_path)
+    # Stale-while-revalidate: the snapshot holds the configured device groups only
+    cached = None
+    if (args.cached or SETTINGS["offline_first"]) and not args.fresh and not args.team and not args.group:
+        cached = cached_view("total")
+
+    if cached:
+        total_usage, devices = cached["usage"], cached["devices"]
+        projects, groups = cached["projects"], cached["groups"]
+    else:
+        # Pull latest data
+        pulled = pull_latest(repo_path)
+
+        if args.team:
+            run_team(repo_path, data_dir, args)
+            return
 
-    # Aggregate usage
-    total_usage, devices = aggregate_usage(data_dir)
+        # Aggregate usage
+        total_usage, devices, projects, groups = aggregate_usage(data_dir, group_patterns)
+        if not args.group:
+            save_snapshot("total", {"usage": total_usage, "devices": devices, "projects": projects, "groups": groups},
+                          datetime.now(KST).isoformat() if pulled else None)
 
     # Display results
-    display_results(total_usage, devices)
+    display_results(total_usage, devices, args.top)
+
+    if groups:
+        print()
+        display_groups(groups)
+
+    if args.by_project:
+        print()
+        display_projects(projects, args.top)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Reconcile the cumulative DB against its records and the raw logs (`ccusage verify`)
+
+Totals are permanent and never decrease, so a bug in scan_sessions or in
+the session ID would otherwise accumulate silently. `ccusage verify`
+recomputes everything it can and reports drift:
+
+1. Sealed segments: a part whose SHA-256 still matches the one recorded at
+   seal time is trusted as-is (its stored totals are used without
+   decompressing it), which keeps nightly runs fast on very long
+   histories. Parts sealed before checksums existed, or all parts with
+   --deep, are decoded and re-summed.
+2. Stored records: hot session records + sealed part totals must add up to
+   cumulative_usage; the time buckets must match the records per day and
+   project (per month for checksum-only months); the project rollup must
+   match the buckets.
+3. Raw logs: every log source (ccusage_sources.py: JSONL files, .gz/.zst
+   archives, tar members) is re-parsed from byte 0 in a process pool.
+   Usage records missing from the DB, or stored with different token
+   counts, are drift. Records only in the DB are expected (Claude Code
+   deletes old logs) and are just counted.
+
+Exits with status 1 when drift is found, so it can run from cron.
+
+Usage:
+    ccusage verify [--deep] [--workers N] [--no-raw] [--json]
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from ccusage_cumulative import (
+    SETTINGS, SEGMENT_DIR, db_path, load_database, load_segment, file_sha256,
+    is_sealed_session, session_month, session_day, parse_usage_record,
+    empty_counters, add_session
+)
+from ccusage_sources import iter_sources
+
+TOKEN_KEYS = ["input_tokens", "output_tokens", "cache_creation_tokens", "cache_read_tokens"]
+VERIFY_WORKERS = os.cpu_count() or 1
+SHOW_ROWS = 20  # drift rows printed per section
+
+def counters_differ(a, b, keys=TOKEN_KEYS + ["sessions"]):
+    """Keys whose values differ between two counter dicts"""
+    return {key: b.get(key, 0) - a.get(key, 0) for key in keys if a.get(key, 0) != b.get(key, 0)}
+
+def parse_log_file(source):
+    """Worker: parse one log source from byte 0 into {session_id: session_data}"""
+    log_file = Path(source.name)
+    records = {}
+    malformed = 0
+
+    try:
+        for raw_line, _ in source.read_complete_lines(0):
+            line = raw_line.decode('utf-8', errors='replace')
+            if not line.strip():
+                continue
+            try:
+                record = parse_usage_record(log_file, source.project, line)
+            except ValueError:
+                malformed += 1
+                continue
+            if record:
+                records[record[0]] = record[1]
+    except Exception as e:  # unreadable file or corrupt archive
+        return source.key, {}, 0, str(e)
+
+    return source.key, records, malformed, None
+
+def add_part_totals(totals, part):
+    """Add the totals recorded for a part at seal time"""
+    stored = part["totals"]
+    for key in TOKEN_KEYS:
+        totals[key] += stored[key]
+    totals["sessions"] += stored["total_sessions"]
+
+def verify_segments(db, deep):
+    """Check sealed parts
+
+    Returns (month totals, records of fully decoded months, months with a
+    damaged part, issues, parts trusted, parts decoded). A damaged part
+    still counts with the totals recorded for it, so the other checks
+    report drift only where the records themselves disagree.
+    """
+    month_totals = {}
+    decoded = {}
+    damaged = set()
+    issues = []
+    trusted = checked = 0
+
+    for month, parts in sorted(db.get("segments", {}).items()):
+        totals = month_totals.setdefault(month, empty_counters())
+        sessions = {}
+
+        for part in parts:
+            path = SEGMENT_DIR / part["file"]
+            if not path.exists():
+                problem = "segment file missing"
+            elif part.get("sha256") and file_sha256(path) != part["sha256"]:
+                problem = "checksum mismatch"
+            else:
+                problem = None
+
+            if problem:
+                issues.append({"part": part["file"], "problem": problem})
+                damaged.add(month)
+                add_part_totals(totals, part)
+                continue
+
+            if part.get("sha256") and not deep:
+                trusted += 1
+                add_part_totals(totals, part)
+                continue
+
+            try:
+                segment = load_segment(part)
+            except (OSError, EOFError, zlib.error, ValueError) as e:
+                issues.append({"part": part["file"], "problem": f"unreadable ({e})"})
+                damaged.add(month)
+                add_part_totals(totals, part)
+                continue
+
+            checked += 1
+            recomputed = empty_counters()
+            for session_data in segment["sessions"].values():
+                add_session(recomputed, session_data)
+            sessions.update(segment["sessions"])
+
+            stored = dict(part["totals"], sessions=part["totals"]["total_sessions"])
+            drift = counters_differ(stored, recomputed)
+            if drift or part["sessions"] != len(segment["sessions"]):
+                issues.append({"part": part["file"], "problem": "stored totals differ from records",
+                               "drift": drift})
+
+            for key in recomputed:
+                totals[key] += recomputed[key]
+
+        # Only months whose records were all decoded are checked per day and project
+        if len(sessions) == sum(part["sessions"] for part in parts) and month not in damaged:
+            decoded[month] = sessions
+
+    return month_totals, decoded, damaged, issues, trusted, checked
+
+def bucket_cells(buckets):
+    """Collapse buckets to {(day, project): counters} and {month: counters}"""
+    cells = {}
+    months = {}
+    for day, by_project in buckets.items():
+        for project, by_model in by_project.items():
+            cell = cells.setdefault((day, project), empty_counters())
+            month = months.setdefault(day[:7], empty_counters())
+            for counters in by_model.values():
+                for key in cell:
+                    cell[key] += counters[key]
+                    month[key] += counters[key]
+    return cells, months
+
+def verify_records(db, month_totals, decoded):
+    """Compare records (and trusted part totals) with buckets, totals and projects"""
+    hot_months = {}
+    expected_cells = {}
+
+    # Months whose records are all available are checked per day and project
+    for session_id, session_data in db.get("processed_sessions", {}).items():
+        month = session_month(session_data["timestamp"])
+        add_session(hot_months.setdefault(month, empty_counters()), session_data)
+    detailed = {month for month in hot_months if month not in month_totals} | set(decoded)
+
+    records = list(db.get("processed_sessions", {}).values())
+    for sessions in decoded.values():
+        records.extend(sessions.values())
+    for session_data in records:
+        if session_month(session_data["timestamp"]) in detailed:
+            key = (session_day(session_data["timestamp"]), session_data.get("project", "unknown"))
+            add_session(expected_cells.setdefault(key, empty_counters()), session_data)
+
+    expected_months = {month: dict(counters) for month, counters in month_totals.items()}
+    for month, counters in hot_months.items():
+        target = expected_months.setdefault(month, empty_counters())
+        for key in counters:
+            target[key] += counters[key]
+
+    cells, bucket_months = bucket_cells(db.get("buckets", {}))
+
+    bucket_drift = []
+    for key in sorted(set(expected_cells) | {cell for cell in cells if cell[0][:7] in detailed}):
+        drift = counters_differ(expected_cells.get(key, {}), cells.get(key, {}))
+        if drift:
+            bucket_drift.append({"day": key[0], "project": key[1], "drift": drift})
+    for month in sorted(set(expected_months) | set(bucket_months)):
+        if month in detailed:
+            continue
+        drift = counters_differ(expected_months.get(month, {}), bucket_months.get(month, {}))
+        if drift:
+            bucket_drift.append({"month": month, "project": "*", "drift": drift})
+
+    expected_total = empty_counters()
+    for counters in expected_months.values():
+        for key in expected_total:
+            expected_total[key] += counters[key]
+    cumulative = dict(db["cumulative_usage"], sessions=db["cumulative_usage"]["total_sessions"])
+    total_drift = counters_differ(expected_total, cumulative)
+
+    project_sums = {}
+    for (day, project), counters in cells.items():
+        target = project_sums.setdefault(project, empty_counters())
+        for key in target:
+            target[key] += counters[key]
+    project_drift = []
+    for project in sorted(set(project_sums) | set(db.get("projects", {}))):
+        drift = counters_differ(project_sums.get(project, {}), db.get("projects", {}).get(project, {}))
+        if drift:
+            project_drift.append({"project": project, "drift": drift})
+
+    return {
+        "expected_total": expected_total,
+        "total_drift": total_drift,
+        "bucket_drift": bucket_drift,
+        "project_drift": project_drift,
+        "detailed_months": sorted(detailed)
+    }
+
+def verify_raw(db, damaged, workers):
+    """Re-parse all log sources in parallel and compare with the stored records"""
+    sources = list(iter_sources(SETTINGS))
+    processed = db.get("processed_sessions", {})
+    segments = {month: parts for month, parts in db.get("segments", {}).items() if month not in damaged}
+    sealed_cache = {}
+
+    raw_ids = set()
+    missing = {}
+    missing_count = 0
+    mismatched = []
+    unchecked = 0
+    malformed = 0
+    errors = []
+
+    chunksize = max(1, len(sources) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for source_key, records, bad_lines, error in pool.map(parse_log_file, sources, chunksize=chunksize):
+            malformed += bad_lines
+            if error:
+                errors.append({"file": source_key, "error": error})
+                continue
+
+            for session_id, session_data in records.items():
+                raw_ids.add(session_id)
+
+                stored = processed.get(session_id)
+                if stored is not None:
+                    drift = counters_differ(stored, session_data, TOKEN_KEYS)
+                    if drift:
+                        mismatched.append({"session": session_id, "file": session_data["file"], "drift": drift})
+                    continue
+
+                month = session_month(session_data["timestamp"])
+                if month in damaged:
+                    unchecked += 1
+                    continue
+                if is_sealed_session(segments, month, session_id, sealed_cache):
+                    continue
+
+                missing_count += 1
+                key = (session_day(session_data["timestamp"]), session_data["project"])
+                add_session(missing.setdefault(key, empty_counters()), session_data)
+
+    return {
+        "files": len(sources),
+        "records": len(raw_ids),
+        "malformed_lines": malformed,
+        "errors": errors,
+        "missing_count": missing_count,
+        "missing": [{"day": day, "project": project, "drift": counters}
+                    for (day, project), counters in sorted(missing.items())],
+        "mismatched": mismatched,
+        "unchecked": unchecked,
+        "only_in_db": sum(1 for session_id in processed if session_id not in raw_ids)
+    }
+
+def format_drift(drift):
+    """Compact "key=+n" rendering of a drift dict"""
+    return ', '.join(f"{key}={value:+,}" for key, value in drift.items() if value)
+
+def display_report(report):
+    """Print the verification report"""
+    print("=" * 70)
+    print("🔍 CUMULATIVE DB VERIFICATION")
+    print("=" * 70)
+    print()
+
+    segments = report["segments"]
+    print(f"📦 Sealed parts: {segments['trusted']} trusted by checksum, {segments['checked']} decoded")
+    for issue in segments["issues"]:
+        print(f"   ❌ {issue['part']}: {issue['problem']} {format_drift(issue.get('drift', {}))}")
+
+    records = report["records"]
+    print()
+    if records["total_drift"]:
+        print(f"❌ cumulative_usage drifts from the records: {format_drift(records['total_drift'])}")
+        print("   (positive = cumulative_usage is higher than its records)")
+    else:
+        print("✅ cumulative_usage matches the stored records")
+
+    if records["bucket_drift"]:
+        print(f"❌ {len(records['bucket_drift'])} time bucket(s) drift from the records "
+              f"(buckets minus records):")
+        for row in records["bucket_drift"][:SHOW_ROWS]:
+            print(f"   {row.get('day', row.get('month'))}  {row['project']:<30} {format_drift(row['drift'])}")
+    else:
+        print(f"✅ Time buckets match the records "
+              f"(per day/project for {', '.join(records['detailed_months']) or 'no months'}, per month otherwise)")
+
+    if records["project_drift"]:
+        print(f"❌ {len(records['project_drift'])} project rollup(s) drift from the buckets:")
+        for row in records["project_drift"][:SHOW_ROWS]:
+            print(f"   {row['project']:<30} {format_drift(row['drift'])}")
+    else:
+        print("✅ Project rollups match the buckets")
+
+    raw = report.get("raw")
+    if raw:
+        print()
+        print(f"📄 Raw logs: {raw['files']:,} files, {raw['records']:,} usage records "
+              f"({raw['only_in_db']:,} DB records no longer in the logs)")
+        if raw["missing_count"]:
+            print(f"❌ {raw['missing_count']:,} usage record(s) in the logs are missing from the DB:")
+            for row in raw["missing"][:SHOW_ROWS]:
+                print(f"   {row['day']}  {row['project']:<30} {format_drift(row['drift'])}")
+        else:
+            print("✅ Every usage record in the logs is in the DB")
+        if raw["mismatched"]:
+            print(f"❌ {len(raw['mismatched']):,} record(s) stored with different token counts:")
+            for row in raw["mismatched"][:SHOW_ROWS]:
+                print(f"   {row['file']}  {format_drift(row['drift'])}")
+        if raw["unchecked"]:
+            print(f"⚠️  {raw['unchecked']:,} record(s) fall into months with a damaged segment and were not checked")
+        for error in raw["errors"][:SHOW_ROWS]:
+            print(f"⚠️  Could not read {error['file']}: {error['error']}")
+
+    print()
+    print("=" * 70)
+    print(f"{'✅ No drift found' if not report['drift'] else '❌ Drift found'} ({report['seconds']:.2f}s)")
+    print("=" * 70)
+
+def main(argv=None):
+    """Main execution"""
+    parser = argparse.ArgumentParser(prog="ccusage verify", description="Reconcile the cumulative DB")
+    parser.add_argument("--deep", action="store_true", help="decode every sealed part instead of trusting checksums")
+    parser.add_argument("--no-raw", action="store_true", help="skip re-parsing the JSONL logs")
+    parser.add_argument("--workers", type=int, default=VERIFY_WORKERS, help="processes for the log re-parse")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if not db_path().exists():
+        print(f"⚠️  No cumulative usage database found at {db_path()}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    db = load_database()
+
+    month_totals, decoded, damaged, issues, trusted, checked = verify_segments(db, args.deep)
+    report = {
+        "segments": {"trusted": trusted, "checked": checked, "issues": issues},
+        "records": verify_records(db, month_totals, decoded)
+    }
+    if not args.no_raw:
+        report["raw"] = verify_raw(db, damaged, args.workers)
+
+    raw = report.get("raw", {})
+    report["drift"] = bool(issues or report["records"]["total_drift"] or report["records"]["bucket_drift"]
+                           or report["records"]["project_drift"] or raw.get("missing_count")
+                           or raw.get("mismatched"))
+    report["seconds"] = round(time.perf_counter() - started, 3)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        display_report(report)
+
+    sys.exit(1 if report["drift"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,23 @@
-# Setup Windows Task Scheduler for automatic daily sync
+# Setup Windows Task Scheduler for automatic adaptive sync
 # Run this script as Administrator
+#
+# The task runs `auto_sync.py --adaptive` every 15 minutes. Each run is a
+# cheap change check; the full scan + export + push only happens when the
+# usage delta crosses the thresholds in ~/.claude/usage_sync_config.json
+# (sync_min_tokens / sync_max_interval_minutes).
 
 $TaskName = "ClaudeUsageAutoSync"
 $ScriptPath = "$env:USERPROFILE\claude-usage-tracker\scripts\auto_sync.py"
 $PythonPath = (Get-Command python).Source
 $LogPath = "$env:USERPROFILE\claude-usage-tracker\logs"
+$CheckIntervalMinutes = 15
 
 # Create logs directory
 New-Item -ItemType Directory -Force -Path $LogPath | Out-Null
 
 Write-Host "=" -ForegroundColor Cyan -NoNewline
 Write-Host ("=" * 69) -ForegroundColor Cyan
-Write-Host "Setting up automatic daily sync for Claude Usage Tracker" -ForegroundColor Cyan
+Write-Host "Setting up automatic adaptive sync for Claude Usage Tracker" -ForegroundColor Cyan
 Write-Host "=" -ForegroundColor Cyan -NoNewline
 Write-Host ("=" * 69) -ForegroundColor Cyan
 Write-Host ""
@@ -27,18 +33,19 @@ if ($ExistingTask) {
 # Create action
 $Action = New-ScheduledTaskAction `
     -Execute $PythonPath `
-    -Argument $ScriptPath `
+    -Argument "`"$ScriptPath`" --adaptive" `
     -WorkingDirectory "$env:USERPROFILE\claude-usage-tracker"
 
-# Create trigger (daily at 11:59 PM)
-$Trigger = New-ScheduledTaskTrigger -Daily -At "23:59"
+# Create trigger (every 15 minutes, starting now)
+$Trigger = New-ScheduledTaskTrigger -Once -At (Get-Date) `
+    -RepetitionInterval (New-TimeSpan -Minutes $CheckIntervalMinutes)
 
 # Create settings
 $Settings = New-ScheduledTaskSettingsSet `
     -AllowStartIfOnBatteries `
     -DontStopIfGoingOnBatteries `
     -StartWhenAvailable `
-    -RunOnlyIfNetworkAvailable
+    -MultipleInstances IgnoreNew
 
 # Register task
 Register-ScheduledTask `
@@ -54,7 +61,7 @@ Write-Host "Task created successfully!" -ForegroundColor Green
 Write-Host ""
 Write-Host "Task Details:" -ForegroundColor Cyan
 Write-Host "  Name:     $TaskName"
-Write-Host "  Schedule: Daily at 11:59 PM"
+Write-Host "  Schedule: Adaptive check every $CheckIntervalMinutes minutes"
 Write-Host "  Script:   $ScriptPath"
 Write-Host "  Logs:     $LogPath"
 Write-Host ""
@@ -0,0 +1,13 @@
+"""
+Shared test setup: the scripts are plain modules in scripts/, not a package
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
@@ -0,0 +1,198 @@
+"""
+Sync queue against a real remote: a bare repository in a temp dir
+
+Covers coalescing of queued exports, backoff and recovery after a failed
+push, two devices racing the compare-and-swap push, the device manifest,
+concurrent queue updates, and an export queued as the worker exits.
+
+Created & Directed by Bohee Lee
+https://github.com/bohee-connectome
+
+Built with Claude Code
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+import subprocess
+
+import pytest
+
+import ccusage_sync_queue as sync_queue
+
+def git(cwd, *args):
+    """Run git and return its stripped stdout"""
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """A bare 'origin' with one commit on main; queue files redirected into tmp_path"""
+    for name in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{name}_NAME", "test")
+        monkeypatch.setenv(f"GIT_{name}_EMAIL", "test@example.com")
+    monkeypatch.setattr(sync_queue, "QUEUE_FILE", tmp_path / "sync_queue.json")
+    monkeypatch.setattr(sync_queue, "QUEUE_LOCK_FILE", tmp_path / "sync_queue.json.lock")
+    monkeypatch.setattr(sync_queue, "LOCK_FILE", tmp_path / "sync_queue.lock")
+    monkeypatch.setattr(sync_queue, "load_settings", lambda: {"sync_mode": "cas"})
+
+    bare = tmp_path / "origin.git"
+    git(tmp_path, 'init', '--quiet', '--bare', str(bare))
+    seed = tmp_path / "seed"
+    git(tmp_path, 'init', '--quiet', str(seed))
+    (seed / "README.md").write_text("usage\n")
+    git(seed, 'add', 'README.md')
+    git(seed, 'commit', '--quiet', '-m', 'init')
+    git(seed, 'push', '--quiet', str(bare), 'HEAD:refs/heads/main')
+    return bare
+
+def clone(remote, path):
+    """A device's checkout of the sync repo"""
+    git(remote.parent, 'clone', '--quiet', '--branch', 'main', str(remote), str(path))
+    (path / "data").mkdir()
+    return path
+
+def export(repo, device, tokens):
+    """Write a device file the way ccusage-sync does"""
+    data_file = repo / "data" / f"{device}.json"
+    data_file.write_text(json.dumps({"device_id": device, "usage": {"input_tokens": tokens}}))
+    return data_file
+
+def remote_file(remote, path):
+    return json.loads(git(remote, 'show', f"main:{path}"))
+
+def test_enqueued_exports_coalesce_into_one_push(remote, tmp_path):
+    repo = clone(remote, tmp_path / "pc")
+    for tokens in (1, 2, 3):
+        assert sync_queue.enqueue_export(repo, "pc", export(repo, "pc", tokens)) == tokens
+
+    assert asyncio.run(sync_queue.drain_queue())
+
+    assert git(remote, 'rev-list', '--count', 'main') == "2"
+    assert remote_file(remote, "data/pc.json")["usage"]["input_tokens"] == 3
+    assert sync_queue.load_queue()["pending"] == []
+
+def test_failed_push_backs_off_and_recovers(remote, tmp_path, monkeypatch):
+    repo = clone(remote, tmp_path / "pc")
+    sync_queue.enqueue_export(repo, "pc", export(repo, "pc", 7))
+    moved = remote.with_name("moved.git")
+    remote.rename(moved)
+    monkeypatch.setattr(sync_queue, "MAX_ATTEMPTS", 1)
+
+    assert not asyncio.run(sync_queue.drain_queue())
+
+    queue = sync_queue.load_queue()
+    assert len(queue["pending"]) == 1
+    assert queue["attempts"] == 1 and queue["push_failures"] == 1
+    assert "fetch failed" in queue["last_error"]
+    assert queue["next_attempt_at"] is not None
+
+    # Remote is back: the next run waits out the backoff, then pushes
+    moved.rename(remote)
+    monkeypatch.setattr(sync_queue, "backoff_delay", lambda attempts: 0)
+    with sync_queue.locked_queue() as queue:
+        queue["next_attempt_at"] = None
+
+    assert asyncio.run(sync_queue.drain_queue())
+    queue = sync_queue.load_queue()
+    assert queue["pending"] == [] and queue["attempts"] == 0 and queue["last_error"] is None
+    assert remote_file(remote, "data/pc.json")["usage"]["input_tokens"] == 7
+
+def test_two_devices_racing_the_cas_push_both_land(remote, tmp_path):
+    pc = clone(remote, tmp_path / "pc")
+    mac = clone(remote, tmp_path / "mac")
+    batches = {
+        pc: [{"file": str(export(pc, "pc", 10)), "device_id": "pc"}],
+        mac: [{"file": str(export(mac, "mac", 20)), "device_id": "mac"}]
+    }
+
+    async def race():
+        return await asyncio.gather(*(sync_queue.push_batch_cas(repo, batch) for repo, batch in batches.items()))
+
+    assert asyncio.run(race()) == [None, None]
+
+    # Linear history, each device's blob on top of the other's
+    assert git(remote, 'rev-list', '--count', 'main') == "3"
+    assert git(remote, 'rev-list', '--merges', 'main') == ""
+    assert remote_file(remote, "data/pc.json")["usage"]["input_tokens"] == 10
+    assert remote_file(remote, "data/mac.json")["usage"]["input_tokens"] == 20
+    assert remote_file(remote, "data/_index.json") == {"files": ["mac.json", "pc.json"], "team_rollup_current": False}
+
+def test_manifest_marks_the_team_rollup_stale_after_a_device_push(remote, tmp_path):
+    pc = clone(remote, tmp_path / "pc")
+    rollup = pc / "data" / "_team.json"
+    rollup.write_text("{}")
+    batch = [{"file": str(export(pc, "pc", 1)), "device_id": "pc"}, {"file": str(rollup), "device_id": "team"}]
+    assert asyncio.run(sync_queue.push_batch_cas(pc, batch)) is None
+    assert remote_file(remote, "data/_index.json")["team_rollup_current"] is True
+
+    assert asyncio.run(sync_queue.push_batch_cas(pc, [{"file": str(export(pc, "pc", 2)), "device_id": "pc"}])) is None
+    assert remote_file(remote, "data/_index.json") == {"files": ["pc.json"], "team_rollup_current": False}
+
+def test_rebase_mode_publishes_the_manifest(remote, tmp_path, monkeypatch):
+    monkeypatch.setattr(sync_queue, "load_settings", lambda: {"sync_mode": "rebase"})
+    pc = clone(remote, tmp_path / "pc")
+    (pc / "data" / "bohee").mkdir()
+    mac = pc / "data" / "bohee" / "mac.json"
+    mac.write_text("{}")
+    sync_queue.enqueue_export(pc, "pc", export(pc, "pc", 1))
+    sync_queue.enqueue_export(pc, "mac", mac)
+
+    assert asyncio.run(sync_queue.drain_queue())
+
+    assert remote_file(remote, "data/_index.json") == {"files": ["bohee/mac.json", "pc.json"],
+                                                      "team_rollup_current": False}
+
+def test_cas_push_leaves_user_staged_changes_alone(remote, tmp_path):
+    repo = clone(remote, tmp_path / "pc")
+    data_file = export(repo, "pc", 5)
+    git(repo, 'add', 'data/pc.json')
+    staged = git(repo, 'ls-files', '--stage', 'data/pc.json')
+    export(repo, "pc", 6)
+
+    assert asyncio.run(sync_queue.push_batch_cas(repo, [{"file": str(data_file), "device_id": "pc"}])) is None
+
+    assert remote_file(remote, "data/pc.json")["usage"]["input_tokens"] == 6
+    assert git(repo, 'ls-files', '--stage', 'data/pc.json') == staged
+
+def test_concurrent_enqueues_are_not_lost(remote, tmp_path):
+    repo = clone(remote, tmp_path / "pc")
+    data_file = export(repo, "pc", 1)
+    threads = [threading.Thread(target=sync_queue.enqueue_export, args=(repo, f"pc{i}", data_file))
+               for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sync_queue.load_queue()["pending"]) == 20
+    assert not sync_queue.QUEUE_LOCK_FILE.exists()
+
+def test_export_queued_as_the_worker_exits_is_pushed(remote, tmp_path, monkeypatch):
+    repo = clone(remote, tmp_path / "pc")
+    drain_queue = sync_queue.drain_queue
+
+    async def late_enqueue():
+        # The queue looked empty, then an export arrived while the lock was still held
+        result = await drain_queue()
+        if not sync_queue.load_queue()["pending"] and git(remote, 'rev-list', '--count', 'main') == "1":
+            sync_queue.enqueue_export(repo, "pc", export(repo, "pc", 4))
+        return result
+
+    monkeypatch.setattr(sync_queue, "drain_queue", late_enqueue)
+
+    assert sync_queue.drain()
+
+    assert remote_file(remote, "data/pc.json")["usage"]["input_tokens"] == 4
+    assert sync_queue.load_queue()["pending"] == []
+
+def test_worker_keeps_its_lock_fresh(remote, tmp_path):
+    assert sync_queue.acquire_lock()
+    old = time.time() - sync_queue.STALE_LOCK_SECONDS - 1
+    os.utime(sync_queue.LOCK_FILE, (old, old))
+
+    assert asyncio.run(sync_queue.drain_queue())
+
+    assert not sync_queue.acquire_lock()
+    sync_queue.release_lock()